@@ -1,6 +1,6 @@
 {
     'name': 'FTP Cuenta Cliente',
-    'version': '16.0.2.0.0',
+    'version': '16.0.2.2.0',
     'category': 'Tools',
     'license': 'LGPL-3',
     'summary': 'Automated file transfer and Excel processing for customer accounts',
@@ -13,7 +13,7 @@
         • Configurable credentials via Odoo frontend
         • Scheduled cron jobs for automatic file processing
         • Excel file download and parsing (.xlsx, .xls)
-        • JSON content storage with metadata
+        • Compressed columnar content storage with metadata
         • Automatic file organization (move processed files)
         • Detailed logging and error handling
         • Connection testing and status monitoring
@@ -38,7 +38,10 @@
         'security/ir.model.access.csv',
         'data/cron_data.xml',
         'views/ftp_config_views.xml',
+        'views/ftp_file_row_views.xml',
         'views/ftp_file_views.xml',
+        'views/ftp_processing_job_views.xml',
+        'views/ftp_run_views.xml',
         'views/ftp_file_type_views.xml',
         'views/ftp_column_mapping_views.xml',
         'wizard/ftp_column_mapping_wizard_views.xml',
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+Convierte el contenido de los archivos FTP guardado como JSON indentado en
+content_json al formato comprimido por columnas (content_data + content_index).
+"""
+
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['ftp.file']._migrate_json_content()
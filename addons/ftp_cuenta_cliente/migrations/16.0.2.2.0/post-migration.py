@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Mapea las columnas de RUT, SKU y cantidad de los tipos de archivo incluidos en el
+módulo, ya que el procesador lee los datos de las líneas desde las columnas mapeadas.
+"""
+
+from odoo import api, SUPERUSER_ID
+
+LINE_COLUMN_TARGETS = {
+    'ftp_cuenta_cliente.ftp_col_inst_rut': ('fsm.location', 'partner_id'),
+    'ftp_cuenta_cliente.ftp_col_rf_rut': ('fsm.location', 'partner_id'),
+    'ftp_cuenta_cliente.ftp_col_rf_sku': ('product.template', 'default_code'),
+    'ftp_cuenta_cliente.ftp_col_rf_cantidad': ('sale.order.line', 'product_uom_qty'),
+}
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    for xmlid, (target_model, target_field) in LINE_COLUMN_TARGETS.items():
+        column = env.ref(xmlid, raise_if_not_found=False)
+        if column and not column.target_model:
+            column.write({'target_model': target_model, 'target_field': target_field})
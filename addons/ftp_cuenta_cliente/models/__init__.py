@@ -1,5 +1,11 @@
 from . import ftp_config
 from . import ftp_file
+from . import ftp_file_manifest
+from . import ftp_file_row
+from . import ftp_processing_job
+from . import ftp_run
 from . import ftp_service
+from . import sale_order
 from . import sale_order_processor
-from . import ftp_file_type
\ No newline at end of file
+from . import ftp_file_type
+from . import technician_matcher
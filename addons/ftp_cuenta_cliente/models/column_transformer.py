@@ -0,0 +1,212 @@
+import logging
+import textwrap
+
+import pandas as pd
+
+from odoo.tools.safe_eval import safe_eval, datetime as safe_datetime
+
+_logger = logging.getLogger(__name__)
+
+# Mapping types resolved to a record of the target field's comodel
+M2O_MAPPING_TYPES = ('m2o_search', 'm2o_create')
+
+# Text read as True for boolean columns
+TRUE_VALUES = frozenset(['1', 'true', 'yes', 'y', 'si', 'sí', 's', 'x', 'verdadero'])
+
+# The code of a column is inlined once per import plan into a loop over the rows of a
+# batch, so running it costs one safe_eval per batch and column instead of one per row.
+TRANSFORM_TEMPLATE = """for _position, value in enumerate(values):
+    row = rows[_position]
+    result = value
+{code}
+    results.append(result)
+"""
+CUSTOM_MAPPING_TEMPLATE = """for _position, value in enumerate(values):
+    row = rows[_position]
+    mapped = mapped_rows[_position]
+{code}
+"""
+
+
+def _inline(template, code):
+    return template.format(code=textwrap.indent(textwrap.dedent(code).strip('\n'), '    '))
+
+
+def compile_column(column):
+    """
+    Column settings of an import plan with transformation_code and custom_mapping
+    wrapped into their batch loops (None when empty)
+    """
+    return dict(
+        column,
+        key=f"{column['target_model']}.{column['target_field']}",
+        transform_loop=_inline(TRANSFORM_TEMPLATE, column['transformation_code'])
+        if (column['transformation_code'] or '').strip() else None,
+        custom_loop=_inline(CUSTOM_MAPPING_TEMPLATE, column['custom_mapping'])
+        if (column['custom_mapping'] or '').strip() else None,
+    )
+
+
+class ColumnTransformer:
+    """
+    Apply the mapped columns of an import plan to batches of rows.
+
+    For each column, in order: default value, typed conversion (with date_format for
+    dates), transformation_code (``value``/``row`` in, ``result`` out), Many2one lookup
+    with search_domain (``value`` in the domain), then custom_mapping (``value``, ``row``
+    and ``mapped``, the row's values by 'model.field', which it may change). Conversions
+    run per batch with pandas and Many2one lookups are cached per distinct value for
+    the lifetime of the transformer (one file).
+    """
+
+    def __init__(self, env, columns):
+        self.env = env
+        self.columns = []
+        self.lookup_cache = {}
+        for column in columns:
+            column = dict(column, comodel=None)
+            if column['mapping_type'] in M2O_MAPPING_TYPES:
+                field = env[column['target_model']]._fields.get(column['target_field'])
+                if field is None or field.type != 'many2one':
+                    _logger.warning(f"Column {column['column_name']} maps to {column['key']}, which is not a "
+                                    f"Many2one field: its values are kept as text")
+                else:
+                    column['comodel'] = field.comodel_name
+            self.columns.append(column)
+        self.has_code = any(column['transform_loop'] or column['custom_loop'] for column in self.columns)
+
+    def __bool__(self):
+        return bool(self.columns)
+
+    def transform(self, rows):
+        """
+        Return ([{'model.field': value} per row], {position: error message}) for a batch.
+
+        Values of 'concatenate' columns are collected as "column: value" lines in a list.
+        The code of the columns runs on copies of the rows, which are left unchanged. When
+        it fails for the batch, the rows are transformed again one by one from those
+        unchanged rows, so only the failing ones get an error (and a None result for the
+        failing column) and no change of the failed batch run is applied twice.
+        """
+        if not rows:
+            return [], {}
+        try:
+            return self._transform_batch(self._copy_rows(rows)), {}
+        except Exception as e:
+            _logger.debug(f"Column code failed for the batch, transforming its rows one by one: {e}")
+        mapped_rows = []
+        errors = {}
+        for position, row in enumerate(rows):
+            row_errors = {}
+            mapped_rows.extend(self._transform_batch(self._copy_rows([row]), row_errors))
+            if row_errors:
+                errors[position] = row_errors[0]
+        return mapped_rows, errors
+
+    def _copy_rows(self, rows):
+        """Rows handed to the column code, which may change them"""
+        return [dict(row) for row in rows] if self.has_code else rows
+
+    def _transform_batch(self, rows, errors=None):
+        """
+        Apply every column to rows; a failing column code raises, or with errors (single
+        row runs) is recorded there and gives a None result
+        """
+        mapped_rows = [{} for _row in rows]
+        for column in self.columns:
+            values = self._convert(column, [row.get(column['column_name']) for row in rows])
+            if column['transform_loop']:
+                values = self._run(column, column['transform_loop'], values, rows, mapped_rows, errors, collect=True)
+            if column['comodel']:
+                values = [self._lookup(column, value) for value in values]
+            for mapped, value in zip(mapped_rows, values):
+                if column['mapping_type'] == 'concatenate':
+                    if value not in (None, ''):
+                        mapped.setdefault(column['key'], []).append(f"{column['column_name']}: {value}")
+                else:
+                    mapped[column['key']] = value
+            if column['custom_loop']:
+                self._run(column, column['custom_loop'], values, rows, mapped_rows, errors)
+        return mapped_rows
+
+    def _convert(self, column, raw_values):
+        """Convert the raw cell texts of a column to its data_type (None for empty values)"""
+        series = pd.Series(raw_values, dtype=object).fillna('').astype(str).str.strip()
+        if column['default_value']:
+            series = series.mask(series == '', str(column['default_value']).strip())
+        empty = (series == '').tolist()
+        data_type = column['data_type']
+
+        if data_type in ('integer', 'float'):
+            numbers = pd.to_numeric(series, errors='coerce')
+            retry = numbers.isna() & (series != '')
+            if retry.any():
+                # Decimal comma ("2,5")
+                numbers[retry] = pd.to_numeric(series[retry].str.replace(',', '.', regex=False), errors='coerce')
+            return [
+                None if pd.isna(number) else (int(round(number)) if data_type == 'integer' else float(number))
+                for number in numbers
+            ]
+
+        if data_type in ('date', 'datetime'):
+            texts = series.where(series != '')
+            parsed = pd.to_datetime(texts, format=column['date_format'] or None, errors='coerce')
+            retry = parsed.isna() & texts.notna()
+            if retry.any():
+                # Cells already stored as ISO dates by the spreadsheet reader
+                parsed[retry] = pd.to_datetime(texts[retry], errors='coerce', dayfirst=True)
+            return [
+                None if pd.isna(value) else (value.date() if data_type == 'date' else value.to_pydatetime())
+                for value in parsed
+            ]
+
+        if data_type == 'boolean':
+            return [None if is_empty else text.casefold() in TRUE_VALUES for text, is_empty in zip(series, empty)]
+
+        return [None if is_empty else text for text, is_empty in zip(series, empty)]
+
+    def _run(self, column, loop, values, rows, mapped_rows, errors, collect=False):
+        """Run a column's batch loop and return the results it collected"""
+        try:
+            return self._eval_loop(loop, values, rows, mapped_rows, collect)
+        except Exception as e:
+            if errors is None:
+                raise
+            errors.setdefault(0, f"{column['column_name']}: {e}")
+            return [None] * len(values)
+
+    def _eval_loop(self, loop, values, rows, mapped_rows, collect):
+        results = []
+        context = {
+            'values': values,
+            'rows': rows,
+            'mapped_rows': mapped_rows,
+            'results': results,
+            'datetime': safe_datetime,
+        }
+        safe_eval(loop, context, mode='exec', nocopy=True)
+        if collect and len(results) != len(values):
+            raise ValueError("transformation code must not skip rows")
+        return results
+
+    def _lookup(self, column, value):
+        """Id of the comodel record for value, searched once per distinct value"""
+        if value in (None, ''):
+            return False
+        cache_key = (column['key'], value)
+        if cache_key not in self.lookup_cache:
+            self.lookup_cache[cache_key] = self._search(column, value)
+        return self.lookup_cache[cache_key]
+
+    def _search(self, column, value):
+        model = self.env[column['comodel']]
+        rec_name = model._rec_name or 'name'
+        if (column['search_domain'] or '').strip():
+            domain = safe_eval(column['search_domain'], {'value': value})
+        else:
+            domain = [(rec_name, '=', value)]
+        record = model.search(domain, limit=1)
+        if not record and column['mapping_type'] == 'm2o_create':
+            record = model.create({rec_name: value})
+            _logger.info(f"Created {column['comodel']} {value!r} for column {column['column_name']}")
+        return record.id or False
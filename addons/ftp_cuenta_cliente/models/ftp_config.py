@@ -6,11 +6,26 @@ Maneja las credenciales y configuraciones para conexiones FTP/SFTP/SCP.
 
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from datetime import timedelta
 import ftplib
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Cada cuántos minutos corre el cron que revisa qué configuraciones deben verificarse
+POLL_TICK_MINUTES = 5
+
+# Multiplicador máximo del intervalo tras verificaciones vacías o fallidas (1x, 2x, 4x, 8x)
+# (ftp_cuenta_cliente.poll_max_backoff)
+POLL_MAX_BACKOFF = 8
+
+# Mientras llegan archivos el intervalo se divide por este factor (sin bajar del cron)
+POLL_ACTIVE_DIVISOR = 4
+
+# Un archivo modificado hace menos de estos minutos indica que el cliente está subiendo
+# (ftp_cuenta_cliente.active_upload_window)
+ACTIVE_UPLOAD_WINDOW = 15
+
 class FtpConfig(models.Model):
     """
     Modelo para almacenar configuraciones de conexión FTP/SFTP/SCP.
@@ -85,11 +100,79 @@ class FtpConfig(models.Model):
         default=30, 
         help='Frecuencia para verificar nuevos archivos en el servidor FTP'
     )
+    sync_mode = fields.Selection([
+        ('full', 'Completo'),
+        ('incremental', 'Incremental')
+    ],
+    string='Modo de Sincronización',
+    default='full',
+    required=True,
+    help='Completo: descarga todo archivo cuyo nombre no haya sido procesado. '
+         'Incremental: compara tamaño y fecha de modificación con el manifiesto y '
+         'descarga solo archivos nuevos o modificados (incluye re-subidas con el mismo nombre)')
+    duplicate_policy = fields.Selection([
+        ('skip', 'Omitir'),
+        ('link', 'Vincular al Original'),
+        ('reprocess', 'Reprocesar')
+    ],
+    string='Archivos Duplicados',
+    default='link',
+    required=True,
+    help='Qué hacer con un archivo cuyo contenido (hash) ya fue procesado: '
+         'omitirlo sin registro, registrarlo como duplicado vinculado al original, '
+         'o procesarlo nuevamente')
+    processing_mode = fields.Selection([
+        ('inline', 'En la Descarga'),
+        ('queue', 'Cola de Trabajos')
+    ],
+    string='Modo de Procesamiento',
+    default='inline',
+    required=True,
+    help='En la Descarga: las órdenes se crean en la misma ejecución del cron que descarga el archivo. '
+         'Cola de Trabajos: el cron solo descarga y guarda el archivo y encola trabajos '
+         '(uno por tramo de filas en archivos grandes) que procesan los workers de la cola')
+    manifest_ids = fields.One2many(
+        'ftp.file.manifest',
+        'ftp_config_id',
+        string='Manifiesto Remoto',
+        readonly=True
+    )
     last_sync = fields.Datetime(
         string='Última Sincronización', 
         readonly=True,
         help='Fecha y hora de la última sincronización exitosa'
     )
+    last_fetch_duration = fields.Float(
+        string='Duración Última Descarga (s)',
+        readonly=True,
+        help='Segundos empleados en conectar, listar y descargar archivos en la última ejecución'
+    )
+    last_process_duration = fields.Float(
+        string='Duración Último Procesamiento (s)',
+        readonly=True,
+        help='Segundos empleados en procesar y mover los archivos descargados en la última ejecución'
+    )
+    next_poll = fields.Datetime(
+        string='Próxima Verificación',
+        readonly=True,
+        help='Fecha desde la cual el cron volverá a verificar el servidor; vacío = en la próxima pasada'
+    )
+    poll_interval = fields.Integer(
+        string='Intervalo Actual (minutos)',
+        readonly=True,
+        help='Intervalo aplicado tras la última verificación: menor que el configurado mientras '
+             'el cliente sube archivos, y creciente cuando el directorio está vacío o la conexión falla'
+    )
+    idle_polls = fields.Integer(
+        string='Verificaciones sin Actividad',
+        readonly=True,
+        help='Verificaciones consecutivas sin archivos nuevos o con error de conexión'
+    )
+    last_fetch_file_count = fields.Integer(
+        string='Archivos Última Descarga',
+        readonly=True,
+        help='Cantidad de archivos descargados en la última ejecución'
+    )
     
     # Estado de conexión
     connection_status = fields.Selection([
@@ -124,6 +207,55 @@ class FtpConfig(models.Model):
         for record in self:
             if record.cron_interval <= 0:
                 raise ValidationError("El intervalo debe ser mayor a 0 minutos")
+
+    def write(self, vals):
+        # Un intervalo nuevo o una reactivación se aplican desde la próxima pasada del cron
+        if 'cron_interval' in vals or vals.get('active'):
+            vals = dict(vals, next_poll=False, idle_polls=0)
+        return super().write(vals)
+
+    @api.model
+    def _get_due_configs(self):
+        """
+        Obtiene las configuraciones activas cuya próxima verificación ya llegó.
+        
+        :return: Configuraciones a verificar en esta pasada del cron
+        :rtype: recordset
+        """
+        return self.search([
+            ('active', '=', True),
+            '|', ('next_poll', '=', False), ('next_poll', '<=', fields.Datetime.now()),
+        ])
+
+    def _get_poll_schedule(self, outcome):
+        """
+        Calcula la próxima verificación según el resultado de la última.
+        
+        - ``active`` (llegaron archivos o hay subidas recientes): el intervalo se divide
+          por ``POLL_ACTIVE_DIVISOR``, sin bajar del intervalo del cron.
+        - ``idle`` (directorio sin archivos nuevos) y ``failed`` (error de conexión o
+          listado): el intervalo se duplica en cada verificación consecutiva, hasta
+          ``POLL_MAX_BACKOFF`` veces el configurado.
+        
+        :param outcome: 'active', 'idle' o 'failed'
+        :return: Valores para write (next_poll, poll_interval, idle_polls, connection_status)
+        :rtype: dict
+        """
+        self.ensure_one()
+        params = self.env['ir.config_parameter'].sudo()
+        max_backoff = max(int(params.get_param('ftp_cuenta_cliente.poll_max_backoff', POLL_MAX_BACKOFF)), 1)
+        base_interval = max(self.cron_interval, POLL_TICK_MINUTES)
+        vals = {'connection_status': 'failed' if outcome == 'failed' else 'success'}
+        if outcome == 'active':
+            vals['idle_polls'] = 0
+            interval = max(base_interval // POLL_ACTIVE_DIVISOR, POLL_TICK_MINUTES)
+        else:
+            vals['idle_polls'] = self.idle_polls + 1
+            factor = min(2 ** (vals['idle_polls'] - 1), max_backoff)
+            interval = base_interval * factor
+        vals['poll_interval'] = interval
+        vals['next_poll'] = fields.Datetime.now() + timedelta(minutes=interval)
+        return vals
     
     
     def test_connection(self):
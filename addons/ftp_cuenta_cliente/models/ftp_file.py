@@ -1,5 +1,105 @@
 from odoo import models, fields, api
+import base64
+import io
 import json
+import logging
+import zlib
+
+_logger = logging.getLogger(__name__)
+
+# Version of the compressed columnar content format stored in content_data
+CONTENT_FORMAT_VERSION = 1
+# Rows shown per sheet in the content preview
+CONTENT_PREVIEW_ROWS = 50
+# Compressed bytes decoded at a time when reading content_data
+CONTENT_READ_CHUNK = 64 * 1024
+
+
+class ContentWriter:
+    """
+    Incrementally serialize parsed rows into the compact columnar content format.
+
+    Each sheet is stored as its own gzip member holding one JSON array per line
+    (the row values); the column names are kept once per sheet in the index. Rows
+    are appended batch by batch, so only the compressed output accumulates.
+    """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._compressor = None
+        self._sheet = None
+        self._positions = {}
+        self.sheets = []
+        self.row_count = 0
+        self.column_count = 0
+
+    @property
+    def sheet_names(self):
+        return [sheet['name'] for sheet in self.sheets]
+
+    def add_rows(self, sheet_name, rows):
+        """Append a batch of row dicts to sheet_name (batches of a sheet must be contiguous)"""
+        if self._sheet is None or sheet_name != self._sheet['name']:
+            self._close_sheet()
+            self._sheet = {
+                'name': str(sheet_name),
+                'headers': [],
+                'rows': 0,
+                'offset': self._buffer.tell(),
+                'length': 0,
+            }
+            self._positions = {}
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            self.sheets.append(self._sheet)
+
+        headers = self._sheet['headers']
+        lines = []
+        for row in rows:
+            values = [''] * len(headers)
+            for key, value in row.items():
+                position = self._positions.get(key)
+                if position is None:
+                    position = self._positions[key] = len(headers)
+                    headers.append(key)
+                    values.append('')
+                values[position] = value
+            lines.append(json.dumps(values, ensure_ascii=False, separators=(',', ':')))
+            self.column_count = max(self.column_count, len(row))
+        if lines:
+            self._buffer.write(self._compressor.compress(('\n'.join(lines) + '\n').encode('utf-8')))
+        self._sheet['rows'] += len(rows)
+        self.row_count += len(rows)
+
+    def _close_sheet(self):
+        if self._sheet is not None and self._compressor is not None:
+            self._buffer.write(self._compressor.flush())
+            self._sheet['length'] = self._buffer.tell() - self._sheet['offset']
+            self._compressor = None
+
+    def finish(self):
+        """Return (compressed bytes, index dict) for the content written so far"""
+        self._close_sheet()
+        index = {'version': CONTENT_FORMAT_VERSION, 'sheets': self.sheets}
+        return self._buffer.getvalue(), index
+
+
+def iter_content_sheet_rows(data, sheet):
+    """Decode the rows of one sheet from content_data bytes, a chunk at a time"""
+    headers = sheet['headers']
+    view = memoryview(data)[sheet['offset']:sheet['offset'] + sheet['length']]
+    decompressor = zlib.decompressobj(31)
+    pending = b''
+    for start in range(0, len(view), CONTENT_READ_CHUNK):
+        pending += decompressor.decompress(view[start:start + CONTENT_READ_CHUNK])
+        lines = pending.split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield dict(zip(headers, json.loads(line)))
+    pending += decompressor.flush()
+    for line in pending.split(b'\n'):
+        if line:
+            yield dict(zip(headers, json.loads(line)))
+
 
 class FtpFile(models.Model):
     _name = 'ftp.file'
@@ -9,7 +109,11 @@ class FtpFile(models.Model):
     name = fields.Char('File Name', required=True)
     file_size = fields.Float('File Size (KB)', digits=(10, 2))
     ftp_config_id = fields.Many2one('ftp.config', 'FTP Configuration', required=True)
-    content_json = fields.Text('File Content (JSON)')
+    content_json = fields.Text('File Content (JSON)', help="Legacy storage, replaced by the compressed content")
+    content_data = fields.Binary('File Content (Compressed)', attachment=True,
+        help="Parsed rows stored per sheet as compressed column arrays")
+    content_index = fields.Text('Content Index', help="JSON index of sheets, headers and offsets in the compressed content")
+    content_preview = fields.Text('File Content', compute='_compute_content_preview')
     processed_date = fields.Datetime('Processed Date', default=fields.Datetime.now)
     original_path = fields.Char('Original Path')
     moved_path = fields.Char('Moved Path')
@@ -19,10 +123,23 @@ class FtpFile(models.Model):
         ('downloaded', 'Downloaded'),
         ('processed', 'Processed'),
         ('moved', 'Moved'),
+        ('duplicate', 'Duplicate'),
         ('error', 'Error')
     ], default='downloaded')
+    content_hash = fields.Char('Content Hash', index=True, readonly=True,
+        help="SHA-256 of the downloaded file, used to detect the same payload under another name")
+    duplicate_of_id = fields.Many2one('ftp.file', 'Duplicate Of', readonly=True,
+        help="Earlier file with identical content this one was linked to instead of being processed")
     
     error_message = fields.Text('Error Message')
+
+    # Download integrity
+    download_attempts = fields.Integer('Download Attempts', readonly=True,
+        help="Transfer attempts needed to get the complete file (retries resume where the last one stopped)")
+    download_resumed_size = fields.Float('Resumed (KB)', digits=(10, 2), readonly=True,
+        help="Content taken from earlier interrupted transfers instead of being downloaded again")
+    download_verified = fields.Boolean('Size Verified', readonly=True,
+        help="The downloaded size matched the size reported by the server")
     
     # Content analysis
     row_count = fields.Integer('Number of Rows')
@@ -30,15 +147,146 @@ class FtpFile(models.Model):
     sheet_names = fields.Text('Sheet Names')
     sale_orders_created = fields.Integer('Sale Orders Created', default=0)
     inventory_moves_created = fields.Integer('Inventory Moves Created', default=0)
-    processing_log = fields.Text('Processing Log', help="Detailed log of each row processing with results")
+    processing_log = fields.Text('Processing Log', help="Processing summary (per row detail only for small files)")
+
+    # Per-row results
+    row_ids = fields.One2many('ftp.file.row', 'ftp_file_id', string='Row Results')
+    rows_created_count = fields.Integer('Rows With Order', compute='_compute_row_counts')
+    rows_already_imported_count = fields.Integer('Rows Already Imported', compute='_compute_row_counts')
+    rows_skipped_count = fields.Integer('Rows Skipped', compute='_compute_row_counts')
+    rows_error_count = fields.Integer('Rows With Errors', compute='_compute_row_counts')
+
+    # Checkpoint of a chunked import still in progress
+    checkpoint_sheet = fields.Char('Checkpoint Sheet', readonly=True, copy=False,
+        help="Sheet of the last committed chunk of a reprocess; the next reprocess resumes after it")
+    checkpoint_row = fields.Integer('Checkpoint Row', readonly=True, copy=False,
+        help="Last row (from 1) of the checkpoint sheet whose orders are committed")
+    checkpoint_orders = fields.Integer('Orders Before Checkpoint', readonly=True, copy=False)
+
+    # Processing queue
+    job_ids = fields.One2many('ftp.processing.job', 'ftp_file_id', string='Processing Jobs')
+    job_state = fields.Selection([
+        ('none', 'Not Queued'),
+        ('queued', 'Queued'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], string='Queue State', default='none', readonly=True, index=True)
     
     @api.depends('name')
     def _compute_display_name(self):
         for record in self:
             record.display_name = f"{record.name} ({record.processed_date})"
     
+    def _compute_row_counts(self):
+        counts = {}
+        ids = tuple(id_ for id_ in self.ids if isinstance(id_, int))
+        if ids:
+            self.env['ftp.file.row'].flush_model(['ftp_file_id', 'status'])
+            self.env.cr.execute("""
+                SELECT ftp_file_id, status, count(*) FROM ftp_file_row
+                 WHERE ftp_file_id IN %s
+                 GROUP BY ftp_file_id, status
+            """, (ids,))
+            for file_id, status, count in self.env.cr.fetchall():
+                counts[(file_id, status)] = count
+        for record in self:
+            record.rows_created_count = counts.get((record.id, 'created'), 0)
+            record.rows_already_imported_count = counts.get((record.id, 'already_imported'), 0)
+            record.rows_skipped_count = counts.get((record.id, 'skipped'), 0)
+            record.rows_error_count = counts.get((record.id, 'error'), 0)
+
+    def _compute_content_preview(self):
+        for record in self:
+            preview = {}
+            for sheet in record._get_content_sheets():
+                rows = []
+                for row in record._iter_sheet_rows(sheet):
+                    rows.append(row)
+                    if len(rows) >= CONTENT_PREVIEW_ROWS:
+                        break
+                preview[sheet['name']] = rows
+            if not preview and record.content_json:
+                preview = record.get_content_as_dict()
+            record.content_preview = json.dumps(preview, ensure_ascii=False, indent=2) if preview else False
+
+    def _get_content_index(self):
+        """Return the parsed content index, or None for records without compressed content"""
+        self.ensure_one()
+        if not self.content_index:
+            return None
+        try:
+            return json.loads(self.content_index)
+        except json.JSONDecodeError:
+            return None
+
+    def _get_content_sheets(self):
+        index = self._get_content_index()
+        return index['sheets'] if index else []
+
+    def _get_content_data(self):
+        """Read the raw compressed content without going through base64"""
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'content_data'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+        return attachment.raw or b''
+
+    def _iter_sheet_rows(self, sheet, data=None):
+        if data is None:
+            data = self._get_content_data()
+        return iter_content_sheet_rows(data, sheet)
+
+    def get_sheet_names(self):
+        """Return the sheet names of the stored content"""
+        self.ensure_one()
+        if self.content_index:
+            return [sheet['name'] for sheet in self._get_content_sheets()]
+        return list(self.get_content_as_dict().keys())
+
+    def iter_content_rows(self, sheet_name=None):
+        """Yield (sheet_name, row dict) for every stored row, optionally of a single sheet"""
+        for batch_sheet, rows in self.iter_content_batches(sheet_name=sheet_name):
+            for row in rows:
+                yield batch_sheet, row
+
+    def iter_content_batches(self, sheet_name=None, batch_size=1000):
+        """
+        Yield (sheet_name, rows) batches of the stored content.
+
+        Only the requested sheet is decompressed, and rows are decoded lazily, so a
+        single sheet or the first rows can be read without decoding the whole file.
+        """
+        self.ensure_one()
+        if not self.content_index:
+            # Records not yet migrated keep their content in content_json
+            for legacy_sheet, rows in self.get_content_as_dict().items():
+                if sheet_name is None or legacy_sheet == sheet_name:
+                    for start in range(0, max(len(rows), 1), batch_size):
+                        yield legacy_sheet, rows[start:start + batch_size]
+            return
+
+        data = self._get_content_data()
+        for sheet in self._get_content_sheets():
+            if sheet_name is not None and sheet['name'] != sheet_name:
+                continue
+            batch = []
+            for row in self._iter_sheet_rows(sheet, data):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield sheet['name'], batch
+                    batch = []
+            if batch or not sheet['rows']:
+                yield sheet['name'], batch
+
     def get_content_as_dict(self):
         """Return file content as Python dictionary"""
+        if self.content_index:
+            content = {}
+            for sheet_name, rows in self.iter_content_batches():
+                content.setdefault(sheet_name, []).extend(rows)
+            return content
         if self.content_json:
             try:
                 return json.loads(self.content_json)
@@ -47,9 +295,104 @@ class FtpFile(models.Model):
         return {}
     
     def set_content_from_dict(self, content_dict):
-        """Store dictionary content as JSON"""
-        self.content_json = json.dumps(content_dict, ensure_ascii=False, indent=2)
+        """Store dictionary content in the compressed format"""
+        writer = ContentWriter()
+        for sheet_name, rows in content_dict.items():
+            writer.add_rows(sheet_name, rows)
+        self.set_content_from_writer(writer)
+
+    def set_content_from_writer(self, writer):
+        """Store the content accumulated by a ContentWriter along with its statistics"""
+        data, index = writer.finish()
+        self.write({
+            'content_data': base64.b64encode(data),
+            'content_index': json.dumps(index, ensure_ascii=False),
+            'content_json': False,
+            'row_count': writer.row_count,
+            'column_count': writer.column_count,
+            'sheet_names': ', '.join(writer.sheet_names),
+        })
+
+    @api.model
+    def _migrate_json_content(self, batch_size=100):
+        """Convert records still holding content_json to the compressed content format"""
+        migrated = 0
+        while True:
+            records = self.search([
+                ('content_json', '!=', False),
+                ('content_index', '=', False),
+            ], limit=batch_size)
+            if not records:
+                break
+            for record in records:
+                try:
+                    content = json.loads(record.content_json)
+                except json.JSONDecodeError:
+                    _logger.warning(f"Could not decode content of file {record.name}, keeping it as is")
+                    record.content_index = json.dumps({'version': CONTENT_FORMAT_VERSION, 'sheets': []})
+                    continue
+                writer = ContentWriter()
+                for sheet_name, rows in content.items():
+                    writer.add_rows(sheet_name, rows)
+                data, index = writer.finish()
+                record.write({
+                    'content_data': base64.b64encode(data),
+                    'content_index': json.dumps(index, ensure_ascii=False),
+                    'content_json': False,
+                })
+                migrated += 1
+            self.env.flush_all()
+            self.env.invalidate_all()
+        _logger.info(f"Migrated {migrated} FTP files to compressed content storage")
+        return migrated
     
+    @api.model
+    def _finalize_queued_files(self):
+        """Aggregate the results of queued files whose jobs have all finished"""
+        self.flush_model(['job_state'])
+        self.env['ftp.processing.job'].flush_model(['ftp_file_id', 'state'])
+        self.env.cr.execute("""
+            SELECT f.id FROM ftp_file f
+             WHERE f.job_state = 'queued'
+               AND NOT EXISTS (
+                   SELECT 1 FROM ftp_processing_job j
+                    WHERE j.ftp_file_id = f.id AND j.state = 'pending'
+               )
+             FOR UPDATE SKIP LOCKED
+        """)
+        for record in self.browse([row[0] for row in self.env.cr.fetchall()]):
+            try:
+                with self.env.cr.savepoint():
+                    record._finalize_jobs()
+            except Exception as e:
+                _logger.info(f"Could not finalize queued file {record.name} yet: {str(e)}")
+
+    def _finalize_jobs(self):
+        """Write the combined outcome of this file's jobs on the file"""
+        self.ensure_one()
+        jobs = self.job_ids.sorted(lambda job: (job.sheet_name or '', job.row_start))
+        errors = [message for message in jobs.mapped('error_message') if message]
+        vals = {
+            'sale_orders_created': sum(jobs.mapped('orders_created')),
+            'processing_log': '\n'.join(log for log in jobs.mapped('processing_log') if log),
+            'error_message': '\n'.join(errors) if errors else False,
+            'job_state': 'failed' if any(job.state == 'failed' for job in jobs) else 'done',
+        }
+        if not any(jobs.mapped('success')):
+            vals['status'] = 'error'
+        elif self.status == 'downloaded':
+            vals['status'] = 'processed'
+        self.write(vals)
+        _logger.info(f"Queued processing finished for {self.name}: {vals['sale_orders_created']} orders created")
+
+    def action_view_rows(self):
+        """Open the per-row results of this file"""
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id('ftp_cuenta_cliente.ftp_file_row_action')
+        action['domain'] = [('ftp_file_id', '=', self.id)]
+        action['name'] = f'Row Results: {self.name}'
+        return action
+
     def view_content(self):
         """Action to view file content in a popup"""
         return {
@@ -98,6 +441,8 @@ class FtpFile(models.Model):
         if results['success']:
             message = f"Processing completed successfully!\n"
             message += f"Orders created: {results['orders_created']}\n"
+            if results.get('rows_already_imported'):
+                message += f"Rows already imported: {results['rows_already_imported']}\n"
             
             if results['skus_not_found']:
                 message += f"\nWarning: {len(results['skus_not_found'])} SKUs not found in catalog\n"
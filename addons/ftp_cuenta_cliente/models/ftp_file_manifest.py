@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Modelo de Manifiesto de Archivos Remotos
+Registra el estado de cada archivo remoto ya procesado para la sincronización incremental.
+"""
+
+from odoo import models, fields
+
+
+class FtpFileManifest(models.Model):
+    """
+    Entrada del manifiesto de una configuración FTP.
+
+    Guarda nombre, tamaño, fecha de modificación y hash del contenido del último
+    archivo procesado con ese nombre; en modo incremental solo se descargan los
+    archivos nuevos o cuyo tamaño/fecha difieren de su entrada. Los duplicados
+    omitidos por la política 'skip' se registran en cualquier modo, ya que no
+    dejan un registro ftp.file que los marque como procesados.
+    """
+    _name = 'ftp.file.manifest'
+    _description = 'Manifiesto de archivos remotos FTP'
+    _rec_name = 'name'
+    _order = 'ftp_config_id, name'
+
+    ftp_config_id = fields.Many2one(
+        'ftp.config',
+        string='Configuración FTP',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    name = fields.Char(
+        string='Nombre de Archivo',
+        required=True
+    )
+    size = fields.Float(
+        string='Tamaño (bytes)',
+        digits=(16, 0),
+        help='Tamaño informado por el servidor al momento de la descarga'
+    )
+    mtime = fields.Float(
+        string='Fecha de Modificación',
+        help='Fecha de modificación remota (segundos desde epoch, UTC)'
+    )
+    content_hash = fields.Char(
+        string='Hash del Contenido',
+        help='SHA-256 del archivo descargado'
+    )
+    ftp_file_id = fields.Many2one(
+        'ftp.file',
+        string='Último Registro',
+        ondelete='set null'
+    )
+    duplicate_skipped = fields.Boolean(
+        string='Duplicado Omitido',
+        help='Contenido repetido de otro archivo, omitido sin crear su registro (ftp_file_id es el original)'
+    )
+
+    _sql_constraints = [
+        ('unique_name_per_config', 'UNIQUE(ftp_config_id, name)',
+         'El nombre de archivo debe ser único por configuración!'),
+    ]
@@ -0,0 +1,75 @@
+from odoo import models, fields, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+ROW_STATUSES = [
+    ('created', 'Order Created'),
+    ('already_imported', 'Already Imported'),
+    ('skipped', 'Skipped'),
+    ('error', 'Error')
+]
+ROW_ERROR_CODES = [
+    ('invalid_row', 'Missing Required Data'),
+    ('partner_not_found', 'Customer Not Found'),
+    ('product_not_found', 'Product Not Found'),
+    ('create_failed', 'Order Creation Failed')
+]
+# Columns written by _bulk_insert, in the order of the tuples it builds
+ROW_INSERT_COLUMNS = (
+    'ftp_file_id', 'sheet_name', 'row_index', 'status', 'error_code', 'message',
+    'partner_id', 'product_id', 'sale_order_id',
+)
+# Rows per INSERT statement of _bulk_insert
+ROW_INSERT_PAGE_SIZE = 1000
+
+
+class FtpFileRow(models.Model):
+    _name = 'ftp.file.row'
+    _description = 'FTP File Row Result'
+    _order = 'ftp_file_id, sheet_name, row_index'
+    _log_access = False
+
+    ftp_file_id = fields.Many2one('ftp.file', 'File', required=True, ondelete='cascade', index=True)
+    sheet_name = fields.Char('Sheet')
+    row_index = fields.Integer('Row', help="Row number (from 1) within the sheet")
+    status = fields.Selection(ROW_STATUSES, required=True)
+    error_code = fields.Selection(ROW_ERROR_CODES, 'Error Code')
+    message = fields.Char('Message')
+    partner_id = fields.Many2one('res.partner', 'Customer', ondelete='set null')
+    product_id = fields.Many2one('product.product', 'Product', ondelete='set null')
+    sale_order_id = fields.Many2one('sale.order', 'Sale Order', ondelete='set null')
+
+    @api.model
+    def _bulk_insert(self, ftp_file_id, rows):
+        """Insert row results (dicts with the ROW_INSERT_COLUMNS keys) in one statement"""
+        if not rows:
+            return
+        values = [
+            tuple(ftp_file_id if column == 'ftp_file_id' else row.get(column) for column in ROW_INSERT_COLUMNS)
+            for row in rows
+        ]
+        # Multi-row VALUES run through the Odoo cursor, so the inserts are logged and counted
+        placeholder = f"({', '.join(['%s'] * len(ROW_INSERT_COLUMNS))})"
+        for start in range(0, len(values), ROW_INSERT_PAGE_SIZE):
+            page = values[start:start + ROW_INSERT_PAGE_SIZE]
+            self.env.cr.execute(
+                f"INSERT INTO ftp_file_row ({', '.join(ROW_INSERT_COLUMNS)}) VALUES {', '.join([placeholder] * len(page))}",
+                [value for row_values in page for value in row_values],
+            )
+        self.invalidate_model()
+        self.env['ftp.file'].invalidate_model(['row_ids'])
+
+    @api.model
+    def _clear_results(self, ftp_file_id, row_range=None):
+        """Delete the row results a new run will write again (only its row range for queue jobs)"""
+        if row_range:
+            sheet_name, start, stop = row_range
+            self.env.cr.execute("""
+                DELETE FROM ftp_file_row
+                 WHERE ftp_file_id = %s AND sheet_name = %s AND row_index > %s AND row_index <= %s
+            """, (ftp_file_id, sheet_name, start, stop))
+        else:
+            self.env.cr.execute("DELETE FROM ftp_file_row WHERE ftp_file_id = %s", (ftp_file_id,))
+        self.invalidate_model()
+        self.env['ftp.file'].invalidate_model(['row_ids'])
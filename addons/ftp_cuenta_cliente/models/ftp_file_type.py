@@ -1,4 +1,13 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+from odoo.tools.safe_eval import test_python_expr
+import hashlib
+import os
+
+from .column_transformer import compile_column
+
+# Extensions read by the Excel readers; a type declaring either accepts both
+EXCEL_EXTENSIONS = ('xlsx', 'xls')
 
 class FtpFileType(models.Model):
     _name = 'ftp.file.type'
@@ -21,7 +30,10 @@ class FtpFileType(models.Model):
         ('xml', 'XML'),
     ], string='Expected Extension', default='xlsx', required=True)
     
-    delimiter = fields.Char('CSV Delimiter', default=',', help="Delimiter for CSV files")
+    delimiter = fields.Char('CSV Delimiter', default=',', help="Delimiter for CSV and TXT files (\\t for tab)")
+    parallel_parse_min_size = fields.Integer('Parallel Parsing From (KB)', default=0,
+        help="Excel (XLSX) files of at least this size have their sheets parsed in parallel worker "
+             "processes; 0 disables parallel parsing")
     encoding = fields.Selection([
         ('utf-8', 'UTF-8'),
         ('latin-1', 'Latin-1'),
@@ -33,6 +45,13 @@ class FtpFileType(models.Model):
         help="If enabled, this file type will be processed to create sale orders")
     group_by_field = fields.Char('Group By Field', 
         help="Field name to group records for sale order creation (e.g., 'id.mochila')")
+    consolidate_orders = fields.Boolean('Consolidate Orders', default=False,
+        help="Create one sale order per Group By Field value, with one line per SKU (quantities summed), "
+             "instead of one order per row")
+    batch_order_creation = fields.Boolean('Batch Order Creation', default=False,
+        help="Create sale orders in chunks with a single create() call instead of one call per row")
+    order_chunk_size = fields.Integer('Order Chunk Size', default=100,
+        help="Number of sale orders created per chunk when batch creation is enabled")
     
     # Related fields
     column_ids = fields.One2many('ftp.file.type.column', 'file_type_id', string='Columns')
@@ -88,23 +107,151 @@ class FtpFileType(models.Model):
                 })
         return self.action_open_column_mapping()
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.clear_caches()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.clear_caches()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.clear_caches()
+        return result
+
+    @api.model
+    def _header_signature(self, headers):
+        """Order-independent hash of a header row, used to match files to a type"""
+        names = sorted({str(header).strip().casefold() for header in headers if header is not None})
+        return hashlib.sha1('\n'.join(names).encode('utf-8')).hexdigest()
+
+    @api.model
+    @tools.ormcache()
+    def _get_import_plans(self):
+        """
+        Compile the import plan of every active file type.
+
+        A plan holds everything the import needs from a type and its columns as plain
+        data: filename pattern, header signature, required columns, key columns,
+        column mappings, column transformations (their code inlined into batch loops, kept
+        as source since safe_eval does not run code objects), batch and grouping settings
+        and reader options (extension, delimiter, encoding). Plans are cached per registry
+        and the cache is cleared on any write to ftp.file.type or ftp.file.type.column, so
+        callers must treat them as read-only.
+        """
+        plans = {}
+        by_signature = {}
+        for file_type in self.sudo().search([('active', '=', True)]):
+            columns = file_type.column_ids.sorted('sequence')
+            column_mappings = {}
+            transform_columns = []
+            for column in columns:
+                if column.target_model and column.target_field:
+                    column_mappings[f"{column.target_model}.{column.target_field}"] = {
+                        'column_name': column.name,
+                        'technical_name': column.technical_name or column.name,
+                        'data_type': column.data_type,
+                        'mapping_type': column.mapping_type,
+                        'is_required': column.is_required,
+                        'default_value': column.default_value,
+                    }
+                    if column.mapping_type != 'ignore':
+                        transform_columns.append(compile_column({
+                            'column_name': column.name,
+                            'target_model': column.target_model,
+                            'target_field': column.target_field,
+                            'data_type': column.data_type,
+                            'mapping_type': column.mapping_type,
+                            'date_format': column.date_format,
+                            'default_value': column.default_value,
+                            'transformation_code': column.transformation_code,
+                            'search_domain': column.search_domain,
+                            'custom_mapping': column.custom_mapping,
+                        }))
+            plan = {
+                'id': file_type.id,
+                'pattern': (file_type.code or '').lower(),
+                'signature': self._header_signature(columns.mapped('name')) if columns else False,
+                'required': frozenset(columns.filtered('is_required').mapped('name')),
+                'key_columns': tuple(columns.filtered('is_key').mapped('name')),
+                'column_mappings': column_mappings,
+                'columns': tuple(transform_columns),
+                'order_chunk_size': max(file_type.order_chunk_size, 1) if file_type.batch_order_creation else 0,
+                'group_by': (file_type.group_by_field or '').strip() if file_type.consolidate_orders else False,
+                'extension': file_type.file_extension,
+                'delimiter': file_type.delimiter or ',',
+                'encoding': file_type.encoding or 'utf-8',
+                'parallel_min_kb': max(file_type.parallel_parse_min_size, 0),
+            }
+            plans[file_type.id] = plan
+            if plan['signature']:
+                by_signature.setdefault(plan['signature'], file_type.id)
+        return {'plans': plans, 'by_signature': by_signature}
+
+    def _get_import_plan(self):
+        """Return the compiled import plan of this file type (empty dict if inactive)"""
+        self.ensure_one()
+        return self._get_import_plans()['plans'].get(self.id, {})
+
+    @api.model
+    def _get_import_extensions(self):
+        """
+        Return the lowercase suffixes ('.csv', ...) of the files to download, from the
+        extensions of the active types. Excel types accept both .xlsx and .xls; without
+        active types the Excel suffixes are used.
+        """
+        extensions = {plan['extension'] for plan in self._get_import_plans()['plans'].values()}
+        if not extensions or extensions & set(EXCEL_EXTENSIONS):
+            extensions |= set(EXCEL_EXTENSIONS)
+        return tuple(sorted(f".{extension}" for extension in extensions))
+
+    @api.model
+    def _get_read_options(self, filename):
+        """
+        Reader options for a downloaded file, from the type matching its name (or the
+        first active type declaring its extension): {'extension', 'delimiter', 'encoding',
+        'parallel_min_kb'}
+        """
+        extension = os.path.splitext(filename)[1].lstrip('.').lower()
+        plans = self._get_import_plans()['plans'].values()
+        name = filename.lower()
+        plan = next((plan for plan in plans if plan['pattern'] and plan['pattern'] in name
+                     and plan['extension'] == extension), None)
+        plan = plan or next((plan for plan in plans if plan['extension'] == extension), None)
+        return {
+            'extension': extension,
+            'delimiter': plan['delimiter'] if plan else ',',
+            'encoding': plan['encoding'] if plan else 'utf-8',
+            'parallel_min_kb': plan['parallel_min_kb'] if plan else 0,
+        }
+
     @api.model
     def identify_file_type(self, filename, headers=None):
         """
         Try to identify the file type based on filename or headers
         Returns the file type record or False
         """
+        compiled = self._get_import_plans()
+        
         # First try by filename pattern
-        for file_type in self.search([('active', '=', True)]):
-            if file_type.code.lower() in filename.lower():
-                return file_type
+        filename = filename.lower()
+        for plan in compiled['plans'].values():
+            if plan['pattern'] and plan['pattern'] in filename:
+                return self.browse(plan['id'])
         
         # If headers provided, try to match by column structure
         if headers:
-            for file_type in self.search([('active', '=', True)]):
-                expected_columns = file_type.column_ids.filtered('is_required').mapped('name')
-                if all(col in headers for col in expected_columns):
-                    return file_type
+            type_id = compiled['by_signature'].get(self._header_signature(headers))
+            if type_id:
+                return self.browse(type_id)
+            header_set = set(headers)
+            for plan in compiled['plans'].values():
+                if plan['required'] <= header_set:
+                    return self.browse(plan['id'])
         
         return False
 
@@ -137,6 +284,7 @@ class FtpFileTypeColumn(models.Model):
     # Target model selection
     target_model = fields.Selection([
         ('sale.order', 'Sale Order'),
+        ('sale.order.line', 'Sale Order Line'),
         ('product.template', 'Product Template'), 
         ('fsm.location', 'FSM Location'),
     ], string='Target Model', help="Select which model this column should map to")
@@ -186,12 +334,16 @@ class FtpFileTypeColumn(models.Model):
         help="How to process this field during import")
     
     transformation_code = fields.Text('Transformation Code', 
-        help="Python code to transform the value (for compute type)")
+        help="Python code to transform the value: 'value' is the converted cell, 'row' the whole "
+             "row by column name, and 'result' (initially the value) is what gets mapped")
     search_domain = fields.Text('Search Domain', 
-        help="Domain to search for Many2One fields (as Python expression)")
+        help="Domain to search for Many2One fields (as Python expression), with 'value' "
+             "the cell value, e.g. [('default_code', '=', value)]")
     
     custom_mapping = fields.Text('Custom Mapping Logic', 
-        help="Python code for custom field mapping (advanced)")
+        help="Python code for custom field mapping (advanced): 'value' and 'row' as in the "
+             "transformation code, and 'mapped' the row's values by 'model.field' "
+             "(e.g. mapped['sale.order.client_order_ref'] = row['OT'])")
     
     # Format configuration
     date_format = fields.Char('Date Format', default='%d-%m-%Y', 
@@ -206,6 +358,35 @@ class FtpFileTypeColumn(models.Model):
          'Column name must be unique per file type!'),
     ]
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.clear_caches()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.clear_caches()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.clear_caches()
+        return result
+
+    @api.constrains('transformation_code', 'custom_mapping', 'search_domain')
+    def _check_python_code(self):
+        for column in self:
+            for field_name, mode in (('transformation_code', 'exec'), ('custom_mapping', 'exec'),
+                                     ('search_domain', 'eval')):
+                code = (column[field_name] or '').strip()
+                if code:
+                    message = test_python_expr(expr=code, mode=mode)
+                    if message:
+                        raise ValidationError(_("%(column)s: %(field)s is not valid\n%(error)s",
+                                                column=column.name, field=column._fields[field_name].string,
+                                                error=message))
+
     @api.onchange('name')
     def _onchange_name(self):
         if self.name and not self.technical_name:
@@ -319,4 +500,4 @@ class FtpFileTypeColumn(models.Model):
                     result.append((field_name, field_label))
             return result
         except Exception:
-            return [('name', 'name')]
\ No newline at end of file
+            return [('name', 'name')]
\ No newline at end of file
@@ -0,0 +1,180 @@
+from odoo import models, fields, api
+import logging
+import time
+from datetime import timedelta
+
+_logger = logging.getLogger(__name__)
+
+# Files with more rows than this are split into one job per row chunk
+JOB_CHUNK_ROWS = 5000
+# Jobs a worker runs per cron call
+JOB_BATCH_LIMIT = 20
+# Retry backoff: JOB_RETRY_DELAY * 2 ** (attempts - 1) seconds, capped at JOB_RETRY_MAX_DELAY
+JOB_RETRY_DELAY = 60
+JOB_RETRY_MAX_DELAY = 3600
+
+
+class FtpProcessingJob(models.Model):
+    _name = 'ftp.processing.job'
+    _description = 'FTP File Processing Job'
+    _order = 'next_attempt, id'
+
+    ftp_file_id = fields.Many2one('ftp.file', 'File', required=True, ondelete='cascade', index=True)
+    ftp_config_id = fields.Many2one(related='ftp_file_id.ftp_config_id', string='FTP Configuration')
+    sheet_name = fields.Char('Sheet', help="Sheet of the row chunk; empty when the job covers the whole file")
+    row_start = fields.Integer('From Row', help="Position (from 0) of the first row of the chunk")
+    row_stop = fields.Integer('To Row', help="Position (from 0) after the last row of the chunk")
+
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], default='pending', required=True, index=True)
+    attempts = fields.Integer('Attempts', default=0)
+    max_attempts = fields.Integer('Max Attempts', default=5)
+    next_attempt = fields.Datetime('Next Attempt', default=fields.Datetime.now, index=True)
+    date_done = fields.Datetime('Done Date')
+    duration = fields.Float('Duration (s)', digits=(10, 2))
+
+    success = fields.Boolean('Orders Created or Already Imported')
+    orders_created = fields.Integer('Sale Orders Created', default=0)
+    error_message = fields.Text('Error Message')
+    processing_log = fields.Text('Processing Log')
+
+    @api.depends('ftp_file_id.name', 'sheet_name', 'row_start', 'row_stop')
+    def _compute_display_name(self):
+        for job in self:
+            if job.sheet_name:
+                job.display_name = f"{job.ftp_file_id.name} [{job.sheet_name} {job.row_start + 1}-{job.row_stop}]"
+            else:
+                job.display_name = job.ftp_file_id.name
+
+    @api.model
+    def _enqueue_file(self, ftp_file):
+        """
+        Create the jobs for a stored file: one for the whole file, or one per row chunk
+        of large files. Files of a type that consolidates orders are never split, since
+        the rows of one order may be anywhere in the file.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        chunk_rows = int(params.get_param('ftp_cuenta_cliente.job_chunk_rows', JOB_CHUNK_ROWS))
+        sheets = ftp_file._get_content_sheets()
+        file_type = self.env['ftp.file.type'].identify_file_type(
+            ftp_file.name, sheets[0]['headers'] if sheets else None
+        )
+        if file_type and file_type._get_import_plan().get('group_by'):
+            chunk_rows = 0
+
+        if chunk_rows <= 0 or sum(sheet['rows'] for sheet in sheets) <= chunk_rows:
+            vals_list = [{'ftp_file_id': ftp_file.id}]
+        else:
+            vals_list = [
+                {
+                    'ftp_file_id': ftp_file.id,
+                    'sheet_name': sheet['name'],
+                    'row_start': start,
+                    'row_stop': min(start + chunk_rows, sheet['rows']),
+                }
+                for sheet in sheets
+                for start in range(0, sheet['rows'], chunk_rows)
+            ]
+        jobs = self.create(vals_list)
+        ftp_file.job_state = 'queued'
+        _logger.info(f"Queued {len(jobs)} processing jobs for file {ftp_file.name}")
+        return jobs
+
+    @api.model
+    def _claim_next(self):
+        """Lock the next due pending job, skipping the ones other workers hold"""
+        self.flush_model(['state', 'next_attempt'])
+        self.env.cr.execute("""
+            SELECT id FROM ftp_processing_job
+             WHERE state = 'pending'
+               AND next_attempt <= (now() at time zone 'UTC')
+             ORDER BY next_attempt, id
+             LIMIT 1
+             FOR UPDATE SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        return self.browse(row[0]) if row else self.browse()
+
+    @api.model
+    def cron_run_jobs(self, limit=None):
+        """Worker entry point: claim and run due jobs, each in its own transaction"""
+        if limit is None:
+            params = self.env['ir.config_parameter'].sudo()
+            limit = int(params.get_param('ftp_cuenta_cliente.job_batch_limit', JOB_BATCH_LIMIT))
+        done = 0
+        for _i in range(limit):
+            job = self._claim_next()
+            if not job:
+                break
+            job._run()
+            self._commit()
+            done += 1
+        self.env['ftp.file']._finalize_queued_files()
+        self._commit()
+        return done
+
+    def _commit(self):
+        """Commit the work of a job so later failures do not undo it (not under tests)"""
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    def _run(self):
+        """Run the sale order processor for this job and record its outcome"""
+        self.ensure_one()
+        _logger.info(f"Running processing job {self.id} for file {self.ftp_file_id.name}")
+        started = time.monotonic()
+        row_range = (self.sheet_name, self.row_start, self.row_stop) if self.sheet_name else None
+        processor = self.env['sale.order.processor']
+        try:
+            with self.env.cr.savepoint():
+                results = processor.process_ftp_file_to_sale_order(
+                    self.ftp_file_id.id, row_range=row_range, update_file=False
+                )
+        except Exception as e:
+            self._register_failure(str(e), time.monotonic() - started)
+            return
+
+        errors = list(results['errors'])
+        if results['skus_not_found']:
+            errors.append(processor._format_missing_skus(results['skus_not_found']))
+        self.write({
+            'state': 'done',
+            'attempts': self.attempts + 1,
+            'date_done': fields.Datetime.now(),
+            'duration': time.monotonic() - started,
+            'success': results['success'],
+            'orders_created': results['orders_created'],
+            'error_message': '\n'.join(errors) if errors else False,
+            'processing_log': '\n'.join(results['processing_log']),
+        })
+        _logger.info(f"Processing job {self.id} done. Orders created: {results['orders_created']}")
+
+    def _register_failure(self, error, duration):
+        """Schedule a retry with exponential backoff, or fail the job after max_attempts"""
+        attempts = self.attempts + 1
+        vals = {
+            'attempts': attempts,
+            'duration': duration,
+            'error_message': error,
+        }
+        if attempts >= self.max_attempts:
+            vals['state'] = 'failed'
+            _logger.error(f"Processing job {self.id} failed after {attempts} attempts: {error}")
+        else:
+            delay = min(JOB_RETRY_DELAY * 2 ** (attempts - 1), JOB_RETRY_MAX_DELAY)
+            vals['next_attempt'] = fields.Datetime.now() + timedelta(seconds=delay)
+            _logger.warning(f"Processing job {self.id} failed (attempt {attempts}), retrying in {delay}s: {error}")
+        self.write(vals)
+
+    def action_retry(self):
+        """Put failed jobs back in the queue"""
+        failed = self.filtered(lambda job: job.state == 'failed')
+        failed.write({
+            'state': 'pending',
+            'attempts': 0,
+            'next_attempt': fields.Datetime.now(),
+        })
+        failed.mapped('ftp_file_id').write({'job_state': 'queued'})
@@ -0,0 +1,140 @@
+from odoo import models, fields, api
+from contextlib import contextmanager
+from datetime import timedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Days ftp.run records are kept before the autovacuum removes them
+RUN_RETENTION_DAYS = 30
+
+RUN_STAGES = [
+    ('connect', 'Connect'),
+    ('list', 'List'),
+    ('download', 'Download'),
+    ('parse', 'Parse'),
+    ('store', 'Store Content'),
+    ('lookup', 'Partner/Product Lookup'),
+    ('create_orders', 'Order Creation'),
+    ('move', 'Remote Move')
+]
+
+
+class RunStats:
+    """
+    Accumulate wall time, rows, bytes and SQL queries per stage of a run.
+
+    Plain object so it can be filled from the fetch threads (without a cursor,
+    so no query counts) and merged afterwards into the stats of the ORM side.
+    """
+
+    def __init__(self, cr=None):
+        self.cr = cr
+        self.stages = {}
+
+    def _query_count(self):
+        return getattr(self.cr, 'sql_log_count', 0) if self.cr else 0
+
+    @contextmanager
+    def stage(self, name, rows=0, bytes_count=0):
+        """Time the enclosed block as one call of stage name"""
+        started = time.monotonic()
+        queries = self._query_count()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - started, rows=rows, bytes_count=bytes_count,
+                     queries=self._query_count() - queries)
+
+    def add(self, name, duration, rows=0, bytes_count=0, queries=0, calls=1):
+        stage = self.stages.setdefault(name, {'duration': 0.0, 'rows': 0, 'bytes': 0, 'queries': 0, 'calls': 0})
+        stage['duration'] += duration
+        stage['rows'] += rows
+        stage['bytes'] += bytes_count
+        stage['queries'] += queries
+        stage['calls'] += calls
+
+    def merge(self, other):
+        for name, stage in other.stages.items():
+            self.add(name, stage['duration'], stage['rows'], stage['bytes'], stage['queries'], stage['calls'])
+
+
+class FtpRun(models.Model):
+    _name = 'ftp.run'
+    _description = 'FTP Run Statistics'
+    _order = 'date_start desc, id desc'
+
+    ftp_config_id = fields.Many2one('ftp.config', 'FTP Configuration', required=True, ondelete='cascade', index=True)
+    date_start = fields.Datetime('Started', required=True, default=fields.Datetime.now, index=True)
+    duration = fields.Float('Duration (s)', digits=(10, 2))
+    state = fields.Selection([
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], default='done', required=True)
+    error_message = fields.Text('Error Message')
+
+    files_count = fields.Integer('Files')
+    # Float (numeric) rather than Integer, whose int4 column overflows past 2 GB
+    bytes_downloaded = fields.Float('Bytes Downloaded', digits=(16, 0))
+    rows_count = fields.Integer('Rows')
+    rows_per_second = fields.Float('Rows/s', digits=(10, 1))
+    query_count = fields.Integer('SQL Queries')
+    stage_ids = fields.One2many('ftp.run.stage', 'run_id', string='Stages')
+
+    @api.model
+    def _record(self, config, started_at, duration, stats, files_count=0, error=None):
+        """Create the run of config with one line per stage collected in stats"""
+        rows = stats.stages.get('parse', {}).get('rows', 0)
+        return self.create({
+            'ftp_config_id': config.id,
+            'date_start': started_at,
+            'duration': duration,
+            'state': 'failed' if error else 'done',
+            'error_message': error or False,
+            'files_count': files_count,
+            'bytes_downloaded': stats.stages.get('download', {}).get('bytes', 0),
+            'rows_count': rows,
+            'rows_per_second': rows / duration if duration else 0.0,
+            'query_count': sum(stage['queries'] for stage in stats.stages.values()),
+            'stage_ids': [
+                (0, 0, {
+                    'name': name,
+                    'calls': stage['calls'],
+                    'duration': stage['duration'],
+                    'rows': stage['rows'],
+                    'bytes_count': stage['bytes'],
+                    'query_count': stage['queries'],
+                    'rows_per_second': stage['rows'] / stage['duration'] if stage['duration'] else 0.0,
+                })
+                for name, stage in stats.stages.items()
+            ],
+        })
+
+    @api.autovacuum
+    def _gc_runs(self):
+        """Delete the runs older than ftp_cuenta_cliente.run_retention_days"""
+        params = self.env['ir.config_parameter'].sudo()
+        days = int(params.get_param('ftp_cuenta_cliente.run_retention_days', RUN_RETENTION_DAYS))
+        if days <= 0:
+            return
+        runs = self.search([('date_start', '<', fields.Datetime.now() - timedelta(days=days))])
+        runs.unlink()
+        _logger.info(f"Removed {len(runs)} FTP runs older than {days} days")
+
+
+class FtpRunStage(models.Model):
+    _name = 'ftp.run.stage'
+    _description = 'FTP Run Stage Statistics'
+    _order = 'run_id, id'
+
+    run_id = fields.Many2one('ftp.run', 'Run', required=True, ondelete='cascade', index=True)
+    ftp_config_id = fields.Many2one(related='run_id.ftp_config_id', store=True, string='FTP Configuration')
+    date_start = fields.Datetime(related='run_id.date_start', store=True, string='Started')
+    name = fields.Selection(RUN_STAGES, 'Stage', required=True)
+    calls = fields.Integer('Calls')
+    duration = fields.Float('Duration (s)', digits=(10, 3), group_operator='sum')
+    rows = fields.Integer('Rows')
+    bytes_count = fields.Float('Bytes', digits=(16, 0))
+    rows_per_second = fields.Float('Rows/s', digits=(10, 1), group_operator='avg')
+    query_count = fields.Integer('SQL Queries')
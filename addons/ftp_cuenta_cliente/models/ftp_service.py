@@ -1,6 +1,10 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError, UserError
+from contextlib import nullcontext
+import csv
 import ftplib
+import io
+import itertools
 import tempfile
 import os
 import pandas as pd
@@ -8,17 +12,300 @@ import openpyxl
 import logging
 import socket
 import paramiko
-from datetime import datetime
+from datetime import datetime, timezone
+import hashlib
+import importlib.util
 import json
+import multiprocessing
+import queue
+import shutil
+import site
 import subprocess
+import sys
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import SimpleNamespace
+from lxml import etree
+
+from .ftp_config import ACTIVE_UPLOAD_WINDOW
+from .ftp_file import ContentWriter
+from .ftp_run import RunStats
 
 _logger = logging.getLogger(__name__)
 
+# Rows handed from the parser to storage and the order processor at a time
+PARSE_BATCH_SIZE = 1000
+
+# Defaults for pooled sessions, overridable with ir.config_parameter
+CONNECTION_IDLE_TIMEOUT = 900
+CONNECTION_MAX_AGE = 3600
+
+# Worker processes for parallel sheet parsing, overridable with ir.config_parameter
+PARSE_PROCESSES = 4
+
+# Standalone module (no Odoo imports) holding the sheet parser run by the spawned workers
+XLSX_WORKER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workers')
+XLSX_WORKER_MODULE = 'ftp_xlsx_worker'
+
+# Files a config's fetch may download ahead of the one being processed (0 = download
+# all files first), overridable with ir.config_parameter
+PIPELINE_DEPTH = 2
+
+# Bytes of a download kept in memory before it spills to a temporary file,
+# overridable with ir.config_parameter
+DOWNLOAD_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Transfer attempts per file and seconds before the first retry (doubled on each one),
+# overridable with ir.config_parameter
+DOWNLOAD_ATTEMPTS = 3
+DOWNLOAD_RETRY_DELAY = 2
+
+# Interrupted downloads kept on disk, keyed by config, name, size and mtime, so the next
+# run resumes them instead of starting over; entries older than the max age are purged
+PARTIAL_DOWNLOAD_DIR = os.path.join(tempfile.gettempdir(), 'ftp_cuenta_cliente_partial')
+PARTIAL_DOWNLOAD_MAX_AGE = 2 * 86400
+
+# Read size of resumed SFTP transfers
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _close_connection_info(connection_info):
+    """Close every handle of a connection"""
+    try:
+        if connection_info['type'] in ['sftp', 'scp']:
+            if connection_info.get('sftp'):
+                connection_info['sftp'].close()
+            if connection_info['connection']:
+                connection_info['connection'].close()
+            if connection_info['ssh']:
+                connection_info['ssh'].close()
+        else:
+            if connection_info['connection']:
+                connection_info['connection'].quit()
+        _logger.info(f"Connection closed successfully")
+    except Exception as e:
+        _logger.warning(f"Error closing connection: {str(e)}")
+
+
+def _connection_is_healthy(connection_info):
+    """Check that a pooled session is still usable and reset its working directory"""
+    try:
+        if connection_info['type'] in ['sftp', 'scp']:
+            transport = connection_info['ssh'].get_transport()
+            if not transport or not transport.is_active():
+                return False
+            if connection_info['connection']:
+                connection_info['connection'].chdir(None)
+        else:
+            # Doubles as a NOOP: fails if the server dropped the control connection
+            connection_info['connection'].cwd(connection_info['home'])
+        return True
+    except Exception as e:
+        _logger.info(f"Discarding stale pooled connection: {str(e)}")
+        return False
+
+
+def _partial_download_path(config, entry):
+    """Cache path of an interrupted download of a listed file, None without size and mtime"""
+    if entry['size'] is None or entry['mtime'] is None:
+        return None
+    key = json.dumps([config.dbname, config.id, entry['name'], entry['size'], entry['mtime']])
+    return os.path.join(PARTIAL_DOWNLOAD_DIR, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.part")
+
+
+def _purge_partial_downloads():
+    """Remove cached partial downloads nobody resumed within PARTIAL_DOWNLOAD_MAX_AGE"""
+    limit = time.time() - PARTIAL_DOWNLOAD_MAX_AGE
+    try:
+        for entry in os.scandir(PARTIAL_DOWNLOAD_DIR):
+            if entry.is_file() and entry.stat().st_mtime < limit:
+                os.unlink(entry.path)
+    except OSError as e:
+        _logger.warning(f"Failed to purge partial downloads: {str(e)}")
+
+
+def _load_xlsx_worker():
+    """Import the sheet parser module of the parse workers under its plain name, as they do"""
+    module = sys.modules.get(XLSX_WORKER_MODULE)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(
+            XLSX_WORKER_MODULE, os.path.join(XLSX_WORKER_DIR, f"{XLSX_WORKER_MODULE}.py")
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[XLSX_WORKER_MODULE] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+_xlsx_worker = _load_xlsx_worker()
+_cell_to_str = _xlsx_worker.cell_to_str
+
+
+class DownloadBuffer:
+    """
+    Write target of a download, read back directly by the parsers.
+
+    Content stays in memory up to max_memory bytes and spills to a named temporary
+    file beyond that. Every chunk written updates a sha256 digest and the byte count,
+    so neither the hash nor the size needs another pass over the file or the server.
+    """
+
+    def __init__(self, suffix='', max_memory=DOWNLOAD_SPOOL_SIZE):
+        self.suffix = suffix
+        self.max_memory = max_memory
+        self.size = 0
+        self.path = None
+        self._file = io.BytesIO()
+        self._digest = hashlib.sha256()
+
+    def write(self, data):
+        if self.path is None and self.size + len(data) > self.max_memory:
+            self._spill()
+        self._file.write(data)
+        self._digest.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def _spill(self):
+        spill = tempfile.NamedTemporaryFile(delete=False, suffix=self.suffix)
+        spill.write(self._file.getvalue())
+        self._file = spill
+        self.path = spill.name
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def reset(self):
+        """Drop the content received so far, to download the file again from the start"""
+        self.close()
+        self.size = 0
+        self.path = None
+        self._file = io.BytesIO()
+        self._digest = hashlib.sha256()
+
+    def save_to(self, path):
+        """Copy the content received so far to path, leaving the buffer ready for more writes"""
+        source = self.open()
+        with open(path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        source.seek(0, os.SEEK_END)
+
+    def is_zip(self):
+        """Tell whether the content ends with a valid zip directory (a complete xlsx)"""
+        source = self.open()
+        try:
+            return zipfile.is_zipfile(source)
+        finally:
+            source.seek(0, os.SEEK_END)
+
+    def open(self):
+        """Rewind and return the binary file object holding the content"""
+        self._file.flush()
+        self._file.seek(0)
+        return self._file
+
+    def ensure_path(self):
+        """Path of the content on disk, for readers that need one (spills if still in memory)"""
+        if self.path is None:
+            self._spill()
+        self._file.flush()
+        return self.path
+
+    def close(self):
+        """Release the memory buffer and remove the spill file, if any"""
+        try:
+            self._file.close()
+            if self.path and os.path.exists(self.path):
+                os.unlink(self.path)
+        except Exception as e:
+            _logger.warning(f"Failed to clean up temporary file {self.path}: {str(e)}")
+
+
+class ConnectionPool:
+    """
+    Authenticated FTP/SFTP/SCP sessions kept alive between runs of a worker.
+
+    Sessions are keyed by (database, ftp.config id) and only reused when the config's
+    connection settings still match, the session is younger than its max age, has not
+    been idle longer than its idle timeout and passes a health check.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def acquire(self, key, fingerprint, max_age):
+        """Take an idle session for the key out of the pool, or None"""
+        self._evict_expired()
+        while True:
+            with self._lock:
+                sessions = self._idle.get(key)
+                if not sessions:
+                    return None
+                connection_info = sessions.pop()
+            expired = time.monotonic() - connection_info['created_at'] > max_age
+            if connection_info['fingerprint'] == fingerprint and not expired and _connection_is_healthy(connection_info):
+                return connection_info
+            _close_connection_info(connection_info)
+
+    def release(self, connection_info):
+        """Put a session back in the pool"""
+        connection_info['released_at'] = time.monotonic()
+        with self._lock:
+            self._idle.setdefault(connection_info['key'], []).append(connection_info)
+        self._evict_expired()
+
+    def _evict_expired(self):
+        """Close sessions idle for longer than their idle timeout"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, sessions in list(self._idle.items()):
+                keep = []
+                for connection_info in sessions:
+                    if now - connection_info['released_at'] > connection_info['idle_timeout']:
+                        expired.append(connection_info)
+                    else:
+                        keep.append(connection_info)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+        for connection_info in expired:
+            _close_connection_info(connection_info)
+
+
+_connection_pool = ConnectionPool()
+
 class FtpService(models.Model):
     _name = 'ftp.service'
     _description = 'FTP Service Operations'
 
     def _get_ftp_connection(self, config):
+        """Get an FTP/SFTP connection for the config, reusing a pooled session when possible"""
+        key = (config.dbname, config.id)
+        connection_info = _connection_pool.acquire(key, self._connection_fingerprint(config), config.connection_max_age)
+        if connection_info:
+            _logger.info(f"Reusing pooled {connection_info['type'].upper()} connection for {config.name}")
+            return connection_info
+
+        connection_info = self._open_connection(config)
+        connection_info.update({
+            'key': key,
+            'fingerprint': self._connection_fingerprint(config),
+            'created_at': time.monotonic(),
+            'idle_timeout': config.connection_idle_timeout,
+        })
+        return connection_info
+
+    def _connection_fingerprint(self, config):
+        """Settings a pooled session must match to be reused for a config"""
+        return (config.host, config.port, config.username, config.password, config.connection_type, config.use_tls)
+
+    def _open_connection(self, config):
         """Establish FTP/SFTP connection"""
         ftp = None
         ssh = None
@@ -50,49 +337,13 @@ class FtpService(models.Model):
                 if config.connection_type == 'sftp':
                     ftp = ssh.open_sftp()
                     _logger.info(f"✓ SFTP session opened for user {config.username}")
-                    
-                    # Test basic SFTP commands
-                    try:
-                        _logger.info("Testing SFTP pwd command")
-                        current_dir = ftp.getcwd() or '/'
-                        _logger.info(f"✓ Current SFTP directory: {current_dir}")
-                    except Exception as pwd_error:
-                        _logger.warning(f"SFTP pwd command failed: {str(pwd_error)}")
-                    
-                    try:
-                        _logger.info("Testing SFTP dir listing")
-                        file_list = ftp.listdir('.')
-                        _logger.info(f"✓ SFTP dir listing successful: {len(file_list)} items")
-                    except Exception as list_error:
-                        _logger.warning(f"SFTP listdir command failed: {str(list_error)}")
-                    
+
                     _logger.info("✓ Connected to SFTP successfully")
                     return {'connection': ftp, 'ssh': ssh, 'type': 'sftp'}
                 
                 elif config.connection_type == 'scp':
                     _logger.info(f"✓ SCP session ready for user {config.username}")
-                    
-                    # Test basic SCP commands via SSH
-                    try:
-                        _logger.info("Testing SCP pwd command")
-                        stdin, stdout, stderr = ssh.exec_command('pwd')
-                        current_dir = stdout.read().decode().strip()
-                        _logger.info(f"✓ Current SCP directory: {current_dir}")
-                    except Exception as pwd_error:
-                        _logger.warning(f"SCP pwd command failed: {str(pwd_error)}")
-                    
-                    try:
-                        _logger.info("Testing SCP dir listing")
-                        stdin, stdout, stderr = ssh.exec_command(f'ls -la {config.download_path}')
-                        result = stdout.read().decode().strip()
-                        if result:
-                            file_count = len(result.split('\n')) - 1  # Exclude header line
-                            _logger.info(f"✓ SCP dir listing successful: {file_count} items")
-                        else:
-                            _logger.info("✓ SCP dir listing successful: empty directory")
-                    except Exception as list_error:
-                        _logger.warning(f"SCP dir listing command failed: {str(list_error)}")
-                    
+
                     _logger.info("✓ Connected to SCP successfully")
                     return {'connection': None, 'ssh': ssh, 'type': 'scp'}
             
@@ -117,23 +368,11 @@ class FtpService(models.Model):
                     _logger.info("Setting up TLS protection")
                     ftp.prot_p()
                     _logger.info("✓ FTP TLS protection enabled")
-                
-                # Test basic FTP commands
-                try:
-                    _logger.info("Testing FTP pwd command")
-                    current_dir = ftp.pwd()
-                    _logger.info(f"✓ Current FTP directory: {current_dir}")
-                except Exception as pwd_error:
-                    _logger.warning(f"FTP pwd command failed: {str(pwd_error)}")
-                
-                try:
-                    _logger.info("Testing FTP dir listing")
-                    ftp.retrlines('LIST', lambda x: _logger.info(f"FTP LIST: {x}"))
-                except Exception as list_error:
-                    _logger.warning(f"FTP LIST command failed: {str(list_error)}")
-                
+
+                # Remember the login directory so a pooled session can be reset to it
+                home = ftp.pwd()
                 _logger.info("✓ Connected to FTP successfully")
-                return {'connection': ftp, 'ssh': None, 'type': 'ftp'}
+                return {'connection': ftp, 'ssh': None, 'type': 'ftp', 'home': home}
             
         except ftplib.error_perm as perm_error:
             error_msg = f"FTP Permission Error: {str(perm_error)}"
@@ -204,140 +443,471 @@ class FtpService(models.Model):
                     pass
             raise UserError(error_msg)
     
-    def _download_file(self, connection_info, remote_filename, local_path, config):
-        """Download file from FTP/SFTP/SCP to local path"""
+    def _download_file(self, connection_info, remote_filename, writer, config, offset=0):
+        """
+        Download file from FTP/SFTP/SCP into writer, starting at byte offset.
+
+        writer is any object with a write method, normally a DownloadBuffer that hashes
+        and counts the chunks as they arrive and is handed to the parser afterwards.
+        A non-zero offset resumes an interrupted transfer (REST on FTP, a seek on the
+        SFTP channel for SFTP and SCP).
+        """
         try:
-            _logger.info(f"Starting download of file: {remote_filename}")
-            
-            if connection_info['type'] == 'scp':
-                # Use SCP command via SSH
-                ssh = connection_info['ssh']
-                remote_path = f"{config.download_path}/{remote_filename}".replace('//', '/')
-                
-                # Use SCP via paramiko
-                scp = ssh.open_sftp()
-                scp.get(remote_path, local_path)
-                scp.close()
-                _logger.info(f"Successfully downloaded file via SCP: {remote_filename}")
-                return True
-                
-            elif connection_info['type'] == 'sftp':
-                # Use SFTP
-                sftp = connection_info['connection']
+            _logger.info(f"Starting download of file: {remote_filename}"
+                         + (f" from byte {offset}" if offset else ""))
+
+            if connection_info['type'] in ['sftp', 'scp']:
+                # SCP transfers go through the SFTP channel shared by the whole run
+                sftp = connection_info['connection'] if connection_info['type'] == 'sftp' \
+                    else self._get_scp_channel(connection_info)
                 remote_path = f"{config.download_path}/{remote_filename}".replace('//', '/')
-                sftp.get(remote_path, local_path)
-                _logger.info(f"Successfully downloaded file via SFTP: {remote_filename}")
-                return True
-                
+                if offset:
+                    with sftp.open(remote_path, 'rb') as remote_file:
+                        remote_file.seek(offset)
+                        remote_file.prefetch(sftp.stat(remote_path).st_size)
+                        shutil.copyfileobj(remote_file, writer, DOWNLOAD_CHUNK_SIZE)
+                else:
+                    sftp.getfo(remote_path, writer)
+                _logger.info(f"Successfully downloaded file via {connection_info['type'].upper()}: {remote_filename}")
+
             else:
                 # Use FTP
                 ftp = connection_info['connection']
-                with open(local_path, 'wb') as local_file:
-                    ftp.retrbinary(f'RETR {remote_filename}', local_file.write)
+                ftp.retrbinary(f'RETR {remote_filename}', writer.write, rest=offset or None)
                 _logger.info(f"Successfully downloaded file via FTP: {remote_filename}")
-                return True
+
+            return True
                 
         except Exception as e:
             _logger.error(f"Failed to download {remote_filename}: {str(e)}")
             return False
+
+    def _get_remote_size(self, connection_info, remote_filename, config):
+        """Current size in bytes of a remote file, or None when the server does not tell"""
+        try:
+            if connection_info['type'] in ['sftp', 'scp']:
+                sftp = connection_info['connection'] if connection_info['type'] == 'sftp' \
+                    else self._get_scp_channel(connection_info)
+                return sftp.stat(f"{config.download_path}/{remote_filename}".replace('//', '/')).st_size
+            ftp = connection_info['connection']
+            ftp.voidcmd('TYPE I')
+            return ftp.size(remote_filename)
+        except Exception as e:
+            _logger.info(f"Could not get the remote size of {remote_filename}: {str(e)}")
+            return None
+
+    def _download_with_retry(self, connection_info, entry, buffer, config):
+        """
+        Download a listed file into buffer, resuming and retrying until it is complete.
+
+        Content left by an interrupted earlier run (same config, name, size and mtime)
+        is loaded first. After each transfer the buffer size is checked against the
+        listed size (or a fresh one, when unknown or changed since the listing), and an
+        xlsx whose size cannot be checked must at least be a valid zip. Failed or short
+        transfers are resumed from the bytes already in the buffer after a growing
+        delay, reconnecting when the session died; content larger than the remote file
+        is discarded. What a last failed attempt leaves is cached for the next run.
+
+        :return: dict with ok, attempts, resumed (bytes not downloaded again), verified and error
+        """
+        filename = entry['name']
+        result = {'ok': False, 'attempts': 0, 'resumed': 0, 'verified': False, 'error': None}
+        partial_path = _partial_download_path(config, entry)
+        if partial_path and os.path.exists(partial_path):
+            with open(partial_path, 'rb') as partial:
+                shutil.copyfileobj(partial, buffer, DOWNLOAD_CHUNK_SIZE)
+            _logger.info(f"Resuming {filename} from a previous run at byte {buffer.size}")
+
+        delay = config.download_retry_delay
+        while result['attempts'] < config.download_attempts:
+            if result['attempts']:
+                _logger.info(f"Retrying download of {filename} in {delay}s: {result['error']}")
+                time.sleep(delay)
+                delay *= 2
+                try:
+                    self._ensure_download_session(connection_info, config)
+                except Exception as e:
+                    result['error'] = f"Reconnection failed: {str(e)}"
+                    result['attempts'] += 1
+                    continue
+
+            result['attempts'] += 1
+            result['resumed'] = buffer.size
+            if not self._download_file(connection_info, filename, buffer, config, offset=buffer.size):
+                result['error'] = f"Download failed for file: {filename}"
+                continue
+
+            remote_size = entry['size']
+            if remote_size is None or remote_size != buffer.size:
+                remote_size = self._get_remote_size(connection_info, filename, config)
+            if remote_size is None:
+                if filename.lower().endswith('.xlsx') and not buffer.is_zip():
+                    result['error'] = f"Downloaded {filename} is not a complete xlsx file"
+                    buffer.reset()
+                    continue
+            elif buffer.size < remote_size:
+                result['error'] = f"Short transfer of {filename}: {buffer.size} of {remote_size} bytes"
+                continue
+            elif buffer.size > remote_size:
+                result['error'] = f"Downloaded {buffer.size} bytes of {filename} but the server reports " \
+                                  f"{remote_size}, downloading it again"
+                buffer.reset()
+                continue
+            result.update(ok=True, verified=remote_size is not None, error=None)
+            break
+
+        if partial_path:
+            try:
+                if result['ok']:
+                    if os.path.exists(partial_path):
+                        os.unlink(partial_path)
+                elif buffer.size:
+                    os.makedirs(PARTIAL_DOWNLOAD_DIR, exist_ok=True)
+                    _purge_partial_downloads()
+                    buffer.save_to(partial_path)
+                    _logger.info(f"Kept {buffer.size} bytes of {filename} to resume on the next run")
+            except OSError as e:
+                _logger.warning(f"Failed to update the partial download of {filename}: {str(e)}")
+        return result
+
+    def _ensure_download_session(self, connection_info, config):
+        """
+        Make a session usable again for downloads, reconnecting in place when it died, so
+        every holder of connection_info gets the new one; FTP sessions are put back in the
+        download directory, as transfers use names relative to it
+        """
+        if not _connection_is_healthy(connection_info):
+            _logger.info(f"Reconnecting to {config.host} for {config.name}")
+            _close_connection_info(connection_info)
+            connection_info.pop('sftp', None)
+            connection_info.update(self._open_connection(config), created_at=time.monotonic())
+        if connection_info['type'] in ['ftp', 'ftps']:
+            connection_info['connection'].cwd(config.download_path)
     
     def _process_excel_file(self, file_path):
         """Process Excel file and return content as dictionary with first row as keys"""
+        content = {}
+        for sheet_name, headers, rows in self._iter_file_batches(file_path):
+            content.setdefault(sheet_name, []).extend(rows)
+        _logger.info(f"Successfully processed Excel file with {len(content)} sheets")
+        return content
+
+    def _iter_file_batches(self, source, read_options=None, batch_size=PARSE_BATCH_SIZE, filename=None):
+        """
+        Stream a spreadsheet, CSV, TXT or XML file as (sheet_name, headers, rows) batches.
+
+        Rows are dicts keyed by the header row, like _process_excel_file, but at most
+        batch_size rows are held in memory at a time. Empty sheets yield one empty batch
+        so they are still reported. source is a local path or a DownloadBuffer, read in
+        place without going through disk again; filename (defaulting to the path) gives
+        the extension and the sheet name of text files. read_options ({'extension',
+        'delimiter', 'encoding'}, see ftp.file.type._get_read_options) drive the text
+        readers; the extension defaults to the file suffix.
+        """
+        options = dict(read_options or {})
+        buffered = isinstance(source, DownloadBuffer)
+        filename = filename or source
+        extension = options.get('extension') or os.path.splitext(filename)[1].lstrip('.').lower()
+        sheet_name = os.path.splitext(os.path.basename(filename))[0]
         try:
-            _logger.info(f"Processing Excel file: {file_path}")
-            # Try to read with openpyxl first (better for .xlsx)
-            if file_path.endswith('.xlsx'):
-                workbook = openpyxl.load_workbook(file_path, read_only=True)
-                content = {}
-                
-                for sheet_name in workbook.sheetnames:
-                    sheet = workbook[sheet_name]
-                    rows = list(sheet.iter_rows(values_only=True))
-                    
-                    if not rows:
-                        _logger.warning(f"Sheet {sheet_name} is empty")
-                        content[sheet_name] = []
-                        continue
-                    
-                    # Get headers from first row
-                    headers = []
-                    for cell in rows[0]:
-                        if cell is None:
-                            headers.append("")
-                        else:
-                            headers.append(str(cell))
-                    
-                    # Process data rows (skip first row which contains headers)
-                    sheet_data = []
-                    for row in rows[1:]:
-                        row_dict = {}
-                        for i, cell in enumerate(row):
-                            # Use header as key, or fallback to column index
-                            key = headers[i] if i < len(headers) else f"column_{i}"
-                            
-                            # Convert cell value
-                            if cell is None:
-                                value = ""
-                            elif isinstance(cell, datetime):
-                                value = cell.isoformat()
-                            else:
-                                value = str(cell)
-                            
-                            row_dict[key] = value
-                        
-                        # Only add non-empty rows
-                        if any(value.strip() for value in row_dict.values() if isinstance(value, str)):
-                            sheet_data.append(row_dict)
-                    
-                    content[sheet_name] = sheet_data
-                    _logger.info(f"Sheet {sheet_name}: {len(sheet_data)} rows processed with headers: {headers}")
-                
-                workbook.close()
-                _logger.info(f"Successfully processed Excel file with {len(content)} sheets")
-                return content
-            
-            # Fallback to pandas for .xls files
+            _logger.info(f"Processing {extension.upper()} file: {filename}")
+            size = source.size if buffered else os.path.getsize(source)
+            parallel_min_kb = options.get('parallel_min_kb') or 0
+            if extension == 'xlsx' and parallel_min_kb and size >= parallel_min_kb * 1024:
+                # Worker processes open the workbook by path
+                batches = self._iter_xlsx_parallel_batches(
+                    source.ensure_path() if buffered else source, batch_size
+                )
             else:
-                excel_file = pd.ExcelFile(file_path)
-                content = {}
-                
-                for sheet_name in excel_file.sheet_names:
-                    df = pd.read_excel(file_path, sheet_name=sheet_name)
-                    
-                    if df.empty:
-                        _logger.warning(f"Sheet {sheet_name} is empty")
-                        content[sheet_name] = []
-                        continue
-                    
-                    # Replace NaN with empty strings
-                    df = df.fillna('')
-                    
-                    # Convert DataFrame to list of dictionaries
-                    sheet_data = []
-                    for _, row in df.iterrows():
-                        row_dict = {}
-                        for column in df.columns:
-                            value = row[column]
-                            if isinstance(value, pd.Timestamp):
-                                value = value.isoformat()
-                            else:
-                                value = str(value)
-                            row_dict[str(column)] = value
-                        
-                        # Only add non-empty rows
-                        if any(value.strip() for value in row_dict.values() if isinstance(value, str)):
-                            sheet_data.append(row_dict)
-                    
-                    content[sheet_name] = sheet_data
-                    _logger.info(f"Sheet {sheet_name}: {len(sheet_data)} rows processed with headers: {list(df.columns)}")
-                
-                _logger.info(f"Successfully processed Excel file with {len(content)} sheets")
-                return content
-                
+                fileobj = source.open() if buffered else source
+                if extension == 'xlsx':
+                    batches = self._iter_xlsx_batches(fileobj, batch_size)
+                elif extension in ('csv', 'txt'):
+                    batches = self._iter_csv_batches(
+                        fileobj, batch_size, options.get('delimiter'), options.get('encoding'), sheet_name
+                    )
+                elif extension == 'xml':
+                    batches = self._iter_xml_batches(fileobj, batch_size, options.get('encoding'), sheet_name)
+                else:
+                    # Fallback to pandas for .xls files
+                    batches = self._iter_xls_batches(fileobj, batch_size)
+            yield from batches
         except Exception as e:
-            _logger.error(f"Failed to process Excel file {file_path}: {str(e)}")
-            raise UserError(f"Failed to process Excel file: {str(e)}")
-    
+            _logger.error(f"Failed to process file {filename}: {str(e)}")
+            raise UserError(f"Failed to process file: {str(e)}")
+
+    def _iter_xlsx_batches(self, source, batch_size):
+        """Stream .xlsx rows straight from openpyxl read-only mode (path or binary file object)"""
+        workbook = openpyxl.load_workbook(source, read_only=True)
+        try:
+            for sheet_name in workbook.sheetnames:
+                sheet = workbook[sheet_name]
+                row_iter = sheet.iter_rows(values_only=True)
+                first_row = next(row_iter, None)
+                if first_row is None:
+                    _logger.warning(f"Sheet {sheet_name} is empty")
+                    yield sheet_name, [], []
+                    continue
+
+                # Get headers from first row
+                headers = ["" if cell is None else str(cell) for cell in first_row]
+                row_count = 0
+                batch = []
+                for row in row_iter:
+                    row_dict = self._row_to_dict(headers, row)
+                    if row_dict:
+                        batch.append(row_dict)
+                    if len(batch) >= batch_size:
+                        row_count += len(batch)
+                        yield sheet_name, headers, batch
+                        batch = []
+                row_count += len(batch)
+                if batch or not row_count:
+                    yield sheet_name, headers, batch
+                _logger.info(f"Sheet {sheet_name}: {row_count} rows processed with headers: {headers}")
+        finally:
+            workbook.close()
+
+    def _iter_xlsx_parallel_batches(self, file_path, batch_size):
+        """
+        Parse the sheets of a large .xlsx concurrently in a process pool.
+
+        openpyxl parsing is CPU bound, so each sheet is parsed by a worker process (no
+        ORM or cursor is used there) and sent back as compact tuples; batches are then
+        yielded in sheet order like _iter_xlsx_batches. Workers are spawned rather than
+        forked, since the fetch threads are alive while files are parsed. At most
+        parse_processes sheets are parsed ahead of the one being yielded, so memory is
+        bounded by that many sheets. Single-sheet workbooks are parsed serially.
+        """
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        sheet_names = list(workbook.sheetnames)
+        workbook.close()
+        if len(sheet_names) < 2:
+            yield from self._iter_xlsx_batches(file_path, batch_size)
+            return
+
+        params = self.env['ir.config_parameter'].sudo()
+        processes = min(max(int(params.get_param('ftp_cuenta_cliente.parse_processes', PARSE_PROCESSES)), 1),
+                        len(sheet_names))
+        _logger.info(f"Parsing {len(sheet_names)} sheets of {file_path} with {processes} processes")
+        with ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+            # A stdlib function, so the spawned child can run it before importing the worker
+            initializer=site.addsitedir, initargs=(XLSX_WORKER_DIR,),
+        ) as pool:
+            pending_names = iter(sheet_names)
+            in_flight = deque(
+                (sheet_name, pool.submit(_xlsx_worker.parse_sheet, file_path, sheet_name))
+                for sheet_name in itertools.islice(pending_names, processes)
+            )
+            while in_flight:
+                sheet_name, future = in_flight.popleft()
+                headers, rows = future.result()
+                next_name = next(pending_names, None)
+                if next_name is not None:
+                    in_flight.append((next_name, pool.submit(_xlsx_worker.parse_sheet, file_path, next_name)))
+                if headers is None:
+                    _logger.warning(f"Sheet {sheet_name} is empty")
+                    yield sheet_name, [], []
+                    continue
+                row_count = 0
+                for start in range(0, len(rows), batch_size):
+                    batch = [
+                        row_dict for row_dict in (
+                            self._row_to_dict(headers, row) for row in rows[start:start + batch_size]
+                        ) if row_dict
+                    ]
+                    row_count += len(batch)
+                    yield sheet_name, headers, batch
+                if not rows:
+                    yield sheet_name, headers, []
+                _logger.info(f"Sheet {sheet_name}: {row_count} rows processed with headers: {headers}")
+                rows = None
+
+    def _iter_xls_batches(self, source, batch_size):
+        """Read .xls sheets one at a time with pandas and yield them in row batches"""
+        excel_file = pd.ExcelFile(source)
+        for sheet_name in excel_file.sheet_names:
+            # xlrd has no streaming mode, so memory is bounded per sheet here
+            df = excel_file.parse(sheet_name)
+            if df.empty:
+                _logger.warning(f"Sheet {sheet_name} is empty")
+                yield sheet_name, [str(column) for column in df.columns], []
+                continue
+            yield from self._iter_dataframe_batches(sheet_name, df.fillna(''), batch_size)
+            _logger.info(f"Sheet {sheet_name}: {len(df)} rows read with headers: {list(df.columns)}")
+
+    def _iter_csv_batches(self, source, batch_size, delimiter=None, encoding=None, sheet_name=None):
+        """Stream a delimited text file (.csv/.txt) with the csv module, one line at a time"""
+        from_path = isinstance(source, str)
+        sheet_name = sheet_name or os.path.splitext(os.path.basename(source))[0]
+        delimiter = {'\\t': '\t', 'tab': '\t'}.get((delimiter or ',').lower(), delimiter or ',')
+        # utf-8-sig also strips the BOM spreadsheet exports put before the header
+        encoding = 'utf-8-sig' if (encoding or 'utf-8') == 'utf-8' else encoding
+        if from_path:
+            text_file = open(source, newline='', encoding=encoding, errors='replace')
+        else:
+            text_file = io.TextIOWrapper(source, newline='', encoding=encoding, errors='replace')
+        try:
+            reader = csv.reader(text_file, delimiter=delimiter)
+            first_row = next(reader, None)
+            if first_row is None:
+                _logger.warning(f"File {sheet_name} is empty")
+                yield sheet_name, [], []
+                return
+            headers = [header.strip() for header in first_row]
+            row_count = 0
+            batch = []
+            for row in reader:
+                row_dict = self._row_to_dict(headers, row)
+                if row_dict:
+                    batch.append(row_dict)
+                if len(batch) >= batch_size:
+                    row_count += len(batch)
+                    yield sheet_name, headers, batch
+                    batch = []
+            row_count += len(batch)
+            if batch or not row_count:
+                yield sheet_name, headers, batch
+            _logger.info(f"File {sheet_name}: {row_count} rows read with headers: {headers}")
+        finally:
+            if from_path:
+                text_file.close()
+            else:
+                # Leave the buffer open, its DownloadBuffer owns it
+                text_file.detach()
+
+    def _iter_xml_batches(self, source, batch_size, encoding=None, sheet_name=None):
+        """
+        Stream an XML file whose root element holds one element per row.
+
+        Each row element becomes a dict of its attributes and the text of its child
+        elements (tag names without namespace). Elements are freed as soon as they are
+        read, and entities are neither resolved nor fetched from the network.
+        """
+        sheet_name = sheet_name or os.path.splitext(os.path.basename(source))[0]
+        headers = []
+        seen = set()
+        row_count = 0
+        batch = []
+        depth = 0
+        for event, element in etree.iterparse(
+            source, events=('start', 'end'), encoding=encoding,
+            resolve_entities=False, no_network=True, remove_comments=True
+        ):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            row = {etree.QName(key).localname: value for key, value in element.attrib.items()}
+            for child in element:
+                if isinstance(child.tag, str):
+                    row[etree.QName(child).localname] = (child.text or '').strip()
+            for key in row:
+                if key not in seen:
+                    seen.add(key)
+                    headers.append(key)
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+            if any(str(value).strip() for value in row.values()):
+                batch.append(row)
+            if len(batch) >= batch_size:
+                row_count += len(batch)
+                yield sheet_name, list(headers), batch
+                batch = []
+        row_count += len(batch)
+        if batch or not row_count:
+            yield sheet_name, list(headers), batch
+        _logger.info(f"File {sheet_name}: {row_count} rows read with headers: {headers}")
+
+    def _iter_dataframe_batches(self, sheet_name, df, batch_size):
+        """Yield row dict batches from a DataFrame whose NaN values are already filled"""
+        headers = [str(column) for column in df.columns]
+        for start in range(0, len(df), batch_size):
+            batch = []
+            for row in df.iloc[start:start + batch_size].itertuples(index=False, name=None):
+                row_dict = self._row_to_dict(headers, row)
+                if row_dict:
+                    batch.append(row_dict)
+            yield sheet_name, headers, batch
+
+    def _row_to_dict(self, headers, row):
+        """Convert a row of cell values to a dict keyed by header, or None if the row is empty"""
+        row_dict = {}
+        for i, cell in enumerate(row):
+            # Use header as key, or fallback to column index
+            key = headers[i] if i < len(headers) else f"column_{i}"
+
+            row_dict[key] = _cell_to_str(cell)
+
+        # Only return non-empty rows
+        if any(value.strip() for value in row_dict.values()):
+            return row_dict
+        return None
+
+    def _stream_file_content(self, file_record, batches, process=True):
+        """
+        Feed parsed (sheet_name, headers, rows) batches to storage and the sale order processor.
+
+        Each batch is written to the file content and handed to the processor as soon as
+        it is parsed, so peak memory depends on the batch size instead of the file size.
+        Parsing errors are re-raised after the processor has finished with the rows it got.
+        With process=False the content is only stored (the processing job queue runs it later).
+        """
+        writer = ContentWriter()
+        state = {'complete': False, 'error': None}
+        stats = getattr(self, 'run_stats', None)
+
+        def tee_batches():
+            try:
+                parse_started = time.monotonic()
+                for sheet_name, headers, rows in batches:
+                    if stats:
+                        stats.add('parse', time.monotonic() - parse_started, rows=len(rows))
+                    writer.add_rows(sheet_name, rows)
+                    yield sheet_name, rows
+                    parse_started = time.monotonic()
+                state['complete'] = True
+            except Exception as e:
+                state['error'] = e
+                raise
+
+        tee = tee_batches()
+        if not process:
+            for _batch in tee:
+                pass
+            with self._run_stage('store'):
+                file_record.set_content_from_writer(writer)
+            return writer
+
+        try:
+            processor = self.env['sale.order.processor']
+            processor.run_stats = stats
+            results = processor.process_ftp_file_to_sale_order(file_record.id, row_batches=tee)
+            _logger.info(f"Sale order processor completed for {file_record.name}. Final orders created: {results.get('orders_created', 0)}")
+        except Exception as proc_error:
+            _logger.warning(f"Sale order processor failed for {file_record.name}: {str(proc_error)}")
+            # Don't fail the main process if processor fails
+
+        if state['error']:
+            raise state['error']
+        if not state['complete']:
+            # The processor stopped early: keep parsing so the whole content is stored
+            for _batch in tee:
+                pass
+
+        with self._run_stage('store'):
+            file_record.set_content_from_writer(writer)
+        return writer
+
+    def _run_stage(self, name, **values):
+        """Time a block as a stage of the current ftp.run (no-op outside process_ftp_files)"""
+        stats = getattr(self, 'run_stats', None)
+        return stats.stage(name, **values) if stats else nullcontext()
+
     def _move_file_on_connection(self, connection_info, filename, new_path, config):
         """Move file based on connection type"""
         try:
@@ -382,554 +952,611 @@ class FtpService(models.Model):
             _logger.error(f"Failed to move file from {filename} to {new_path}: {str(e)}")
             return False
     
-    def _get_file_size(self, connection_info, filename, config):
-        """Get file size from connection"""
+    def _get_scp_channel(self, connection_info):
+        """Return the SFTP channel used for SCP transfers, opening it on first use"""
+        if not connection_info.get('sftp'):
+            connection_info['sftp'] = connection_info['ssh'].open_sftp()
+        return connection_info['sftp']
+
+    def _close_connection(self, connection_info, discard=False):
+        """Release a connection back to the pool, or close it when discarded or not pooled"""
+        if not discard and connection_info.get('key'):
+            _connection_pool.release(connection_info)
+            _logger.info(f"Connection returned to pool")
+            return
+        _close_connection_info(connection_info)
+    
+    @api.model
+    def process_ftp_files(self, config_id=None, due_only=False):
+        """
+        Main method to process FTP files.
+
+        Connecting, listing and downloading run concurrently for several configs in a
+        bounded thread pool (with a per-host limit); each config's downloaded files are
+        then parsed and turned into orders here, in the caller's cursor, as soon as its
+        fetch finishes. With due_only, only the configs whose next poll has come are
+        fetched (see ftp.config._get_poll_schedule).
+
+        With a pipeline_depth, the fetch threads hand over each file as soon as it is
+        downloaded and go on downloading the next ones (up to pipeline_depth ahead) while
+        this thread processes it, so slow servers overlap with parsing and order creation.
+        """
+        if config_id:
+            configs = self.env['ftp.config'].browse(config_id)
+        elif due_only:
+            configs = self.env['ftp.config']._get_due_configs()
+        else:
+            configs = self.env['ftp.config'].search([('active', '=', True)])
+        if not configs:
+            return
+
+        processed_names = self._get_processed_file_names(configs)
+        manifests = self._get_manifests(configs.filtered(lambda c: c.sync_mode == 'incremental'))
+        skipped_duplicates = self._get_skipped_duplicates(configs)
+        snapshots = [
+            self._snapshot_config(
+                config, processed_names.get(config.id, set()), manifests.get(config.id, {}),
+                skipped_duplicates.get(config.id, {})
+            )
+            for config in configs
+        ]
+
+        params = self.env['ir.config_parameter'].sudo()
+        max_workers = max(int(params.get_param('ftp_cuenta_cliente.fetch_workers', 4)), 1)
+        per_host_limit = max(int(params.get_param('ftp_cuenta_cliente.fetch_per_host', 2)), 1)
+        host_slots = {
+            snapshot.host: threading.BoundedSemaphore(per_host_limit)
+            for snapshot in snapshots
+        }
+
+        events = queue.Queue()
+        fetches = [self._new_fetch(snapshot) for snapshot in snapshots]
         try:
-            if connection_info['type'] == 'sftp':
-                sftp = connection_info['connection']
-                remote_path = f"{config.download_path}/{filename}".replace('//', '/')
-                stat = sftp.stat(remote_path)
-                size = stat.st_size / 1024  # Convert to KB
-                _logger.info(f"File {filename} size: {size:.2f} KB")
-                return size
-            elif connection_info['type'] == 'scp':
-                ssh = connection_info['ssh']
-                remote_path = f"{config.download_path}/{filename}".replace('//', '/')
-                stdin, stdout, stderr = ssh.exec_command(f'stat -c%s {remote_path}')
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(snapshots)), thread_name_prefix='ftp_fetch') as executor:
+                for snapshot, fetch in zip(snapshots, fetches):
+                    executor.submit(self._fetch_config_files, snapshot, host_slots[snapshot.host], fetch, events)
+                try:
+                    remaining = len(fetches)
+                    while remaining:
+                        kind, fetch, downloaded = events.get()
+                        config = configs.browse(fetch['config_id'])
+                        if kind == 'file':
+                            self._process_pipelined_file(config, fetch, downloaded)
+                        else:
+                            remaining -= 1
+                            self._process_fetched_files(config, fetch)
+                finally:
+                    # Unblock fetches still waiting for a pipeline slot if processing stopped early
+                    for fetch in fetches:
+                        fetch['cancelled'] = True
+                        if fetch['ahead']:
+                            fetch['ahead'].release()
+        finally:
+            for fetch in fetches:
+                for downloaded in fetch['files']:
+                    downloaded['buffer'].close()
+                # Sessions of fetches that were never finished (processing raised) are closed,
+                # not pooled: their remote moves may have stopped halfway
+                if fetch['connection_info']:
+                    self._close_connection(fetch['connection_info'], discard=True)
+                    fetch['connection_info'] = None
+
+    @api.model
+    def _get_processed_file_names(self, configs):
+        """Return {config_id: set of file names already processed} with a single query"""
+        processed = {}
+        for record in self.env['ftp.file'].search_read([
+            ('ftp_config_id', 'in', configs.ids),
+            ('status', 'in', ['processed', 'moved', 'duplicate'])
+        ], ['name', 'ftp_config_id']):
+            processed.setdefault(record['ftp_config_id'][0], set()).add(record['name'])
+        return processed
+
+    @api.model
+    def _get_manifests(self, configs):
+        """Return {config_id: {name: (size, mtime)}} for the manifests of incremental configs"""
+        manifests = {}
+        if not configs:
+            return manifests
+        for entry in self.env['ftp.file.manifest'].search_read(
+            [('ftp_config_id', 'in', configs.ids)], ['ftp_config_id', 'name', 'size', 'mtime']
+        ):
+            manifests.setdefault(entry['ftp_config_id'][0], {})[entry['name']] = (entry['size'], entry['mtime'])
+        return manifests
+
+    @api.model
+    def _get_skipped_duplicates(self, configs):
+        """Return {config_id: {name: (size, mtime)}} for the duplicates skipped without an ftp.file"""
+        skipped = {}
+        for entry in self.env['ftp.file.manifest'].search_read([
+            ('ftp_config_id', 'in', configs.ids),
+            ('duplicate_skipped', '=', True)
+        ], ['ftp_config_id', 'name', 'size', 'mtime']):
+            skipped.setdefault(entry['ftp_config_id'][0], {})[entry['name']] = (entry['size'], entry['mtime'])
+        return skipped
+
+    @api.model
+    def _snapshot_config(self, config, processed_names, manifest, skipped_duplicates):
+        """Copy the connection settings of a config into a plain object usable outside the ORM"""
+        params = self.env['ir.config_parameter'].sudo()
+        return SimpleNamespace(
+            dbname=self.env.cr.dbname,
+            id=config.id,
+            name=config.name,
+            host=config.host,
+            port=config.port,
+            username=config.username,
+            password=config.password,
+            connection_type=config.connection_type,
+            use_tls=config.use_tls,
+            download_path=config.download_path,
+            processed_path=config.processed_path,
+            processed_names=processed_names,
+            connection_idle_timeout=int(params.get_param('ftp_cuenta_cliente.connection_idle_timeout', CONNECTION_IDLE_TIMEOUT)),
+            connection_max_age=int(params.get_param('ftp_cuenta_cliente.connection_max_age', CONNECTION_MAX_AGE)),
+            sync_mode=config.sync_mode,
+            manifest=manifest,
+            skipped_duplicates=skipped_duplicates,
+            extensions=self.env['ftp.file.type']._get_import_extensions(),
+            spool_size=int(params.get_param('ftp_cuenta_cliente.download_spool_size', DOWNLOAD_SPOOL_SIZE)),
+            active_upload_window=int(params.get_param('ftp_cuenta_cliente.active_upload_window', ACTIVE_UPLOAD_WINDOW)),
+            pipeline_depth=int(params.get_param('ftp_cuenta_cliente.pipeline_depth', PIPELINE_DEPTH)),
+            download_attempts=max(int(params.get_param('ftp_cuenta_cliente.download_attempts', DOWNLOAD_ATTEMPTS)), 1),
+            download_retry_delay=float(params.get_param('ftp_cuenta_cliente.download_retry_delay', DOWNLOAD_RETRY_DELAY)),
+        )
+
+    def _list_remote_entries(self, connection_info, config):
+        """
+        List the files of the download directory as dicts with name, size (bytes) and mtime.
+
+        SFTP gets size and mtime from a single listdir_attr call, FTP uses MLSD and SCP a
+        single find, falling back to plain name listings (with size and mtime set to None)
+        when the server does not support them. Size and mtime are needed in every sync
+        mode, to recognise the duplicates skipped in earlier polls.
+        """
+        connection_type = connection_info['type']
+        entries = []
+        if connection_type == 'sftp':
+            sftp = connection_info['connection']
+            try:
+                sftp.chdir(config.download_path)
+                _logger.info(f"Changed to directory: {config.download_path}")
+            except Exception as e:
+                _logger.warning(f"Could not change to directory {config.download_path}: {str(e)}")
+
+            entries = [
+                {'name': attr.filename, 'size': attr.st_size, 'mtime': attr.st_mtime}
+                for attr in sftp.listdir_attr('.')
+            ]
+            _logger.info(f"Found {len(entries)} files in SFTP directory")
+
+        elif connection_type == 'scp':
+            ssh = connection_info['ssh']
+            stdin, stdout, stderr = ssh.exec_command(
+                f"find {config.download_path} -maxdepth 1 -type f -printf '%f\\t%s\\t%T@\\n'"
+            )
+            for line in stdout.read().decode().splitlines():
+                parts = line.split('\t')
+                if len(parts) == 3:
+                    entries.append({'name': parts[0], 'size': int(parts[1]), 'mtime': float(parts[2])})
+            if not entries:
+                stdin, stdout, stderr = ssh.exec_command(f'ls {config.download_path}')
                 result = stdout.read().decode().strip()
-                if result.isdigit():
-                    size = int(result) / 1024  # Convert to KB
-                    _logger.info(f"File {filename} size: {size:.2f} KB")
-                    return size
-                else:
-                    _logger.warning(f"Could not get file size for {filename}")
-                    return 0.0
+                if result:
+                    entries = [{'name': name, 'size': None, 'mtime': None} for name in result.split('\n')]
+            if entries:
+                _logger.info(f"Found {len(entries)} files in SCP directory")
             else:
-                # FTP
-                ftp = connection_info['connection']
-                size = ftp.size(filename) / 1024  # Convert to KB
-                _logger.info(f"File {filename} size: {size:.2f} KB")
-                return size
-        except Exception as e:
-            _logger.warning(f"Could not get file size for {filename}: {str(e)}")
-            return 0.0
-    
-    def _close_connection(self, connection_info):
-        """Close connection properly"""
-        try:
-            if connection_info['type'] in ['sftp', 'scp']:
-                if connection_info['connection']:
-                    connection_info['connection'].close()
-                if connection_info['ssh']:
-                    connection_info['ssh'].close()
+                _logger.info("No files found in SCP directory")
+
+        else:
+            # FTP/FTPS connection
+            ftp = connection_info['connection']
+            ftp.cwd(config.download_path)
+            _logger.info(f"Changed to directory: {config.download_path}")
+
+            try:
+                for name, facts in ftp.mlsd(facts=['type', 'size', 'modify']):
+                    if facts.get('type', 'file') != 'file':
+                        continue
+                    entries.append({
+                        'name': name,
+                        'size': int(facts['size']) if 'size' in facts else None,
+                        'mtime': self._parse_mlsd_time(facts.get('modify')),
+                    })
+            except ftplib.error_perm as e:
+                _logger.info(f"MLSD not supported, falling back to NLST: {str(e)}")
+                entries = []
             else:
-                if connection_info['connection']:
-                    connection_info['connection'].quit()
-            _logger.info(f"Connection closed successfully")
-        except Exception as e:
-            _logger.warning(f"Error closing connection: {str(e)}")
-    
-    def _create_sale_orders_from_content(self, content, filename):
-        """Create sale orders for each technician found in the file content"""
+                _logger.info(f"Found {len(entries)} files in FTP directory")
+                return entries
+
+            file_list = []
+            ftp.retrlines('NLST', file_list.append)
+            entries = [{'name': name, 'size': None, 'mtime': None} for name in file_list]
+            _logger.info(f"Found {len(entries)} files in FTP directory")
+
+        return entries
+
+    def _parse_mlsd_time(self, value):
+        """Convert an MLSD modify fact (YYYYMMDDHHMMSS[.sss], UTC) to epoch seconds"""
+        if not value:
+            return None
         try:
-            _logger.info(f"Creating sale orders from file: {filename}")
-            created_orders = []
-            
-            for sheet_name, sheet_data in content.items():
-                _logger.info(f"Processing sheet: {sheet_name} with {len(sheet_data)} rows")
-                
-                for row_idx, row_data in enumerate(sheet_data):
+            return datetime.strptime(value[:14], '%Y%m%d%H%M%S').replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            return None
+
+    def _needs_download(self, config, entry):
+        """
+        Tell whether a listed file is new or changed since it was last processed.
+
+        Duplicates skipped by the 'skip' policy leave no ftp.file, so in every sync mode
+        they are looked up in the manifest and only downloaded again once their size or
+        mtime change (they stay skipped when the listing has neither).
+        """
+        listed = (entry['size'], entry['mtime'])
+        if config.sync_mode == 'incremental' and None not in listed:
+            known = config.manifest.get(entry['name'])
+            if known:
+                return known != listed
+        skipped = config.skipped_duplicates.get(entry['name'])
+        if skipped:
+            return None not in listed and skipped != listed
+        return entry['name'] not in config.processed_names
+
+    def _new_fetch(self, config):
+        """State of one config's fetch, shared between its fetch thread and the processing side"""
+        return {
+            'config_id': config.id,
+            'connection_info': None,
+            'files': [],
+            'error': None,
+            'recent_upload': False,
+            'duration': 0.0,
+            'process_duration': 0.0,
+            'started_at': fields.Datetime.now(),
+            'clock': time.monotonic(),
+            'stats': RunStats(),
+            'run_stats': None,
+            'ahead': threading.Semaphore(config.pipeline_depth) if config.pipeline_depth > 0 else None,
+            'cancelled': False,
+        }
+
+    def _fetch_config_files(self, config, host_slot, fetch, events):
+        """
+        Connect, list and download the new files of one config.
+
+        Runs in a worker thread: it only touches the network and the plain config
+        snapshot, never the ORM. The connection is left open for the remote moves done
+        after processing. When the fetch has a pipeline ('ahead' slots), each downloaded
+        file is posted to events right away; downloads then use a second pooled session
+        when there are several files, so the moves done meanwhile on the first one never
+        share a session with them. A final 'done' event is always posted.
+        """
+        stats = fetch['stats']
+        started = time.monotonic()
+        download_connection = None
+        with host_slot:
+            try:
+                with stats.stage('connect'):
+                    fetch['connection_info'] = self._get_ftp_connection(config)
+                with stats.stage('list'):
+                    entries = self._list_remote_entries(fetch['connection_info'], config)
+
+                import_files = [entry for entry in entries if entry['name'].lower().endswith(config.extensions)]
+                upload_window_start = time.time() - config.active_upload_window * 60
+                fetch['recent_upload'] = any(
+                    entry['mtime'] is not None and entry['mtime'] >= upload_window_start for entry in import_files
+                )
+                _logger.info(f"Found {len(import_files)} {'/'.join(config.extensions)} files: "
+                             f"{[entry['name'] for entry in import_files]}")
+
+                pending = []
+                for entry in import_files:
+                    # Check if file already processed (and unchanged in incremental mode)
+                    if self._needs_download(config, entry):
+                        pending.append(entry)
+                    else:
+                        _logger.info(f"File {entry['name']} already processed, skipping")
+
+                pipelined = bool(fetch['ahead'])
+                connection_info = fetch['connection_info']
+                if pipelined and len(pending) > 1:
                     try:
-                        # Extract technician information from different possible column names
-                        technician_name = None
-                        technician_rut = None
-                        
-                        # Look for technician name in various possible columns
-                        for key in row_data.keys():
-                            key_lower = key.lower()
-                            if 'tecnico' in key_lower and not technician_name:
-                                technician_name = row_data[key]
-                            if 'rut' in key_lower and 'tecnico' in key_lower and not technician_rut:
-                                technician_rut = row_data[key]
-                            elif 'rut' in key_lower and not technician_rut and not 'cliente' in key_lower:
-                                technician_rut = row_data[key]
-                        
-                        # Skip if no technician found
-                        if not technician_name or not str(technician_name).strip():
-                            _logger.debug(f"No technician found in row {row_idx + 1}, skipping")
-                            continue
-                            
-                        technician_name = str(technician_name).strip()
-                        technician_rut = str(technician_rut).strip() if technician_rut else ''
-                        
-                        _logger.info(f"Processing technician: {technician_name} (RUT: {technician_rut})")
-                        
-                        # Find matching fsm_location for this technician
-                        fsm_location = None
-                        
-                        # First try to match by RUT if available
-                        if technician_rut:
-                            partner_by_rut = self.env['res.partner'].search([
-                                ('vat', '=', technician_rut)
-                            ], limit=1)
-                            if partner_by_rut:
-                                fsm_location = self.env['fsm.location'].search([
-                                    ('partner_id', '=', partner_by_rut.id)
-                                ], limit=1)
-                        
-                        # If not found by RUT, try to match by name
-                        if not fsm_location:
-                            # Clean name for matching
-                            name_clean = technician_name.replace('.', ' ').title()
-                            partner_by_name = self.env['res.partner'].search([
-                                ('name', 'ilike', name_clean)
-                            ], limit=1)
-                            if partner_by_name:
-                                fsm_location = self.env['fsm.location'].search([
-                                    ('partner_id', '=', partner_by_name.id)
-                                ], limit=1)
-                        
-                        # If still not found, try partial matching
-                        if not fsm_location:
-                            # Try with original name format
-                            partner_partial = self.env['res.partner'].search([
-                                ('name', 'ilike', technician_name.replace('.', '%'))
-                            ], limit=1)
-                            if partner_partial:
-                                fsm_location = self.env['fsm.location'].search([
-                                    ('partner_id', '=', partner_partial.id)
-                                ], limit=1)
-                        
-                        if not fsm_location:
-                            _logger.warning(f"No fsm_location found for technician: {technician_name} (RUT: {technician_rut})")
-                            continue
-                        
-                        _logger.info(f"Found fsm_location {fsm_location.id} for technician {technician_name}")
-                        
-                        # DISABLED: Old direct sale order creation system
-                        # This is now handled by sale_order_processor.py to avoid duplicates
-                        # and follow Odoo naming standards
-                        _logger.info(f"Skipping direct sale order creation for {technician_name} - will be processed by sale_order_processor")
-                        continue
-                        
-                        # Create order lines based on row data
-                        self._create_order_lines(sale_order, row_data)
-                        
-                        # Create inventory movements to technician location
-                        inventory_moves = self._create_inventory_movements(sale_order, fsm_location, row_data)
-                        
-                        created_orders.append({
-                            'order_id': sale_order.id,
-                            'order_name': sale_order.name,
-                            'technician': technician_name,
-                            'location_id': fsm_location.id,
-                            'row': row_idx + 1,
-                            'inventory_moves': len(inventory_moves)
-                        })
-                        
-                        _logger.info(f"✓ Created sale order {sale_order.name} for {technician_name} with {len(inventory_moves)} inventory moves")
-                        
+                        with stats.stage('connect'):
+                            download_connection = self._get_ftp_connection(config)
+                            self._ensure_download_session(download_connection, config)
+                        connection_info = download_connection
                     except Exception as e:
-                        _logger.error(f"Error creating sale order for row {row_idx + 1}: {str(e)}")
-                        continue
-            
-            _logger.info(f"Created {len(created_orders)} sale orders from file {filename}")
-            return created_orders
-            
-        except Exception as e:
-            _logger.error(f"Error creating sale orders from content: {str(e)}")
-            return []
-    
-    def _build_order_notes(self, row_data, sheet_name, row_number):
-        """Build comprehensive notes for the sale order from row data as compact JSON"""
-        import json
-        
-        # Build JSON structure with metadata and original data
-        notes_data = {
-            "source": "FTP file",
-            "sheet": sheet_name,
-            "row": row_number,
-            "original_data": {}
-        }
-        
-        # Add all non-empty row data to original_data
-        for key, value in row_data.items():
-            if value and str(value).strip():
-                notes_data["original_data"][key] = str(value).strip()
-        
-        # Return JSON as compact string (no indentation, no line breaks)
-        return json.dumps(notes_data, ensure_ascii=False, separators=(',', ':'))
-    
-    def _create_order_lines(self, sale_order, row_data):
-        """Create order lines based on row data and extract quantities from specific fields"""
-        try:
-            # Look for service-related information in the row
-            service_description = self._extract_service_description(row_data)
-            
-            # Extract product information and quantities from row
-            products_to_order = self._extract_products_from_row(row_data)
-            
-            if not products_to_order:
-                # Create a generic service line if no specific products found
-                service_product = self._get_or_create_service_product()
-                order_line_data = {
-                    'order_id': sale_order.id,
-                    'product_id': service_product.id,
-                    'name': service_description,
-                    'product_uom_qty': 1,
-                    'price_unit': 0.0,
-                }
-                self.env['sale.order.line'].create(order_line_data)
-                _logger.info(f"Created generic service order line for sale order {sale_order.name}")
-            else:
-                # Create order lines for each product found
-                for product_info in products_to_order:
-                    order_line_data = {
-                        'order_id': sale_order.id,
-                        'product_id': product_info['product'].id,
-                        'name': product_info['description'],
-                        'product_uom_qty': product_info['quantity'],
-                        'price_unit': 0.0,
+                        # Download on the listing session, handing the files over at the end
+                        if download_connection:
+                            self._close_connection(download_connection, discard=True)
+                            download_connection = None
+                        _logger.warning(f"No second session for {config.name}, downloading without "
+                                        f"pipelining: {str(e)}")
+                        pipelined = False
+
+                for entry in pending:
+                    filename = entry['name']
+                    if pipelined:
+                        fetch['ahead'].acquire()
+                        if fetch['cancelled']:
+                            break
+
+                    buffer = DownloadBuffer(os.path.splitext(filename)[1], config.spool_size)
+                    downloaded = {
+                        'name': filename,
+                        'buffer': buffer,
+                        'size': 0.0,
+                        'remote_size': entry['size'],
+                        'mtime': entry['mtime'],
+                        'hash': None,
+                        'error': None,
+                        'attempts': 0,
+                        'resumed': 0,
+                        'verified': False,
                     }
-                    self.env['sale.order.line'].create(order_line_data)
-                    _logger.info(f"Created order line for {product_info['product'].name} (qty: {product_info['quantity']})")
-            
-        except Exception as e:
-            _logger.error(f"Error creating order lines: {str(e)}")
-    
-    def _extract_products_from_row(self, row_data):
-        """Extract product information from row data"""
-        products = []
-        
+                    fetch['files'].append(downloaded)
+                    download_started = time.monotonic()
+                    transfer = self._download_with_retry(connection_info, entry, buffer, config)
+                    stats.add('download', time.monotonic() - download_started,
+                              bytes_count=buffer.size - transfer['resumed'] if transfer['ok'] else 0)
+                    downloaded.update(attempts=transfer['attempts'], resumed=transfer['resumed'],
+                                      verified=transfer['verified'])
+                    if transfer['ok']:
+                        downloaded['hash'] = buffer.hexdigest()
+                        downloaded['size'] = buffer.size / 1024  # Convert to KB
+                    else:
+                        _logger.error(f"Failed to download file: {filename}")
+                        downloaded['error'] = transfer['error']
+                    if pipelined:
+                        events.put(('file', fetch, downloaded))
+
+            except Exception as e:
+                _logger.error(f"Failed to fetch files for config {config.name}: {str(e)}")
+                fetch['error'] = str(e)
+            finally:
+                if download_connection:
+                    self._close_connection(download_connection, discard=bool(fetch['error']))
+                fetch['duration'] = time.monotonic() - started
+                events.put(('done', fetch, None))
+
+    def _process_pipelined_file(self, config, fetch, downloaded):
+        """Process one file posted by a pipelined fetch, then free its pipeline slot"""
+        started = time.monotonic()
+        self.run_stats = fetch['run_stats'] = fetch['run_stats'] or RunStats(self.env.cr)
         try:
-            # Look for quantity fields (cantidad_pinpad, cantidad_pos, etc.)
-            quantity_fields = {
-                'cantidad_pinpad': 'PinPad Device',
-                'cantidad_pos': 'POS Terminal',
-                'cantidad': 'Generic Equipment'
-            }
-            
-            for field, product_name in quantity_fields.items():
-                if field in row_data and row_data[field]:
-                    try:
-                        quantity = float(row_data[field])
-                        if quantity > 0:
-                            product = self._get_or_create_product(product_name)
-                            products.append({
-                                'product': product,
-                                'quantity': quantity,
-                                'description': f"{product_name} - {row_data.get('descripcion', '')}"
-                            })
-                    except (ValueError, TypeError):
-                        _logger.warning(f"Invalid quantity in field {field}: {row_data[field]}")
-            
-            # Also look for equipment type information
-            if 'tipo.equipo' in row_data and row_data['tipo.equipo']:
-                equipment_type = str(row_data['tipo.equipo']).strip()
-                if equipment_type:
-                    product = self._get_or_create_product(f"Equipment - {equipment_type}")
-                    # Check if we already have this product in the list
-                    existing = next((p for p in products if p['product'].id == product.id), None)
-                    if not existing:
-                        products.append({
-                            'product': product,
-                            'quantity': 1,
-                            'description': f"Equipment Type: {equipment_type}"
-                        })
-            
-        except Exception as e:
-            _logger.error(f"Error extracting products from row: {str(e)}")
-        
-        return products
-    
-    def _get_or_create_product(self, product_name):
-        """Get or create a product for inventory movements"""
-        product = self.env['product.product'].search([
-            ('name', '=', product_name),
-        ], limit=1)
-        
-        if not product:
-            product = self.env['product.product'].create({
-                'name': product_name,
-                'type': 'product',  # Storable product for inventory
-                'list_price': 0.0,
-                'standard_price': 0.0,
-                'description': f'Product created from FTP processing: {product_name}',
-                'detailed_type': 'product',
-                'tracking': 'none',
-            })
-            _logger.info(f"Created product: {product_name}")
-        
-        return product
-    
-    def _create_inventory_movements(self, sale_order, fsm_location, row_data):
-        """Log inventory movements that would be created (stock module not available)"""
+            self._process_downloaded_file(config, fetch['connection_info'], downloaded)
+        finally:
+            downloaded['buffer'].close()
+            downloaded['handled'] = True
+            fetch['process_duration'] += time.monotonic() - started
+            self.run_stats = None
+            fetch['ahead'].release()
+
+    def _process_fetched_files(self, config, fetch):
+        """
+        Parse the files fetched for a config that were not processed yet through the
+        pipeline, create their orders and move them remotely, then record the run
+        """
+        _logger.info(f"Processing files for config: {config.name}")
+        connection_info = fetch['connection_info']
+        started = time.monotonic()
+        self.run_stats = fetch['run_stats'] or RunStats(self.env.cr)
+        self.run_stats.merge(fetch['stats'])
         try:
-            inventory_moves = []
-            
-            # Extract products that need to be moved
-            products_to_move = self._extract_products_from_row(row_data)
-            
-            if not products_to_move:
-                _logger.info(f"No products found for inventory movement in sale order {sale_order.name}")
-                return inventory_moves
-            
-            # Log what inventory movements would be created
-            _logger.info(f"=== INVENTORY MOVEMENTS (SIMULATION) ===")
-            _logger.info(f"Sale Order: {sale_order.name}")
-            _logger.info(f"Technician Location: {fsm_location.partner_id.name}")
-            
-            for product_info in products_to_move:
-                if product_info['product'].type == 'product':  # Only for storable products
-                    _logger.info(f"MOVE: {product_info['product'].name} (qty: {product_info['quantity']}) -> {fsm_location.partner_id.name}")
-                    inventory_moves.append(f"move_simulation_{len(inventory_moves) + 1}")
-            
-            _logger.info(f"Total simulated inventory moves: {len(inventory_moves)}")
-            return inventory_moves
-            
+            if fetch['error']:
+                _logger.error(f"Critical error in file processing for {config.name}: {fetch['error']}")
+                return
+
+            for downloaded in fetch['files']:
+                if not downloaded.get('handled'):
+                    self._process_downloaded_file(config, connection_info, downloaded)
+
+            # Update last sync time
+            config.last_sync = fields.Datetime.now()
+            _logger.info(f"File processing completed for config: {config.name}")
+
         except Exception as e:
-            _logger.error(f"Error simulating inventory movements: {str(e)}")
-            return []
-    def _extract_service_description(self, row_data):
-        """Extract service description from row data"""
-        description_parts = []
-        
-        # Look for key fields that describe the service
-        key_fields = ['tipo.solicitud', 'descripcion', 'tipo.equipo', 'observacion', 'nombre.fantasia']
-        
-        for field in key_fields:
-            if field in row_data and row_data[field] and str(row_data[field]).strip():
-                description_parts.append(f"{field.replace('.', ' ').title()}: {row_data[field]}")
-        
-        # If no specific fields found, create generic description
-        if not description_parts:
-            description_parts.append("Field Service - Technical Work")
-        
-        return " | ".join(description_parts)
-    
-    def _get_or_create_service_product(self):
-        """Get or create a generic service product for FTP orders"""
-        product = self.env['product.product'].search([
-            ('name', '=', 'FTP Technical Service'),
-            ('type', '=', 'service')
-        ], limit=1)
-        
-        if not product:
-            product = self.env['product.product'].create({
-                'name': 'FTP Technical Service',
-                'type': 'service',
-                'list_price': 0.0,
-                'standard_price': 0.0,
-                'description': 'Generic technical service product for FTP processed orders',
-                'detailed_type': 'service',
-            })
-            _logger.info("Created generic FTP Technical Service product")
-        
-        return product
-    
-    @api.model
-    def process_ftp_files(self, config_id=None):
-        """Main method to process FTP files"""
-        configs = self.env['ftp.config'].browse(config_id) if config_id else self.env['ftp.config'].search([('active', '=', True)])
-        
-        for config in configs:
-            _logger.info(f"Processing files for config: {config.name}")
-            
+            _logger.error(f"Critical error in file processing for {config.name}: {str(e)}")
+
+        finally:
+            for downloaded in fetch['files']:
+                downloaded['buffer'].close()
+            if connection_info:
+                # A session that failed mid-fetch is not trusted back into the pool
+                self._close_connection(connection_info, discard=bool(fetch['error']))
+                fetch['connection_info'] = None
+            process_duration = fetch['process_duration'] + time.monotonic() - started
+            # Pipelined processing overlaps the fetch, so the run lasts at most its wall time
+            run_duration = min(fetch['duration'] + process_duration, time.monotonic() - fetch['clock'])
+            if fetch['error']:
+                outcome = 'failed'
+            elif fetch['files'] or fetch['recent_upload']:
+                outcome = 'active'
+            else:
+                outcome = 'idle'
+            config.write(dict(
+                config._get_poll_schedule(outcome),
+                last_fetch_duration=fetch['duration'],
+                last_process_duration=process_duration,
+                last_fetch_file_count=len(fetch['files']),
+            ))
+            self.env['ftp.run']._record(
+                config, fetch['started_at'], run_duration, self.run_stats,
+                files_count=len(fetch['files']), error=fetch['error']
+            )
+            self.run_stats = None
+
+    def _process_downloaded_file(self, config, connection_info, downloaded):
+        """Store, process and move one downloaded file, recording errors on its ftp.file"""
+        filename = downloaded['name']
+        file_record = None
+        try:
+            if downloaded['error']:
+                raise Exception(downloaded['error'])
+
             try:
-                connection_info = self._get_ftp_connection(config)
-                connection_type = connection_info['type']
-                
-                # Get list of Excel files based on connection type
-                file_list = []
-                try:
-                    if connection_type in ['sftp', 'scp']:
-                        if connection_type == 'sftp':
-                            sftp = connection_info['connection']
-                            try:
-                                sftp.chdir(config.download_path)
-                                _logger.info(f"Changed to directory: {config.download_path}")
-                            except Exception as e:
-                                _logger.warning(f"Could not change to directory {config.download_path}: {str(e)}")
-                            
-                            file_list = sftp.listdir('.')
-                            _logger.info(f"Found {len(file_list)} files in SFTP directory")
-                        
-                        elif connection_type == 'scp':
-                            ssh = connection_info['ssh']
-                            stdin, stdout, stderr = ssh.exec_command(f'ls {config.download_path}')
-                            result = stdout.read().decode().strip()
-                            if result:
-                                file_list = result.split('\n')
-                                _logger.info(f"Found {len(file_list)} files in SCP directory")
-                            else:
-                                _logger.info("No files found in SCP directory")
-                    
-                    else:
-                        # FTP/FTPS connection
-                        ftp = connection_info['connection']
-                        try:
-                            ftp.cwd(config.download_path)
-                            _logger.info(f"Changed to directory: {config.download_path}")
-                        except Exception as e:
-                            _logger.error(f"Failed to change to directory {config.download_path}: {str(e)}")
-                            ftp.quit()
-                            continue
-                        
-                        ftp.retrlines('NLST', file_list.append)
-                        _logger.info(f"Found {len(file_list)} files in FTP directory")
-                
-                except Exception as e:
-                    _logger.error(f"Failed to list files in directory {config.download_path}: {str(e)}")
-                    self._close_connection(connection_info)
-                    continue
-                
-                excel_files = [f for f in file_list if f.lower().endswith(('.xlsx', '.xls'))]
-                _logger.info(f"Found {len(excel_files)} Excel files: {excel_files}")
-                
-                for filename in excel_files:
-                    # Check if file already processed
-                    try:
-                        existing_file = self.env['ftp.file'].search([
-                            ('name', '=', filename),
-                            ('ftp_config_id', '=', config.id),
-                            ('status', 'in', ['processed', 'moved'])
-                        ], limit=1)
-                        
-                        if existing_file:
-                            _logger.info(f"File {filename} already processed, skipping")
-                            continue
-                    except Exception as e:
-                        _logger.error(f"Error checking existing file {filename}: {str(e)}")
-                        continue
-                    
-                    # Download and process file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp_file:
-                        tmp_path = tmp_file.name
-                    
-                    try:
-                        # Download file
-                        if self._download_file(connection_info, filename, tmp_path, config):
-                            try:
-                                file_size = self._get_file_size(connection_info, filename, config)
-                                
-                                # Process Excel content
-                                content = self._process_excel_file(tmp_path)
-                                
-                                # Calculate statistics
-                                total_rows = sum(len(sheet_data) for sheet_data in content.values())
-                                total_cols = 0
-                                for sheet_data in content.values():
-                                    if sheet_data:  # If sheet has data
-                                        sheet_cols = len(sheet_data[0]) if sheet_data else 0
-                                        total_cols = max(total_cols, sheet_cols)
-                                sheet_names = list(content.keys())
-                                
-                                # Create sale orders from content
-                                created_orders = self._create_sale_orders_from_content(content, filename)
-                                
-                                # Calculate total inventory moves
-                                total_inventory_moves = sum(order.get('inventory_moves', 0) for order in created_orders)
-                                
-                                # Create file record
-                                file_record = self.env['ftp.file'].create({
-                                    'name': filename,
-                                    'file_size': file_size,
-                                    'ftp_config_id': config.id,
-                                    'content_json': json.dumps(content, ensure_ascii=False, indent=2),
-                                    'original_path': config.download_path + '/' + filename,
-                                    'status': 'processed',
-                                    'row_count': total_rows,
-                                    'column_count': total_cols,
-                                    'sheet_names': ', '.join(sheet_names),
-                                    'sale_orders_created': len(created_orders),
-                                    'inventory_moves_created': total_inventory_moves
-                                })
-                                _logger.info(f"Created file record for: {filename} with {len(created_orders)} sale orders and {total_inventory_moves} inventory moves")
-                                
-                                # Process with sale order processor to generate detailed logs
-                                try:
-                                    processor = self.env['sale.order.processor']
-                                    results = processor.process_ftp_file_to_sale_order(file_record.id)
-                                    _logger.info(f"Sale order processor completed for {filename}. Final orders created: {results.get('orders_created', 0)}")
-                                except Exception as proc_error:
-                                    _logger.warning(f"Sale order processor failed for {filename}: {str(proc_error)}")
-                                    # Don't fail the main process if processor fails
-                                
-                                # Move file to processed directory (only for FTP/SFTP for now)
-                                if connection_info['type'] in ['ftp', 'ftps', 'sftp']:
-                                    new_path = config.processed_path + '/' + filename
-                                    if self._move_file_on_connection(connection_info, filename, new_path, config):
-                                        file_record.write({
-                                            'moved_path': new_path,
-                                            'status': 'moved'
-                                        })
-                                        _logger.info(f"Successfully processed and moved file: {filename}")
-                                    else:
-                                        _logger.warning(f"File processed but not moved: {filename}")
-                                else:
-                                    _logger.info(f"File processing completed for {filename} (move not supported for {connection_info['type']})")
-                                    
-                            except Exception as e:
-                                _logger.error(f"Error processing file content for {filename}: {str(e)}")
-                                raise e
-                        else:
-                            _logger.error(f"Failed to download file: {filename}")
-                            raise Exception(f"Download failed for file: {filename}")
-                        
-                    except Exception as e:
-                        # Create error record
-                        try:
-                            self.env['ftp.file'].create({
-                                'name': filename,
-                                'file_size': self._get_file_size(connection_info, filename, config),
-                                'ftp_config_id': config.id,
-                                'original_path': config.download_path + '/' + filename,
-                                'status': 'error',
-                                'error_message': str(e)
-                            })
-                            _logger.error(f"Error processing file {filename}: {str(e)}")
-                        except Exception as create_error:
-                            _logger.error(f"Failed to create error record for {filename}: {str(create_error)}")
-                    
-                    finally:
-                        # Clean up temporary file
-                        try:
-                            if os.path.exists(tmp_path):
-                                os.unlink(tmp_path)
-                                _logger.info(f"Cleaned up temporary file: {tmp_path}")
-                        except Exception as e:
-                            _logger.warning(f"Failed to clean up temporary file {tmp_path}: {str(e)}")
-                
-                # Update last sync time and close connection
-                try:
-                    config.last_sync = fields.Datetime.now()
-                    self._close_connection(connection_info)
-                    _logger.info(f"File processing completed for config: {config.name}")
-                except Exception as e:
-                    _logger.error(f"Error closing connection for {config.name}: {str(e)}")
-                
+                queued = config.processing_mode == 'queue'
+                # Detect repeated payloads before any parsing or order creation
+                original = self._find_duplicate_file(downloaded['hash'])
+                if original and config.duplicate_policy != 'reprocess':
+                    self._handle_duplicate_file(config, connection_info, downloaded, original)
+                    return
+
+                # Create file record up front so rows can be streamed into it
+                file_record = self.env['ftp.file'].create(dict(self._download_vals(downloaded), **{
+                    'name': filename,
+                    'file_size': downloaded['size'],
+                    'ftp_config_id': config.id,
+                    'original_path': config.download_path + '/' + filename,
+                    'content_hash': downloaded['hash'],
+                    'status': 'downloaded',
+                }))
+
+                # Stream parsed batches into storage and the sale order processor
+                read_options = self.env['ftp.file.type']._get_read_options(filename)
+                batches = self._iter_file_batches(downloaded['buffer'], read_options, filename=filename)
+                self._stream_file_content(file_record, batches, process=not queued)
+                _logger.info(f"Created file record for: {filename} with {file_record.row_count} rows")
+                if queued:
+                    self.env['ftp.processing.job']._enqueue_file(file_record)
+
+                # Move file to processed directory (only for FTP/SFTP for now)
+                with self._run_stage('move'):
+                    new_path = self._move_processed_file(config, connection_info, filename)
+                if new_path:
+                    file_record.write({
+                        'moved_path': new_path,
+                        'status': 'moved'
+                    })
+                    _logger.info(f"Successfully processed and moved file: {filename}")
+
+                if config.sync_mode == 'incremental' and file_record.status != 'error':
+                    self._update_manifest(config, downloaded, file_record)
+
             except Exception as e:
-                _logger.error(f"Critical error in file processing for {config.name}: {str(e)}")
-                # Try to close connection if it exists
-                try:
-                    if 'connection_info' in locals():
-                        self._close_connection(connection_info)
-                except:
-                    pass
-                continue
-    
+                _logger.error(f"Error processing file content for {filename}: {str(e)}")
+                raise e
+
+        except Exception as e:
+            # Create error record (or flag the one created before parsing)
+            try:
+                if file_record:
+                    file_record.write({
+                        'status': 'error',
+                        'error_message': str(e)
+                    })
+                else:
+                    self.env['ftp.file'].create(dict(self._download_vals(downloaded), **{
+                        'name': filename,
+                        'file_size': downloaded['size'],
+                        'ftp_config_id': config.id,
+                        'original_path': config.download_path + '/' + filename,
+                        'status': 'error',
+                        'error_message': str(e)
+                    }))
+                _logger.error(f"Error processing file {filename}: {str(e)}")
+            except Exception as create_error:
+                _logger.error(f"Failed to create error record for {filename}: {str(create_error)}")
+
+    def _download_vals(self, downloaded):
+        """ftp.file values describing how a file was downloaded"""
+        return {
+            'download_attempts': downloaded['attempts'],
+            'download_resumed_size': downloaded['resumed'] / 1024,
+            'download_verified': downloaded['verified'],
+        }
+
+    def _move_processed_file(self, config, connection_info, filename):
+        """Move a handled file to the processed directory, returning its new path when moved"""
+        if connection_info['type'] not in ['ftp', 'ftps', 'sftp']:
+            _logger.info(f"File processing completed for {filename} (move not supported for {connection_info['type']})")
+            return False
+        new_path = config.processed_path + '/' + filename
+        if self._move_file_on_connection(connection_info, filename, new_path, config):
+            return new_path
+        _logger.warning(f"File processed but not moved: {filename}")
+        return False
+
+    def _find_duplicate_file(self, content_hash):
+        """Return the earliest successfully handled file with the same content hash"""
+        if not content_hash:
+            return self.env['ftp.file']
+        return self.env['ftp.file'].search([
+            ('content_hash', '=', content_hash),
+            ('status', 'in', ['processed', 'moved'])
+        ], order='id', limit=1)
+
+    def _handle_duplicate_file(self, config, connection_info, downloaded, original):
+        """Apply the config's duplicate policy to a file whose content was already handled"""
+        filename = downloaded['name']
+        _logger.info(f"File {filename} has the same content as {original.name} (id {original.id}), "
+                     f"policy: {config.duplicate_policy}")
+        file_record = self.env['ftp.file']
+        if config.duplicate_policy == 'link':
+            file_record = self.env['ftp.file'].create(dict(self._download_vals(downloaded), **{
+                'name': filename,
+                'file_size': downloaded['size'],
+                'ftp_config_id': config.id,
+                'original_path': config.download_path + '/' + filename,
+                'content_hash': downloaded['hash'],
+                'duplicate_of_id': original.id,
+                'status': 'duplicate',
+            }))
+
+        new_path = self._move_processed_file(config, connection_info, filename)
+        if new_path and file_record:
+            file_record.moved_path = new_path
+
+        if not file_record:
+            # Skipped without a record: only the manifest keeps later polls from downloading it
+            # again when it could not be moved (SCP, or a move error)
+            self._update_manifest(config, downloaded, original, duplicate_skipped=True)
+        elif config.sync_mode == 'incremental':
+            self._update_manifest(config, downloaded, file_record)
+
+    def _update_manifest(self, config, downloaded, file_record, duplicate_skipped=False):
+        """
+        Record the remote state of a processed file in the config's manifest; for a skipped
+        duplicate, file_record is the original and the entry is kept even without size/mtime
+        """
+        if not duplicate_skipped and (downloaded['remote_size'] is None or downloaded['mtime'] is None):
+            return
+        vals = {
+            'size': downloaded['remote_size'],
+            'mtime': downloaded['mtime'],
+            'content_hash': downloaded['hash'],
+            'ftp_file_id': file_record.id,
+            'duplicate_skipped': duplicate_skipped,
+        }
+        manifest = self.env['ftp.file.manifest'].search([
+            ('ftp_config_id', '=', config.id),
+            ('name', '=', downloaded['name'])
+        ], limit=1)
+        if manifest:
+            manifest.write(vals)
+        else:
+            self.env['ftp.file.manifest'].create(dict(vals, ftp_config_id=config.id, name=downloaded['name']))
+
     @api.model
     def cron_process_ftp_files(self):
         """Cron job method"""
         try:
             _logger.info("Starting scheduled FTP file processing")
-            self.process_ftp_files()
+            self.process_ftp_files(due_only=True)
             _logger.info("Scheduled FTP file processing completed")
         except Exception as e:
             _logger.error(f"Error in scheduled FTP processing: {str(e)}")
     
     def reprocess_file(self, file_id):
-        """Reprocess a specific file record to create sale orders"""
+        """
+        Reprocess a specific file record to create sale orders (resuming after its checkpoint, if any).
+
+        The processor runs on a cursor of its own so it can commit a checkpoint every
+        commit_chunk_size rows without committing the caller's transaction.
+        """
         try:
             file_record = self.env['ftp.file'].browse(file_id)
             if not file_record:
@@ -939,8 +1566,14 @@ class FtpService(models.Model):
             _logger.info(f"Reprocessing file: {file_record.name}")
             
             # Use the sale order processor to process the file
-            processor = self.env['sale.order.processor']
-            results = processor.process_ftp_file_to_sale_order(file_id)
+            self.env.flush_all()
+            try:
+                with self.env.registry.cursor() as cr:
+                    processor = self.env(cr=cr)['sale.order.processor']
+                    results = processor.process_ftp_file_to_sale_order(file_id, checkpoint=True)
+            finally:
+                # Orders and file values were written through the other cursor
+                self.env.invalidate_all()
             
             _logger.info(f"Reprocessing completed. Orders created: {results.get('orders_created', 0)}")
             
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Extensión de Órdenes de Venta
+Guarda la clave de importación de la fila FTP que originó cada orden.
+"""
+
+from odoo import models, fields
+
+
+class SaleOrder(models.Model):
+    """
+    Agrega a sale.order la clave determinística de la fila importada, para que
+    reprocesar un archivo solo cree las órdenes de las filas que aún no existen.
+    """
+    _inherit = 'sale.order'
+
+    ftp_import_key = fields.Char(
+        string='Clave de Importación FTP',
+        copy=False,
+        readonly=True,
+        help='Clave de la fila del archivo FTP que originó esta orden '
+             '(tipo de archivo + columnas clave, o hash de la fila)'
+    )
+
+    _sql_constraints = [
+        ('ftp_import_key_unique', 'UNIQUE(ftp_import_key)',
+         'Ya existe una orden de venta para esta fila del archivo FTP!'),
+    ]
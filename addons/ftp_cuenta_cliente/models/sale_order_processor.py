@@ -6,10 +6,58 @@ Crea una orden de venta por cada fila del archivo Excel procesado.
 
 from odoo import models, fields
 from odoo.exceptions import UserError
+from contextlib import nullcontext
+import hashlib
+import json
 import logging
+import pandas as pd
+
+from .column_transformer import ColumnTransformer
 
 _logger = logging.getLogger(__name__)
 
+# Columnas donde puede venir cada dato de la fila, en orden de prioridad (para RUT, SKU
+# y cantidad, solo si el tipo de archivo no tiene una columna mapeada a LINE_MAPPING_KEYS)
+RUT_COLUMNS = ['rut', 'rut.tecnico', 'rut_tecnico', 'tecnico_rut', 'rut.del.tecnico']
+TECHNICIAN_RUT_COLUMNS = ['rut.tecnico', 'rut_tecnico', 'tecnico_rut', 'rut.del.tecnico']
+TECHNICIAN_NAME_COLUMNS = ['tecnico', 'nombre.tecnico', 'nombre_tecnico', 'tecnico.nombre']
+SKU_COLUMNS = ['sku', 'codigo', 'codigo_producto']
+QUANTITY_COLUMNS = ['cantidad', 'qty', 'quantity', 'cant', 'unidades']
+DESCRIPTION_COLUMNS = ['descripcion']
+
+# Columnas mapeadas ('modelo.campo' de ftp.file.type.column) de donde salen los datos de
+# las líneas, y columnas comunes donde se buscan si el tipo de archivo no las mapea
+LINE_MAPPING_KEYS = {
+    'rut': 'fsm.location.partner_id',
+    'sku': 'product.template.default_code',
+    'quantity': 'sale.order.line.product_uom_qty',
+}
+LINE_COLUMN_ALIASES = {
+    'rut': RUT_COLUMNS,
+    'sku': SKU_COLUMNS,
+    'quantity': QUANTITY_COLUMNS,
+}
+
+# Llave de la fila donde se guardan los valores normalizados por _normalize_rows
+NORMALIZED_KEY = '_normalized'
+
+# Llave de la fila donde se guardan los valores de las columnas mapeadas ('modelo.campo')
+MAPPED_KEY = '_mapped'
+
+# Campos de sale.order que las columnas mapeadas no pueden sobrescribir
+PROTECTED_ORDER_FIELDS = frozenset([
+    'partner_id', 'partner_invoice_id', 'partner_shipping_id', 'order_line', 'state', 'ftp_import_key',
+])
+
+# Cantidad máxima de valores por consulta al resolver el índice de búsqueda
+LOOKUP_QUERY_CHUNK = 500
+
+# Filas con detalle en el log; sobre este número solo se registra el resumen
+ROW_LOG_THRESHOLD = 200
+
+# Filas procesadas entre cada commit con punto de control (0 = una sola transacción)
+COMMIT_CHUNK_SIZE = 5000
+
 class SaleOrderProcessor(models.Model):
     """
     Modelo para procesar archivos FTP y convertirlos en órdenes de venta.
@@ -18,22 +66,47 @@ class SaleOrderProcessor(models.Model):
     _name = 'sale.order.processor'
     _description = 'Procesador de Archivos FTP a Órdenes de Venta'
     
-    def process_ftp_file_to_sale_order(self, ftp_file_id):
+    def process_ftp_file_to_sale_order(self, ftp_file_id, row_batches=None, row_range=None, update_file=True,
+                                       checkpoint=False):
         """
         Procesa un archivo FTP y crea órdenes de venta desde su contenido.
         Crea una orden de venta por cada fila del archivo Excel.
         
+        Las filas pueden llegar en lotes desde el parser (``row_batches``) para
+        procesarlas a medida que se leen, sin esperar a tener el archivo completo
+        en memoria. Si no se entregan, se leen del contenido guardado en el archivo.
+        
+        Con ``row_range`` solo se crean órdenes para un tramo de filas de una hoja
+        (los trabajos de la cola de procesamiento); las filas anteriores se recorren
+        únicamente para numerar las claves de importación igual que en el archivo completo.
+        
         :param ftp_file_id: ID del archivo FTP a procesar
+        :param row_batches: Iterable opcional de tuplas (nombre_hoja, filas)
+        :param row_range: Tupla opcional (nombre_hoja, inicio, fin) con posiciones de fila desde 0
+        :param update_file: Si es False no se escriben estado, log ni SKUs faltantes en el archivo
+        :param checkpoint: Si es True se confirma la transacción por tramos (ver abajo)
+        
+        El resultado de cada fila se guarda en ``ftp.file.row`` (insertado por lote);
+        el log de texto solo detalla las primeras ``row_log_threshold`` filas.
+        
+        Con ``checkpoint`` se confirma la transacción cada ``commit_chunk_size`` filas,
+        guardando en el archivo la hoja y la última fila confirmadas; si la ejecución se
+        interrumpe, la siguiente continúa desde ese punto de control en vez de empezar de
+        nuevo. Solo debe usarse con un cursor propio del archivo (``reprocess_file``): el
+        cron procesa varias configuraciones en una sola transacción y no la confirma a medias.
+        
         :return: Diccionario con los resultados del procesamiento
         :rtype: dict
         """
         ftp_file = self.env['ftp.file'].browse(ftp_file_id)
         if not ftp_file.exists():
             raise UserError("Archivo FTP no encontrado")
-        
-        # Obtener el tipo de archivo y configuración de columnas
-        self.file_type = self._get_file_type(ftp_file)
-        self.column_mappings = self._get_column_mappings(self.file_type) if self.file_type else {}
+
+        # Tipo de archivo y su plan de importación, resueltos con los encabezados del primer lote
+        self.file_type = None
+        self.column_mappings = {}
+        self.row_key_columns = []
+        self.group_by_column = False
         
         # Inicializar estructura de resultados
         results = {
@@ -45,80 +118,225 @@ class SaleOrderProcessor(models.Model):
             'orders': [],
             'processing_log': [],
             'rows_processed': 0,
-            'rows_skipped': 0
+            'rows_skipped': 0,
+            'rows_already_imported': 0,
+            'rows_failed': 0,
+            'row_errors_omitted': 0,
+            'rows_recorded': 0,
+            'row_results': []
         }
+        params = self.env['ir.config_parameter'].sudo()
+        self.row_log_limit = int(params.get_param('ftp_cuenta_cliente.row_log_threshold', ROW_LOG_THRESHOLD))
+        self.row_log_verbose = True
+
+        # Los trabajos de la cola ya se confirman por tramo
+        commit_chunk = 0
+        if checkpoint and update_file and not row_range:
+            commit_chunk = int(params.get_param('ftp_cuenta_cliente.commit_chunk_size', COMMIT_CHUNK_SIZE))
+        self.resume_point = None
+        checkpoint_orders = 0
         
         try:
-            # Parsear contenido JSON del archivo
-            content = ftp_file.get_content_as_dict()
-            if not content:
-                results['errors'].append("No se encontró contenido en el archivo")
-                return results
-            
+            if row_batches is None:
+                # Leer por lotes el contenido guardado del archivo
+                if not (ftp_file.content_index or ftp_file.content_json):
+                    results['errors'].append("No se encontró contenido en el archivo")
+                    return results
+                row_batches = ftp_file.iter_content_batches()
+
+            if commit_chunk and ftp_file.checkpoint_sheet:
+                # Las filas hasta el punto de control y sus resultados ya están confirmados
+                self.resume_point = (ftp_file.checkpoint_sheet, ftp_file.checkpoint_row)
+                checkpoint_orders = ftp_file.checkpoint_orders
+                _logger.info(f"Reanudando {ftp_file.name} desde la hoja {ftp_file.checkpoint_sheet}, "
+                             f"después de la fila {ftp_file.checkpoint_row}")
+                results['processing_log'].append(
+                    f"Reanudado desde la hoja {ftp_file.checkpoint_sheet}, después de la fila {ftp_file.checkpoint_row}"
+                )
+            else:
+                # Los resultados por fila de una ejecución anterior se reemplazan
+                self.env['ftp.file.row']._clear_results(ftp_file.id, row_range)
+
+            # Índice de RUT, técnicos y SKUs, resuelto en bloque por cada lote
+            self.lookup_index = None
+
+            # Tamaño de lote para crear órdenes en bloque (0 = una a una)
+            batch_size = 0
+            pending_orders = []
+
+            # Filas ya procesadas por hoja, para numerar las filas entre lotes
+            sheet_row_counts = {}
+
+            # Ocurrencias de cada clave de importación en el archivo
+            key_occurrences = {}
+
+            # Órdenes consolidadas por valor de agrupación, creadas al final del archivo
+            groups = {}
+
+            # Filas procesadas desde el último commit
+            rows_since_commit = 0
+
             # Procesar cada hoja del archivo Excel
-            for sheet_name, rows in content.items():
-                _logger.info(f"Procesando hoja: {sheet_name} con {len(rows)} filas")
-                results['processing_log'].append(f"=== Procesando hoja: {sheet_name} ===")
+            for sheet_name, rows in row_batches:
+                if row_range and sheet_row_counts.get(row_range[0], 0) >= row_range[2]:
+                    # El tramo ya fue procesado completo
+                    break
+                if self.file_type is None:
+                    self._setup_import_plan(ftp_file, list(rows[0]) if rows else None)
+                    batch_size = self._get_order_batch_size()
+                    if self.group_by_column:
+                        # Las órdenes consolidadas recién se crean al final del archivo
+                        commit_chunk = 0
+
+                if sheet_name not in sheet_row_counts:
+                    if self.resume_point and self.resume_point[0] in sheet_row_counts:
+                        # Terminó la hoja del punto de control
+                        self.resume_point = None
+                    sheet_row_counts[sheet_name] = 0
+                    if not row_range or sheet_name == row_range[0]:
+                        _logger.info(f"Procesando hoja: {sheet_name}")
+                        results['processing_log'].append(f"=== Procesando hoja: {sheet_name} ===")
+
+                # Numeración de las filas del lote dentro de la hoja
+                first_row_idx = sheet_row_counts[sheet_name] + 1
+                sheet_row_counts[sheet_name] += len(rows)
+
+                # Claves de importación del lote y las que ya tienen orden creada
+                row_keys = [self._get_row_import_key(row_data, key_occurrences) for row_data in rows]
+                if row_range:
+                    rows, row_keys, first_row_idx = self._slice_row_range(
+                        row_range, sheet_name, rows, row_keys, first_row_idx
+                    )
+                    if not rows:
+                        continue
+                if self.resume_point:
+                    rows, row_keys, first_row_idx = self._skip_checkpointed_rows(
+                        sheet_name, rows, row_keys, first_row_idx
+                    )
+                    if not rows:
+                        continue
+                existing_keys = self._get_existing_import_keys(row_keys)
+
+                # Aplicar las columnas mapeadas, normalizar y validar el lote completo
+                # y resolver de una vez los RUT, técnicos y SKUs nuevos del lote
+                with self._run_stage('lookup'):
+                    rows, failed = self._transform_rows(rows)
+                    rows, rejected = self._normalize_rows(rows)
+                    rejected.update(failed)
+                    self.lookup_index = self._build_lookup_index(
+                        [row_data for row_data in rows if NORMALIZED_KEY in row_data], self.lookup_index
+                    )
                 
                 # Procesar cada fila individualmente
-                for row_idx, row_data in enumerate(rows, 1):
-                    try:
-                        # Validar que la fila tenga datos mínimos requeridos
-                        if not self._validate_row_data(row_data):
-                            results['rows_skipped'] += 1
-                            results['warnings'].append(f"Fila {row_idx} omitida: datos incompletos")
-                            results['processing_log'].append(
-                                f"⚠ Fila {row_idx} omitida - Datos incompletos"
-                            )
-                            continue
+                with self._run_stage('create_orders', rows=len(rows)):
+                    for position, (row_data, import_key) in enumerate(zip(rows, row_keys)):
+                        row_idx = first_row_idx + position
+                        try:
+                            # Omitir filas cuya orden ya fue creada en un procesamiento anterior
+                            if import_key in existing_keys:
+                                results['rows_already_imported'] += 1
+                                self._record_row_result(
+                                    results, sheet_name, row_idx, 'already_imported',
+                                    sale_order_id=existing_keys[import_key]
+                                )
+                                self._log_row(results, f"↷ Fila {row_idx} omitida - Orden ya importada")
+                                continue
+
+                            # Filas rechazadas por la normalización (datos mínimos requeridos)
+                            if position in rejected:
+                                results['rows_skipped'] += 1
+                                results['warnings'].append(f"Fila {row_idx} omitida: {rejected[position]}")
+                                self._record_row_result(
+                                    results, sheet_name, row_idx, 'skipped',
+                                    error_code='invalid_row', message=rejected[position]
+                                )
+                                self._log_row(results, f"⚠ Fila {row_idx} omitida - {rejected[position].capitalize()}")
+                                continue
+
+                            # Filas de una orden consolidada por el campo de agrupación
+                            group_value = self._get_row_group_value(row_data)
+                            if group_value:
+                                self._add_row_to_group(
+                                    groups, group_value, row_data, row_idx, sheet_name, results, import_key
+                                )
+                                continue
                         
-                        # Crear orden de venta para esta fila
-                        sale_order = self._create_sale_order_from_row(row_data, row_idx, sheet_name, results)
+                            if batch_size:
+                                # Acumular la orden para crearla junto con su lote
+                                order_vals = self._prepare_sale_order_vals(
+                                    row_data, row_idx, sheet_name, results, import_key=import_key
+                                )
+                                if not order_vals:
+                                    results['rows_skipped'] += 1
+                                    continue
+                                pending_orders.append({
+                                    'vals': order_vals,
+                                    'row_idx': row_idx,
+                                    'sheet_name': sheet_name,
+                                    'row_data': row_data,
+                                })
+                                if len(pending_orders) >= batch_size:
+                                    self._flush_pending_orders(pending_orders, results)
+                                continue
                         
-                        if sale_order:
-                            results['orders'].append({
-                                'id': sale_order.id,
-                                'name': sale_order.name,
-                                'row': row_idx,
-                                'sheet': sheet_name
-                            })
-                            results['orders_created'] += 1
-                            results['rows_processed'] += 1
-                            
-                            # Registrar éxito en el log
-                            log_entry = (
-                                f"✓ Fila {row_idx} procesada exitosamente | "
-                                f"Orden: {sale_order.name} | "
-                                f"Cliente: {sale_order.partner_id.name} | "
-                                f"SKU: {row_data.get('sku', 'N/A')} | "
-                                f"Técnico: {row_data.get('tecnico', 'N/A')}"
+                            # Crear orden de venta para esta fila
+                            sale_order = self._create_sale_order_from_row(
+                                row_data, row_idx, sheet_name, results, import_key=import_key
                             )
-                            results['processing_log'].append(log_entry)
-                            _logger.info(log_entry)
-                        else:
-                            results['rows_skipped'] += 1
-                            
-                    except Exception as e:
-                        results['errors'].append(f"Error en fila {row_idx}: {str(e)}")
-                        results['rows_skipped'] += 1
                         
-                        # Registrar error en el log
-                        log_entry = (
-                            f"✗ Error procesando fila {row_idx} | "
-                            f"Error: {str(e)} | "
-                            f"SKU: {row_data.get('sku', 'N/A')}"
-                        )
-                        results['processing_log'].append(log_entry)
-                        _logger.error(log_entry)
+                            if sale_order:
+                                self._register_order_created(results, sale_order, row_idx, sheet_name, row_data)
+                            else:
+                                results['rows_skipped'] += 1
+                            
+                        except Exception as e:
+                            self._register_row_error(results, row_idx, sheet_name, row_data, e)
+
+                rows_since_commit += len(rows)
+                checkpoint_due = commit_chunk and rows_since_commit >= commit_chunk
+                if checkpoint_due:
+                    with self._run_stage('create_orders'):
+                        self._flush_pending_orders(pending_orders, results)
+
+                # Guardar en bloque los resultados por fila del lote
+                self._flush_row_results(ftp_file, results)
+
+                if checkpoint_due:
+                    self._commit_checkpoint(
+                        ftp_file, sheet_name, sheet_row_counts[sheet_name],
+                        checkpoint_orders + results['orders_created']
+                    )
+                    rows_since_commit = 0
+
+            # Crear las órdenes consolidadas y las que quedaron pendientes del último lote
+            with self._run_stage('create_orders'):
+                self._create_grouped_orders(groups, pending_orders, batch_size, results)
+                self._flush_pending_orders(pending_orders, results)
+            self._flush_row_results(ftp_file, results)
+
+            if results['row_errors_omitted']:
+                results['errors'].append(
+                    f"{results['row_errors_omitted']} filas más con error (ver Resultados por Fila)"
+                )
+
+            if not sheet_row_counts:
+                results['errors'].append("No se encontró contenido en el archivo")
             
             # Actualizar archivo FTP con los resultados del procesamiento
             processing_log_text = '\n'.join(results['processing_log']) if results['processing_log'] else ''
-            ftp_file.write({
-                'sale_orders_created': results['orders_created'],
-                'status': 'processed' if results['orders_created'] > 0 else 'error',
-                'error_message': '\n'.join(results['errors']) if results['errors'] else False,
-                'processing_log': processing_log_text
-            })
+            has_orders = (
+                results['orders_created'] > 0 or results['rows_already_imported'] > 0 or checkpoint_orders > 0
+            )
+            if update_file:
+                ftp_file.write({
+                    'sale_orders_created': checkpoint_orders + results['orders_created'],
+                    'status': 'processed' if has_orders else 'error',
+                    'error_message': '\n'.join(results['errors']) if results['errors'] else False,
+                    'processing_log': processing_log_text,
+                    'checkpoint_sheet': False,
+                    'checkpoint_row': 0,
+                    'checkpoint_orders': 0,
+                })
             
             # Agregar resumen al log
             summary = (
@@ -126,19 +344,24 @@ class SaleOrderProcessor(models.Model):
                 f"Órdenes creadas: {results['orders_created']}\n"
                 f"Filas procesadas: {results['rows_processed']}\n"
                 f"Filas omitidas: {results['rows_skipped']}\n"
+                f"Filas ya importadas: {results['rows_already_imported']}\n"
+                f"Filas con error: {results['rows_failed']}\n"
                 f"Errores: {len(results['errors'])}\n"
                 f"Advertencias: {len(results['warnings'])}"
             )
             results['processing_log'].append(summary)
             
             # Registrar SKUs no encontrados
-            if results['skus_not_found']:
+            if update_file and results['skus_not_found']:
                 self._log_missing_skus(ftp_file, results['skus_not_found'])
             
-            results['success'] = results['orders_created'] > 0
+            results['success'] = has_orders
             
         except Exception as e:
             _logger.error(f"Error general procesando archivo: {str(e)}")
+            if not update_file:
+                # Quien administra el estado del archivo (la cola) decide si reintentar
+                raise
             results['errors'].append(str(e))
             ftp_file.write({
                 'status': 'error',
@@ -147,6 +370,18 @@ class SaleOrderProcessor(models.Model):
         
         return results
     
+    def _run_stage(self, name, **values):
+        """
+        Mide un bloque como etapa de la ejecución FTP en curso (``run_stats``
+        asignado por ftp.service); sin ejecución en curso no hace nada.
+        
+        :param name: Etapa de ftp.run.stage
+        :param values: rows y bytes_count opcionales de la etapa
+        :return: Context manager de la etapa
+        """
+        stats = getattr(self, 'run_stats', None)
+        return stats.stage(name, **values) if stats else nullcontext()
+
     def _validate_row_data(self, row_data):
         """
         Valida que una fila tenga los datos mínimos requeridos para procesamiento.
@@ -156,12 +391,12 @@ class SaleOrderProcessor(models.Model):
         :rtype: bool
         """
         # Verificar que al menos tenga SKU o descripción
-        has_sku = bool(row_data.get('sku', '').strip())
+        has_sku = bool(self._get_row_sku(row_data))
         has_description = bool(row_data.get('descripcion', '').strip())
         
         return has_sku or has_description
     
-    def _create_sale_order_from_row(self, row_data, row_idx, sheet_name, results):
+    def _create_sale_order_from_row(self, row_data, row_idx, sheet_name, results, import_key=None):
         """
         Crea una orden de venta a partir de los datos de una fila.
         
@@ -169,63 +404,26 @@ class SaleOrderProcessor(models.Model):
         :param row_idx: Índice de la fila en la hoja
         :param sheet_name: Nombre de la hoja Excel
         :param results: Diccionario de resultados para registrar warnings/errors
+        :param import_key: Clave de importación de la fila, guardada en la orden
         :return: Orden de venta creada o False si no se pudo crear
         :rtype: sale.order or bool
         """
         try:
-            # Buscar el cliente existente (no crear nuevo)
-            partner = self._get_partner(row_data)
-            if not partner:
-                results['warnings'].append(
-                    f"Fila {row_idx}: No se encontró cliente con RUT {row_data.get('rut', 'N/A')}"
-                )
+            order_vals = self._prepare_sale_order_vals(row_data, row_idx, sheet_name, results, import_key=import_key)
+            if not order_vals:
                 return False
             
-            # Buscar el técnico (fsm_location)
-            fsm_location = self._get_fsm_location(row_data)
-            
-            # Buscar el producto por SKU
-            product = self._get_product_by_sku(row_data, results)
-            
-            if not product:
-                # Si no se encuentra el producto, crear uno genérico o saltar
-                results['warnings'].append(
-                    f"Fila {row_idx}: No se encontró producto con SKU {row_data.get('sku', 'N/A')}"
-                )
-                return False
+            # Crear la orden de venta; el savepoint mantiene usable la transacción si
+            # falla (p. ej. una clave de importación ya creada por otra ejecución)
+            with self.env.cr.savepoint():
+                sale_order = self.env['sale.order'].sudo().create(order_vals)
             
-            # Obtener cantidad
-            quantity = self._get_quantity_from_row(row_data)
-            
-            # Preparar valores de la orden de venta
-            order_vals = {
-                'partner_id': partner.id,
-                'partner_invoice_id': partner.id,
-                'partner_shipping_id': partner.id,
-                'date_order': fields.Datetime.now(),
-                'state': 'draft',
-                'client_order_ref': f"FTP-{sheet_name}-Row{row_idx}",
-                'note': self._prepare_order_notes(row_data, sheet_name, row_idx),
-                'order_line': [(0, 0, {
-                    'product_id': product.id,
-                    'name': product.name,
-                    'product_uom_qty': quantity,
-                    'price_unit': product.list_price,
-                })]
-            }
-            
-            # Agregar campo de ubicación FSM si existe
-            if fsm_location:
-                order_vals['fsm_location_id'] = fsm_location.id
-            
-            # Crear la orden de venta
-            sale_order = self.env['sale.order'].sudo().create(order_vals)
-            
-            _logger.info(
+            line_vals = order_vals['order_line'][0][2]
+            self._log_detail(
                 f"Orden de venta creada: {sale_order.name} | "
-                f"Cliente: {partner.name} | "
-                f"Producto: {product.name} | "
-                f"Cantidad: {quantity}"
+                f"Cliente: {sale_order.partner_id.name} | "
+                f"Producto: {line_vals['name']} | "
+                f"Cantidad: {line_vals['product_uom_qty']}"
             )
             
             return sale_order
@@ -233,18 +431,542 @@ class SaleOrderProcessor(models.Model):
         except Exception as e:
             _logger.error(f"Error creando orden para fila {row_idx}: {str(e)}")
             raise
+
+    def _prepare_sale_order_vals(self, row_data, row_idx, sheet_name, results, import_key=None):
+        """
+        Prepara los valores de la orden de venta de una fila sin crearla.
+        
+        :param row_data: Diccionario con los datos de la fila
+        :param row_idx: Índice de la fila en la hoja
+        :param sheet_name: Nombre de la hoja Excel
+        :param results: Diccionario de resultados para registrar warnings/errors
+        :param import_key: Clave de importación de la fila, guardada en la orden
+        :return: Valores para sale.order.create o False si falta cliente o producto
+        :rtype: dict or bool
+        """
+        # Buscar el cliente existente (no crear nuevo)
+        partner = self._get_partner(row_data)
+        if not partner:
+            results['warnings'].append(
+                f"Fila {row_idx}: No se encontró cliente con RUT {self._get_row_rut(row_data) or 'N/A'}"
+            )
+            self._record_row_result(
+                results, sheet_name, row_idx, 'skipped', error_code='partner_not_found',
+                message=f"RUT {self._get_row_rut(row_data) or 'N/A'}"
+            )
+            return False
+        
+        # Buscar el técnico (fsm_location)
+        fsm_location = self._get_fsm_location(row_data)
+        
+        # Buscar el producto por SKU
+        product = self._get_product_by_sku(row_data, results)
+        
+        if not product:
+            # Si no se encuentra el producto, crear uno genérico o saltar
+            results['warnings'].append(
+                f"Fila {row_idx}: No se encontró producto con SKU {self._get_row_sku(row_data) or 'N/A'}"
+            )
+            self._record_row_result(
+                results, sheet_name, row_idx, 'skipped', error_code='product_not_found',
+                message=f"SKU {self._get_row_sku(row_data) or 'N/A'}", partner_id=partner.id
+            )
+            return False
+        
+        # Obtener cantidad
+        quantity = self._get_quantity_from_row(row_data)
+        
+        # Preparar valores de la orden de venta
+        order_vals = {
+            'partner_id': partner.id,
+            'partner_invoice_id': partner.id,
+            'partner_shipping_id': partner.id,
+            'date_order': fields.Datetime.now(),
+            'state': 'draft',
+            'client_order_ref': f"FTP-{sheet_name}-Row{row_idx}",
+            'note': self._prepare_order_notes(row_data, sheet_name, row_idx),
+            'order_line': [(0, 0, {
+                'product_id': product.id,
+                'name': product.name,
+                'product_uom_qty': quantity,
+                'price_unit': product.list_price,
+            })]
+        }
+        
+        # Agregar campo de ubicación FSM si existe
+        if fsm_location:
+            order_vals['fsm_location_id'] = fsm_location.id
+        
+        self._apply_mapped_order_values(order_vals, row_data)
+        
+        if import_key:
+            order_vals['ftp_import_key'] = import_key
+        
+        return order_vals
+
+    def _apply_mapped_order_values(self, order_vals, row_data):
+        """
+        Aplica a los valores de la orden las columnas mapeadas a campos de ``sale.order``.
+        
+        Los valores vacíos no reemplazan a los calculados; las columnas 'concatenate'
+        se unen en líneas y, si apuntan a la nota, se agregan a la nota existente.
+        
+        :param order_vals: Valores para sale.order.create, se modifican en el lugar
+        :param row_data: Diccionario con los datos de la fila
+        """
+        SaleOrder = self.env['sale.order']
+        for key, value in (row_data.get(MAPPED_KEY) or {}).items():
+            model_name, _dot, field_name = key.rpartition('.')
+            if model_name != 'sale.order' or field_name in PROTECTED_ORDER_FIELDS:
+                continue
+            if field_name not in SaleOrder._fields:
+                _logger.debug(f"Campo {key} no existe, valor mapeado omitido")
+                continue
+            if isinstance(value, list):
+                value = '\n'.join(value)
+            if value is None or value == '':
+                continue
+            if field_name == 'note' and order_vals.get('note'):
+                value = f"{order_vals['note']}\n{value}"
+            order_vals[field_name] = value
+
+    def _slice_row_range(self, row_range, sheet_name, rows, row_keys, first_row_idx):
+        """
+        Recorta un lote a las filas que pertenecen al tramo de un trabajo.
+        
+        :param row_range: Tupla (nombre_hoja, inicio, fin) con posiciones desde 0
+        :param sheet_name: Hoja del lote
+        :param rows: Filas del lote
+        :param row_keys: Claves de importación de las filas del lote
+        :param first_row_idx: Número (desde 1) de la primera fila del lote en la hoja
+        :return: Tupla (filas, claves, número de la primera fila) del tramo, vacía si no hay
+        :rtype: tuple
+        """
+        range_sheet, range_start, range_stop = row_range
+        if sheet_name != range_sheet:
+            return [], [], first_row_idx
+        lower = max(range_start - (first_row_idx - 1), 0)
+        upper = min(range_stop - (first_row_idx - 1), len(rows))
+        if lower >= upper:
+            return [], [], first_row_idx
+        return rows[lower:upper], row_keys[lower:upper], first_row_idx + lower
+
+    def _skip_checkpointed_rows(self, sheet_name, rows, row_keys, first_row_idx):
+        """
+        Descarta de un lote las filas ya confirmadas antes del punto de control
+        (``resume_point``), que se deja en None al llegar a la primera fila pendiente.
+        
+        :param sheet_name: Hoja del lote
+        :param rows: Filas del lote
+        :param row_keys: Claves de importación de las filas del lote
+        :param first_row_idx: Número (desde 1) de la primera fila del lote en la hoja
+        :return: Tupla (filas, claves, número de la primera fila) pendientes, vacía si no hay
+        :rtype: tuple
+        """
+        checkpoint_sheet, checkpoint_row = self.resume_point
+        if sheet_name != checkpoint_sheet:
+            # Hoja anterior a la del punto de control
+            return [], [], first_row_idx
+        skip = min(max(checkpoint_row - first_row_idx + 1, 0), len(rows))
+        if skip < len(rows):
+            self.resume_point = None
+        return rows[skip:], row_keys[skip:], first_row_idx + skip
+
+    def _commit_checkpoint(self, ftp_file, sheet_name, row_idx, orders_created):
+        """
+        Guarda el punto de control del archivo y confirma la transacción, de modo que
+        si la ejecución se interrumpe después se conserven las órdenes ya creadas.
+        El cursor es el propio de ``reprocess_file`` (bajo pruebas, un cursor de prueba
+        cuyo commit solo cierra un savepoint), nunca el del cron.
+        
+        :param ftp_file: Registro ftp.file en proceso
+        :param sheet_name: Hoja de la última fila confirmada
+        :param row_idx: Número (desde 1) de la última fila confirmada en la hoja
+        :param orders_created: Órdenes creadas del archivo hasta este punto
+        """
+        ftp_file.write({
+            'checkpoint_sheet': sheet_name,
+            'checkpoint_row': row_idx,
+            'checkpoint_orders': orders_created,
+        })
+        self.env.cr.commit()
+        _logger.info(f"Punto de control de {ftp_file.name}: hoja {sheet_name}, fila {row_idx}, "
+                     f"{orders_created} órdenes")
+
+    def _setup_import_plan(self, ftp_file, headers=None):
+        """
+        Identifica el tipo de archivo y carga su plan de importación compilado.
+        
+        El plan (mapeos, columnas clave, tamaño de lote) viene del caché de
+        ``ftp.file.type``, por lo que preparar cada archivo no consulta las columnas.
+        
+        :param ftp_file: Registro del archivo FTP
+        :param headers: Encabezados del primer lote, para identificar el tipo por estructura
+        """
+        self.file_type = self._get_file_type(ftp_file, headers)
+        self.column_mappings = self._get_column_mappings(self.file_type)
+        self.row_key_columns = self._get_row_key_columns(self.file_type)
+        self.group_by_column = self.file_type._get_import_plan().get('group_by') if self.file_type else False
+        self.column_transformer = ColumnTransformer(
+            self.env, self.file_type._get_import_plan().get('columns', ()) if self.file_type else ()
+        )
+        self.column_alias_cache = {}
+
+    def _get_row_key_columns(self, file_type):
+        """
+        Obtiene las columnas marcadas como clave (``is_key``) del tipo de archivo.
+        
+        :param file_type: Registro del tipo de archivo
+        :return: Nombres de las columnas clave, en orden de secuencia
+        :rtype: list
+        """
+        if not file_type:
+            return []
+        return list(file_type._get_import_plan().get('key_columns', ()))
+
+    def _get_row_import_key(self, row_data, key_occurrences):
+        """
+        Calcula la clave de importación determinística de una fila.
+        
+        La clave combina el código del tipo de archivo con los valores de las
+        columnas clave (o, si no hay, con todos los valores de la fila) y el número
+        de ocurrencia de esos valores en el archivo, de modo que filas repetidas
+        dentro de un mismo archivo (p. ej. varios productos de una misma mochila)
+        reciben claves distintas y reprocesar el archivo produce las mismas claves.
+        Las filas de una orden consolidada comparten la clave de su grupo (tipo de
+        archivo + valor de agrupación), que es la que se guarda en la orden.
+        
+        :param row_data: Diccionario con los datos de la fila
+        :param key_occurrences: Contador de ocurrencias por valor clave, compartido en el archivo
+        :return: Clave de importación
+        :rtype: str
+        """
+        group_value = self._get_row_group_value(row_data)
+        if group_value:
+            type_code = self.file_type.code if self.file_type else 'ftp'
+            base_key = json.dumps([type_code, 'group', group_value])
+            return f"{type_code}:{hashlib.sha1(base_key.encode('utf-8')).hexdigest()}"
+        
+        key_values = [str(row_data.get(column) or '').strip() for column in self.row_key_columns]
+        if not any(key_values):
+            key_values = [json.dumps(row_data, sort_keys=True, default=str)]
+        
+        type_code = self.file_type.code if self.file_type else 'ftp'
+        base_key = json.dumps([type_code] + key_values)
+        occurrence = key_occurrences.get(base_key, 0) + 1
+        key_occurrences[base_key] = occurrence
+        
+        digest = hashlib.sha1(f"{base_key}#{occurrence}".encode('utf-8')).hexdigest()
+        return f"{type_code}:{digest}"
+
+    def _get_existing_import_keys(self, import_keys):
+        """
+        Obtiene en una sola consulta las claves de importación que ya tienen orden.
+        
+        :param import_keys: Claves de importación del lote
+        :return: Diccionario clave -> ID de la orden, para las claves que ya existen en sale.order
+        :rtype: dict
+        """
+        if not import_keys:
+            return {}
+        orders = self.env['sale.order'].sudo().search_read(
+            [('ftp_import_key', 'in', import_keys)], ['ftp_import_key']
+        )
+        return {order['ftp_import_key']: order['id'] for order in orders}
+
+    def _get_order_batch_size(self):
+        """
+        Obtiene el tamaño de lote para la creación masiva de órdenes.
+        
+        :return: Cantidad de órdenes por lote, o 0 si el tipo de archivo crea una a una
+        :rtype: int
+        """
+        file_type = getattr(self, 'file_type', None)
+        if not file_type:
+            return 0
+        return file_type._get_import_plan().get('order_chunk_size', 0)
+
+    def _flush_pending_orders(self, pending_orders, results):
+        """
+        Crea en un solo create() las órdenes acumuladas, dentro de un savepoint.
+        
+        Si el lote falla, solo se revierte ese lote y sus filas se reintentan una
+        a una (cada una con su propio savepoint) para aislar la fila con problemas
+        y reportar el resultado de cada fila.
+        
+        :param pending_orders: Lista de dicts con 'vals', 'row_idx', 'sheet_name' y 'row_data'
+            (y 'group_rows' con las demás filas de una orden consolidada)
+        :param results: Diccionario de resultados del procesamiento
+        """
+        if not pending_orders:
+            return
+        
+        sale_order_model = self.env['sale.order'].sudo()
+        try:
+            with self.env.cr.savepoint():
+                sale_orders = sale_order_model.create([pending['vals'] for pending in pending_orders])
+            created = list(zip(pending_orders, sale_orders))
+            _logger.info(f"Lote de {len(sale_orders)} órdenes de venta creado")
+        except Exception as e:
+            _logger.warning(
+                f"Falló el lote de {len(pending_orders)} órdenes, reintentando fila por fila: {str(e)}"
+            )
+            created = []
+            for pending in pending_orders:
+                try:
+                    with self.env.cr.savepoint():
+                        sale_order = sale_order_model.create(pending['vals'])
+                    created.append((pending, sale_order))
+                except Exception as row_error:
+                    self._register_row_error(
+                        results, pending['row_idx'], pending['sheet_name'], pending['row_data'], row_error
+                    )
+                    for row_idx, sheet_name, row_data, _product_id in pending.get('group_rows', []):
+                        self._register_row_error(results, row_idx, sheet_name, row_data, row_error)
+        
+        for pending, sale_order in created:
+            self._register_order_created(
+                results, sale_order, pending['row_idx'], pending['sheet_name'], pending['row_data']
+            )
+            for row_idx, sheet_name, _row_data, product_id in pending.get('group_rows', []):
+                results['rows_processed'] += 1
+                self._record_row_result(
+                    results, sheet_name, row_idx, 'created', partner_id=sale_order.partner_id.id,
+                    product_id=product_id, sale_order_id=sale_order.id
+                )
+        pending_orders.clear()
+
+    def _get_row_group_value(self, row_data):
+        """
+        Obtiene el valor del campo de agrupación (``group_by_field``) de una fila,
+        solo si el tipo de archivo consolida órdenes.
+        
+        :param row_data: Datos de la fila
+        :return: Valor de agrupación o None
+        :rtype: str or None
+        """
+        if not getattr(self, 'group_by_column', False):
+            return None
+        return self._get_first_row_value(row_data, [self.group_by_column])
+
+    def _add_row_to_group(self, groups, group_value, row_data, row_idx, sheet_name, results, import_key):
+        """
+        Agrega una fila a la orden consolidada de su grupo.
+        
+        La primera fila válida del grupo define cliente, técnico y notas de la orden;
+        cada fila aporta una línea por SKU, sumando la cantidad si el SKU se repite.
+        
+        :param groups: Diccionario {valor de agrupación: orden en preparación}
+        :param group_value: Valor de agrupación de la fila
+        :param row_data: Datos de la fila
+        :param row_idx: Índice de la fila en la hoja
+        :param sheet_name: Nombre de la hoja Excel
+        :param results: Diccionario de resultados del procesamiento
+        :param import_key: Clave de importación del grupo
+        """
+        # Solo lo necesario para el log y el registro por fila, no la fila completa
+        row_summary = {'sku': self._get_row_sku(row_data) or '', 'tecnico': row_data.get('tecnico', '')}
+        group = groups.get(group_value)
+        if group is None:
+            order_vals = self._prepare_sale_order_vals(row_data, row_idx, sheet_name, results, import_key=import_key)
+            if not order_vals:
+                results['rows_skipped'] += 1
+                return
+            order_vals['client_order_ref'] = f"FTP-{group_value}"
+            line_vals = order_vals['order_line'][0][2]
+            groups[group_value] = {
+                'vals': order_vals,
+                'lines': {line_vals['product_id']: line_vals},
+                'row_idx': row_idx,
+                'sheet_name': sheet_name,
+                'row_data': row_summary,
+                'group_rows': [],
+            }
+            return
+        
+        product = self._get_product_by_sku(row_data, results)
+        if not product:
+            results['rows_skipped'] += 1
+            results['warnings'].append(
+                f"Fila {row_idx}: No se encontró producto con SKU {self._get_row_sku(row_data) or 'N/A'}"
+            )
+            self._record_row_result(
+                results, sheet_name, row_idx, 'skipped', error_code='product_not_found',
+                message=f"SKU {self._get_row_sku(row_data) or 'N/A'}"
+            )
+            return
+        
+        quantity = self._get_quantity_from_row(row_data)
+        line_vals = group['lines'].get(product.id)
+        if line_vals:
+            line_vals['product_uom_qty'] += quantity
+        else:
+            group['lines'][product.id] = {
+                'product_id': product.id,
+                'name': product.name,
+                'product_uom_qty': quantity,
+                'price_unit': product.list_price,
+            }
+        group['group_rows'].append((row_idx, sheet_name, row_summary, product.id))
+
+    def _create_grouped_orders(self, groups, pending_orders, batch_size, results):
+        """
+        Crea las órdenes consolidadas del archivo, en lotes del tamaño configurado.
+        
+        :param groups: Diccionario {valor de agrupación: orden en preparación}
+        :param pending_orders: Lista de órdenes pendientes de crear
+        :param batch_size: Órdenes por lote (0 = una a una)
+        :param results: Diccionario de resultados del procesamiento
+        """
+        for group_value, group in groups.items():
+            order_vals = group['vals']
+            order_vals['order_line'] = [(0, 0, line_vals) for line_vals in group['lines'].values()]
+            row_count = len(group['group_rows']) + 1
+            if row_count > 1:
+                order_vals['note'] = (
+                    f"{order_vals['note']}\nFilas consolidadas ({group_value}): {row_count}"
+                )
+            pending_orders.append({
+                'vals': order_vals,
+                'row_idx': group['row_idx'],
+                'sheet_name': group['sheet_name'],
+                'row_data': group['row_data'],
+                'group_rows': group['group_rows'],
+            })
+            if len(pending_orders) >= max(batch_size, 1):
+                self._flush_pending_orders(pending_orders, results)
+        groups.clear()
+
+    def _register_order_created(self, results, sale_order, row_idx, sheet_name, row_data):
+        """
+        Registra en los resultados una orden creada para una fila.
+        
+        :param results: Diccionario de resultados del procesamiento
+        :param sale_order: Orden de venta creada
+        :param row_idx: Índice de la fila en la hoja
+        :param sheet_name: Nombre de la hoja Excel
+        :param row_data: Datos de la fila
+        """
+        results['orders'].append({
+            'id': sale_order.id,
+            'name': sale_order.name,
+            'row': row_idx,
+            'sheet': sheet_name
+        })
+        results['orders_created'] += 1
+        results['rows_processed'] += 1
+        self._record_row_result(
+            results, sheet_name, row_idx, 'created',
+            partner_id=sale_order.partner_id.id,
+            product_id=sale_order.order_line[:1].product_id.id,
+            sale_order_id=sale_order.id
+        )
+        
+        # Registrar éxito en el log
+        if self.row_log_verbose:
+            self._log_row(results, (
+                f"✓ Fila {row_idx} procesada exitosamente | "
+                f"Orden: {sale_order.name} | "
+                f"Cliente: {sale_order.partner_id.name} | "
+                f"SKU: {self._get_row_sku(row_data) or 'N/A'} | "
+                f"Técnico: {row_data.get('tecnico', 'N/A')}"
+            ))
+
+    def _register_row_error(self, results, row_idx, sheet_name, row_data, error):
+        """
+        Registra en los resultados el error de una fila.
+        
+        :param results: Diccionario de resultados del procesamiento
+        :param row_idx: Índice de la fila en la hoja
+        :param sheet_name: Nombre de la hoja Excel
+        :param row_data: Datos de la fila
+        :param error: Excepción capturada
+        """
+        results['rows_skipped'] += 1
+        results['rows_failed'] += 1
+        self._record_row_result(
+            results, sheet_name, row_idx, 'error', error_code='create_failed', message=str(error)
+        )
+        if self.row_log_verbose:
+            results['errors'].append(f"Error en fila {row_idx}: {str(error)}")
+        else:
+            results['row_errors_omitted'] += 1
+        
+        # Registrar error en el log
+        self._log_row(results, (
+            f"✗ Error procesando fila {row_idx} | "
+            f"Error: {str(error)} | "
+            f"SKU: {self._get_row_sku(row_data) or 'N/A'}"
+        ), logging.ERROR)
+
+    def _record_row_result(self, results, sheet_name, row_idx, status, **values):
+        """
+        Agrega el resultado de una fila al lote pendiente de ``ftp.file.row``.
+        
+        Al superar ``row_log_limit`` filas el log de texto pasa a registrar solo el resumen.
+        
+        :param results: Diccionario de resultados del procesamiento
+        :param sheet_name: Nombre de la hoja Excel
+        :param row_idx: Índice de la fila en la hoja
+        :param status: Estado de la fila (created, already_imported, skipped, error)
+        :param values: error_code, message, partner_id, product_id y sale_order_id opcionales
+        """
+        values.update(sheet_name=sheet_name, row_index=row_idx, status=status)
+        results['row_results'].append(values)
+        results['rows_recorded'] += 1
+        if self.row_log_verbose and results['rows_recorded'] > self.row_log_limit:
+            self.row_log_verbose = False
+            results['processing_log'].append(
+                f"... Más de {self.row_log_limit} filas: el detalle por fila continúa "
+                f"solo en Resultados por Fila"
+            )
+
+    def _flush_row_results(self, ftp_file, results):
+        """
+        Inserta en una sola sentencia los resultados por fila pendientes.
+        
+        :param ftp_file: Registro del archivo FTP
+        :param results: Diccionario de resultados del procesamiento
+        """
+        if results['row_results']:
+            self.env['ftp.file.row']._bulk_insert(ftp_file.id, results['row_results'])
+            results['row_results'] = []
+
+    def _log_row(self, results, log_entry, level=logging.INFO):
+        """
+        Registra el detalle de una fila en el log de texto y en el logger,
+        solo mientras el archivo no supere el umbral de detalle.
+        
+        :param results: Diccionario de resultados del procesamiento
+        :param log_entry: Texto de la fila
+        :param level: Nivel de logging
+        """
+        if self.row_log_verbose:
+            results['processing_log'].append(log_entry)
+        self._log_detail(log_entry, level)
+
+    def _log_detail(self, message, level=logging.INFO):
+        """
+        Emite un mensaje por fila con su nivel, o en DEBUG cuando la ejecución
+        ya pasó a registrar solo el resumen.
+        
+        :param message: Texto a registrar
+        :param level: Nivel de logging
+        """
+        _logger.log(level if getattr(self, 'row_log_verbose', True) else logging.DEBUG, message)
     
-    def _get_file_type(self, ftp_file):
+    def _get_file_type(self, ftp_file, headers=None):
         """
         Identifica el tipo de archivo basándose en el nombre o contenido.
         
         :param ftp_file: Registro del archivo FTP
-        :return: Registro ftp.file.type o None
-        :rtype: ftp.file.type or None
+        :param headers: Encabezados del archivo (opcional), para identificar por estructura
+        :return: Registro ftp.file.type o False
+        :rtype: ftp.file.type or bool
         """
-        # Intentar identificar por nombre de archivo
+        # Intentar identificar por nombre de archivo y luego por encabezados
         file_type_model = self.env['ftp.file.type']
-        file_type = file_type_model.identify_file_type(ftp_file.name)
+        file_type = file_type_model.identify_file_type(ftp_file.name, headers=headers)
         
         if file_type:
             _logger.info(f"Tipo de archivo identificado: {file_type.name}")
@@ -257,29 +979,15 @@ class SaleOrderProcessor(models.Model):
         """
         Obtiene el mapeo de columnas configurado para el tipo de archivo.
         
+        El mapeo proviene del plan de importación en caché y no debe modificarse.
+        
         :param file_type: Registro del tipo de archivo
         :return: Diccionario con mapeos de columnas
         :rtype: dict
         """
-        mappings = {}
-        
         if not file_type:
-            return mappings
-        
-        for column in file_type.column_ids:
-            if column.target_model and column.target_field:
-                key = f"{column.target_model}.{column.target_field}"
-                mappings[key] = {
-                    'column_name': column.name,
-                    'technical_name': column.technical_name or column.name,
-                    'data_type': column.data_type,
-                    'mapping_type': column.mapping_type,
-                    'is_required': column.is_required,
-                    'default_value': column.default_value,
-                }
-                _logger.debug(f"Mapeo configurado: {key} -> {column.name}")
-        
-        return mappings
+            return {}
+        return file_type._get_import_plan().get('column_mappings', {})
     
     def _get_mapped_value(self, row_data, model_name, field_name):
         """
@@ -305,9 +1013,459 @@ class SaleOrderProcessor(models.Model):
         
         if value and str(value).strip():
             return str(value).strip()
+
+        return None
+
+    def _normalize_rows(self, rows):
+        """
+        Normaliza y valida un lote de filas con pandas antes del ciclo por fila.
+        
+        Cada fila válida se devuelve como una copia con sus valores normalizados
+        en ``NORMALIZED_KEY``; las filas rechazadas se devuelven sin cambios.
+        
+        :param rows: Lista de diccionarios de filas
+        :return: Tupla (filas en el mismo orden, {posición: motivo de rechazo})
+        :rtype: tuple
+        """
+        if not rows:
+            return rows, {}
+        
+        line_values = {
+            field: [self._get_line_value(row, field) for row in rows]
+            for field in LINE_MAPPING_KEYS if self._has_line_mapping(field)
+        }
+        clean, rejected = self._normalize_frame(pd.DataFrame.from_records(rows), line_values)
+        normalized_rows = list(rows)
+        for position, values in clean.to_dict('index').items():
+            normalized_rows[position] = dict(rows[position], **{NORMALIZED_KEY: values})
+        return normalized_rows, rejected['reason'].to_dict()
+
+    def _transform_rows(self, rows):
+        """
+        Aplica a las filas del lote las transformaciones de las columnas del tipo de
+        archivo (``ColumnTransformer``) y guarda sus valores en ``MAPPED_KEY``, de donde
+        salen los campos de la orden y los datos de las líneas (``LINE_MAPPING_KEYS``).
+        
+        :param rows: Filas del lote (no se modifican)
+        :return: Tupla (copias de las filas con sus valores mapeados, {posición: motivo de rechazo})
+        :rtype: tuple
+        """
+        transformer = getattr(self, 'column_transformer', None)
+        if not transformer or not rows:
+            return rows, {}
+        mapped_rows, errors = transformer.transform(rows)
+        transformed = [dict(row, **{MAPPED_KEY: mapped}) for row, mapped in zip(rows, mapped_rows)]
+        return transformed, {
+            position: f"transformación fallida ({error})" for position, error in errors.items()
+        }
+
+    def _normalize_frame(self, frame, line_values):
+        """
+        Normaliza un lote de filas a nivel de DataFrame.
+        
+        RUT, SKU y cantidad vienen de las columnas mapeadas (ya transformadas) cuando
+        el tipo de archivo las tiene; para los demás datos se resuelve una sola vez qué
+        columnas comunes del archivo los contienen. Se calcula en forma vectorizada el
+        primer valor no vacío de cada dato, las claves de RUT normalizadas, la cantidad
+        numérica (1 por defecto) y la completitud de la fila.
+        
+        :param frame: DataFrame con las filas del lote (índice = posición en el lote)
+        :param line_values: Diccionario {dato mapeado de LINE_MAPPING_KEYS: lista de valores por fila}
+        :return: Tupla (DataFrame limpio con columnas normalizadas, DataFrame de rechazados con 'reason')
+        :rtype: tuple
+        """
+        aliases = self._get_column_aliases(tuple(frame.columns))
+        
+        normalized = pd.DataFrame(index=frame.index)
+        for field in ('rut', 'sku'):
+            if field in line_values:
+                normalized[field] = pd.Series(line_values[field], index=frame.index, dtype=object) \
+                    .fillna('').astype(str).str.strip()
+            else:
+                normalized[field] = self._first_non_empty(frame, aliases[field])
+        for field in ('technician_rut', 'technician_name', 'description'):
+            normalized[field] = self._first_non_empty(frame, aliases[field])
+        normalized['rut_key'] = self._normalize_rut_series(normalized['rut'])
+        normalized['technician_rut_key'] = self._normalize_rut_series(normalized['technician_rut'])
+        
+        if 'quantity' in line_values:
+            quantity = pd.to_numeric(pd.Series(line_values['quantity'], index=frame.index, dtype=object), errors='coerce')
+            quantity = quantity.where(quantity > 0)
+        else:
+            quantity = pd.Series(float('nan'), index=frame.index)
+            for column in aliases['quantity']:
+                values = pd.to_numeric(frame[column], errors='coerce')
+                quantity = quantity.fillna(values.where(values > 0))
+        normalized['quantity'] = quantity.fillna(1.0)
+        
+        # Al menos debe tener SKU o descripción
+        complete = (normalized['sku'] != '') | (normalized['description'] != '')
+        rejected = pd.DataFrame({'reason': 'datos incompletos'}, index=normalized.index[~complete])
+        return normalized[complete], rejected
+
+    def _get_column_aliases(self, columns):
+        """
+        Obtiene, por cada dato normalizado, las columnas comunes presentes que lo contienen.
         
+        El resultado se guarda por conjunto de encabezados, por lo que se calcula
+        una vez por hoja y no por fila.
+        
+        :param columns: Tupla con los encabezados del lote
+        :return: Diccionario {dato: [columnas en orden de prioridad]}
+        :rtype: dict
+        """
+        cache = getattr(self, 'column_alias_cache', None)
+        if cache is None:
+            cache = self.column_alias_cache = {}
+        if columns in cache:
+            return cache[columns]
+        
+        candidates = dict(LINE_COLUMN_ALIASES, **{
+            'technician_rut': TECHNICIAN_RUT_COLUMNS,
+            'technician_name': TECHNICIAN_NAME_COLUMNS,
+            'description': DESCRIPTION_COLUMNS,
+        })
+        present = set(columns)
+        cache[columns] = {
+            field: [column for column in dict.fromkeys(names) if column in present]
+            for field, names in candidates.items()
+        }
+        return cache[columns]
+
+    def _first_non_empty(self, frame, columns):
+        """
+        Obtiene por fila el primer valor no vacío (como texto sin espacios) entre varias columnas.
+        
+        :param frame: DataFrame del lote
+        :param columns: Columnas en orden de prioridad
+        :return: Serie de textos ('' si ninguna columna tiene valor)
+        :rtype: pandas.Series
+        """
+        result = pd.Series('', index=frame.index, dtype=object)
+        for column in columns:
+            values = frame[column].fillna('').astype(str).str.strip()
+            result = result.where(result != '', values)
+        return result
+
+    def _normalize_rut_series(self, ruts):
+        """
+        Versión vectorizada de _normalize_rut.
+        
+        :param ruts: Serie de RUTs como texto
+        :return: Serie de RUTs en mayúsculas sin puntos, guiones ni espacios
+        :rtype: pandas.Series
+        """
+        return ruts.str.strip().str.upper().str.replace(r'[.\- ]', '', regex=True)
+
+    def _get_first_row_value(self, row_data, column_names):
+        """
+        Obtiene el primer valor no vacío de una lista de columnas posibles.
+
+        :param row_data: Datos de la fila
+        :param column_names: Nombres de columna en orden de prioridad
+        :return: Valor encontrado (sin espacios) o None
+        :rtype: str or None
+        """
+        for col_name in column_names:
+            if col_name in row_data and row_data[col_name]:
+                value = str(row_data[col_name]).strip()
+                if value:
+                    return value
         return None
+
+    def _normalize_rut(self, rut_value):
+        """
+        Normaliza un RUT a mayúsculas sin puntos, guiones ni espacios.
+
+        :param rut_value: RUT tal como viene en el archivo o en res.partner
+        :return: RUT normalizado ('' si no hay valor)
+        :rtype: str
+        """
+        if not rut_value:
+            return ''
+        return str(rut_value).strip().upper().replace('.', '').replace('-', '').replace(' ', '')
+
+    def _get_rut_variations(self, rut_value):
+        """
+        Genera las variaciones de formato con las que se busca un RUT en res.partner.
+
+        :param rut_value: RUT tal como viene en el archivo
+        :return: Lista de variaciones sin duplicados
+        :rtype: list
+        """
+        rut_clean = str(rut_value).strip().upper()
+        variations = [
+            rut_clean,
+            rut_clean.replace('-', ''),
+            rut_clean.replace('.', ''),
+            rut_clean.replace('-', '').replace('.', '')
+        ]
+        return list(dict.fromkeys(variations))
+
+    def _has_line_mapping(self, field):
+        """
+        Indica si el tipo de archivo tiene una columna mapeada (no ignorada) al dato de líneas.
+        
+        :param field: Dato de líneas ('rut', 'sku' o 'quantity', ver LINE_MAPPING_KEYS)
+        :return: True si hay mapeo
+        :rtype: bool
+        """
+        mapping = (getattr(self, 'column_mappings', None) or {}).get(LINE_MAPPING_KEYS[field])
+        return bool(mapping) and mapping['mapping_type'] != 'ignore'
     
+    def _get_line_value(self, row_data, field):
+        """
+        Obtiene un dato de las líneas desde la columna mapeada a él.
+        
+        Usa el valor transformado de la fila si existe y, si no, el texto de la columna;
+        sin mapeo (tipo no identificado o sin esa columna) se busca en las columnas
+        comunes de ``LINE_COLUMN_ALIASES``.
+        
+        :param row_data: Datos de la fila
+        :param field: Dato buscado ('rut', 'sku' o 'quantity', ver LINE_MAPPING_KEYS)
+        :return: Valor encontrado o None si está vacío
+        :rtype: any
+        """
+        if not self._has_line_mapping(field):
+            return self._get_first_row_value(row_data, LINE_COLUMN_ALIASES[field])
+        mapping_key = LINE_MAPPING_KEYS[field]
+        if MAPPED_KEY in row_data:
+            value = row_data[MAPPED_KEY].get(mapping_key)
+            return None if value == '' else value
+        model_name, _dot, field_name = mapping_key.rpartition('.')
+        return self._get_mapped_value(row_data, model_name, field_name)
+
+    def _get_row_rut(self, row_data):
+        """
+        Obtiene el RUT de la fila desde la columna mapeada a ``fsm.location.partner_id``
+        o, sin mapeo, desde las columnas comunes de RUT.
+
+        :param row_data: Datos de la fila
+        :return: RUT encontrado o None
+        :rtype: str or None
+        """
+        if NORMALIZED_KEY in row_data:
+            return row_data[NORMALIZED_KEY]['rut'] or None
+        rut_value = self._get_line_value(row_data, 'rut')
+        if rut_value is None:
+            return None
+        return str(rut_value).strip() or None
+
+    def _get_row_sku(self, row_data):
+        """
+        Obtiene el SKU de la fila desde la columna mapeada a ``product.template.default_code``
+        o, sin mapeo, desde las columnas comunes de código de producto.
+
+        :param row_data: Datos de la fila
+        :return: SKU encontrado o None
+        :rtype: str or None
+        """
+        if NORMALIZED_KEY in row_data:
+            return row_data[NORMALIZED_KEY]['sku'] or None
+        sku = self._get_line_value(row_data, 'sku')
+        if sku is None:
+            return None
+        return str(sku).strip() or None
+
+    def _get_row_technician_rut(self, row_data):
+        """
+        Obtiene el RUT del técnico de la fila.
+
+        :param row_data: Datos de la fila
+        :return: RUT del técnico o None
+        :rtype: str or None
+        """
+        if NORMALIZED_KEY in row_data:
+            return row_data[NORMALIZED_KEY]['technician_rut'] or None
+        return self._get_first_row_value(row_data, TECHNICIAN_RUT_COLUMNS)
+
+    def _get_row_technician_name(self, row_data):
+        """
+        Obtiene el nombre del técnico de la fila.
+
+        :param row_data: Datos de la fila
+        :return: Nombre del técnico o None
+        :rtype: str or None
+        """
+        if NORMALIZED_KEY in row_data:
+            return row_data[NORMALIZED_KEY]['technician_name'] or None
+        return self._get_first_row_value(row_data, TECHNICIAN_NAME_COLUMNS)
+
+    def _build_lookup_index(self, rows, index=None):
+        """
+        Resuelve en bloque los RUT, nombres de técnico y SKUs de un conjunto de filas.
+
+        Recorre las filas una sola vez para recolectar los valores distintos y los
+        resuelve con unas pocas consultas ``in`` por conjunto y el índice de nombres de técnico,
+        dejando diccionarios en memoria para que el ciclo por fila solo haga
+        búsquedas O(1). Si se entrega un índice existente, solo se resuelven los
+        valores que aún no estén en él.
+
+        :param rows: Iterable de diccionarios de filas
+        :param index: Índice previo a extender (opcional)
+        :return: Índice con las llaves 'location_by_rut', 'location_by_name' y 'product_by_sku'
+        :rtype: dict
+        """
+        if index is None:
+            index = {
+                'location_by_rut': {},
+                'location_by_name': {},
+                'product_by_sku': {},
+            }
+
+        ruts = {}
+        names = set()
+        skus = set()
+        for row_data in rows:
+            for rut_value in (self._get_row_rut(row_data), self._get_row_technician_rut(row_data)):
+                rut_key = self._normalize_rut(rut_value)
+                if rut_key and rut_key not in index['location_by_rut']:
+                    ruts.setdefault(rut_key, rut_value)
+            technician_name = self._get_row_technician_name(row_data)
+            if technician_name and technician_name not in index['location_by_name']:
+                names.add(technician_name)
+            sku = self._get_row_sku(row_data)
+            if sku and sku not in index['product_by_sku']:
+                skus.add(sku)
+
+        if ruts:
+            index['location_by_rut'].update(self._resolve_locations_by_rut(ruts))
+        if names:
+            index['location_by_name'].update(self._resolve_locations_by_name(names))
+        if skus:
+            index['product_by_sku'].update(self._resolve_products_by_sku(skus))
+
+        _logger.info(
+            f"Índice de búsqueda resuelto: {len(ruts)} RUT, {len(names)} técnicos, "
+            f"{len(skus)} SKUs nuevos"
+        )
+        return index
+
+    def _resolve_locations_by_rut(self, ruts):
+        """
+        Resuelve RUTs a ubicaciones FSM con una búsqueda por conjunto sobre res.partner.
+
+        :param ruts: Diccionario {rut normalizado: rut original}
+        :return: Diccionario {rut normalizado: fsm.location o None}
+        :rtype: dict
+        """
+        variations = set()
+        for rut_value in ruts.values():
+            variations.update(self._get_rut_variations(rut_value))
+
+        partners = self.env['res.partner']
+        variations = list(variations)
+        for start in range(0, len(variations), LOOKUP_QUERY_CHUNK):
+            partners |= self.env['res.partner'].search([
+                ('vat', 'in', variations[start:start + LOOKUP_QUERY_CHUNK])
+            ])
+
+        location_by_partner = self._get_locations_by_partner(partners)
+
+        resolved = dict.fromkeys(ruts)
+        for partner in partners:
+            rut_key = self._normalize_rut(partner.vat)
+            location = location_by_partner.get(partner.id)
+            if rut_key in resolved and location and not resolved[rut_key]:
+                resolved[rut_key] = location
+        return resolved
+
+    def _resolve_locations_by_name(self, names):
+        """
+        Resuelve nombres de técnico a ubicaciones FSM con el índice de nombres
+        (``ftp.technician.matcher``), sin consultas ``ilike`` sobre res.partner.
+
+        La comparación ignora tildes, mayúsculas y puntuación, y acepta iniciales
+        ("J.PEREZ" / "Juan Pérez"); bajo ``name_match_threshold`` no hay coincidencia.
+
+        :param names: Conjunto de nombres de técnico
+        :return: Diccionario {nombre: fsm.location o None}
+        :rtype: dict
+        """
+        resolved = {}
+        for name, (location, score) in self.env['ftp.technician.matcher'].match_names(names).items():
+            resolved[name] = location or None
+            if location and score < 1.0:
+                self._log_detail(f"Técnico '{name}' asociado a '{location.partner_id.name}' (similitud {score:.2f})")
+        return resolved
+
+    def _match_technician_name(self, technician_name):
+        """
+        Busca la ubicación FSM de un nombre de técnico con el índice de nombres.
+
+        :param technician_name: Nombre del técnico tal como viene en la fila
+        :return: fsm.location encontrado o None
+        :rtype: fsm.location or None
+        """
+        name = str(technician_name).strip()
+        return self._resolve_locations_by_name([name]).get(name)
+
+    def _resolve_products_by_sku(self, skus):
+        """
+        Resuelve SKUs a productos buscando primero en product.product y luego en product.template.
+
+        :param skus: Conjunto de SKUs
+        :return: Diccionario {sku: product.product o None}
+        :rtype: dict
+        """
+        skus = list(skus)
+        resolved = dict.fromkeys(skus)
+        for start in range(0, len(skus), LOOKUP_QUERY_CHUNK):
+            products = self.env['product.product'].search([
+                ('default_code', 'in', skus[start:start + LOOKUP_QUERY_CHUNK])
+            ])
+            for product in products:
+                if not resolved.get(product.default_code):
+                    resolved[product.default_code] = product
+
+        missing = [sku for sku, product in resolved.items() if not product]
+        for start in range(0, len(missing), LOOKUP_QUERY_CHUNK):
+            templates = self.env['product.template'].search([
+                ('default_code', 'in', missing[start:start + LOOKUP_QUERY_CHUNK])
+            ])
+            for template in templates:
+                if template.product_variant_ids and not resolved.get(template.default_code):
+                    resolved[template.default_code] = template.product_variant_ids[0]
+        return resolved
+
+    def _get_locations_by_partner(self, partners):
+        """
+        Obtiene la primera ubicación FSM de cada partner con una sola búsqueda.
+
+        :param partners: Recordset de res.partner
+        :return: Diccionario {partner_id: fsm.location}
+        :rtype: dict
+        """
+        location_by_partner = {}
+        if not partners:
+            return location_by_partner
+        for location in self.env['fsm.location'].search([('partner_id', 'in', partners.ids)]):
+            location_by_partner.setdefault(location.partner_id.id, location)
+        return location_by_partner
+
+    def _get_fsm_location_from_index(self, row_data, index):
+        """
+        Busca la ubicación FSM de la fila en el índice precalculado, por RUT del
+        técnico y luego por nombre, igual que _get_fsm_location.
+
+        :param row_data: Datos de la fila
+        :param index: Índice generado por _build_lookup_index
+        :return: fsm.location encontrado o None
+        :rtype: fsm.location or None
+        """
+        if NORMALIZED_KEY in row_data:
+            technician_rut_key = row_data[NORMALIZED_KEY]['technician_rut_key']
+        else:
+            technician_rut_key = self._normalize_rut(self._get_first_row_value(row_data, TECHNICIAN_RUT_COLUMNS))
+        location = index['location_by_rut'].get(technician_rut_key)
+        if location:
+            return location
+
+        technician_name = self._get_row_technician_name(row_data)
+        if technician_name:
+            return index['location_by_name'].get(technician_name)
+        return None
+
     def _get_partner(self, row_data):
         """
         Busca un partner (cliente) en fsm.location usando el mapeo dinámico de columnas.
@@ -318,24 +1476,32 @@ class SaleOrderProcessor(models.Model):
         :return: Partner del técnico encontrado en fsm.location o None
         :rtype: res.partner or None
         """
+        # Usar el índice precalculado del archivo si está disponible
+        index = getattr(self, 'lookup_index', None)
+        if index is not None:
+            fsm_location = self._get_fsm_location_from_index(row_data, index)
+            if not (fsm_location and fsm_location.partner_id):
+                if NORMALIZED_KEY in row_data:
+                    rut_key = row_data[NORMALIZED_KEY]['rut_key']
+                else:
+                    rut_key = self._normalize_rut(self._get_row_rut(row_data))
+                fsm_location = index['location_by_rut'].get(rut_key)
+            if fsm_location and fsm_location.partner_id:
+                return fsm_location.partner_id
+            self._log_detail("No se pudo identificar el partner/técnico desde FSM Location", logging.WARNING)
+            return None
+
         # Buscar FSM Location (técnico) y obtener su partner asociado
         fsm_location = self._get_fsm_location(row_data)
         
         if fsm_location and fsm_location.partner_id:
-            _logger.info(f"Partner encontrado desde FSM Location: {fsm_location.partner_id.name} (Técnico: {fsm_location.name})")
+            self._log_detail(f"Partner encontrado desde FSM Location: {fsm_location.partner_id.name} (Técnico: {fsm_location.name})")
             return fsm_location.partner_id
         
         # Si no hay mapeo configurado o no se encuentra fsm_location, intentar búsqueda directa
         if hasattr(self, 'column_mappings'):
-            # Buscar columnas que contengan RUT del técnico según mapeo configurado
-            rut_value = self._get_mapped_value(row_data, 'fsm.location', 'partner_id')
-            
-            # Si no hay mapeo específico, buscar en columnas comunes de RUT técnico
-            if not rut_value:
-                for col_name in ['rut', 'rut.tecnico', 'rut_tecnico', 'tecnico_rut', 'rut.del.tecnico']:
-                    if col_name in row_data and row_data[col_name]:
-                        rut_value = str(row_data[col_name]).strip()
-                        break
+            # RUT según el mapeo configurado o, sin mapeo, las columnas comunes de RUT
+            rut_value = self._get_row_rut(row_data)
             
             if rut_value:
                 # Limpiar y formatear RUT
@@ -358,41 +1524,30 @@ class SaleOrderProcessor(models.Model):
                     if fsm_locations:
                         # Tomar la primera ubicación encontrada
                         fsm_location = fsm_locations[0]
-                        _logger.info(f"Partner encontrado por RUT en FSM Location: {fsm_location.partner_id.name} (RUT: {rut_var})")
+                        self._log_detail(f"Partner encontrado por RUT en FSM Location: {fsm_location.partner_id.name} (RUT: {rut_var})")
                         return fsm_location.partner_id
                 
-                _logger.warning(f"No se encontró FSM Location con partner que tenga RUT: {rut_value}")
+                self._log_detail(f"No se encontró FSM Location con partner que tenga RUT: {rut_value}", logging.WARNING)
             
             # Buscar por nombre del técnico
-            technician_name = None
-            for col_name in ['tecnico', 'nombre.tecnico', 'nombre_tecnico', 'tecnico.nombre']:
-                if col_name in row_data and row_data[col_name]:
-                    technician_name = str(row_data[col_name]).strip()
-                    break
+            technician_name = self._get_row_technician_name(row_data)
             
             if technician_name:
                 # Buscar FSM location por nombre del partner
-                fsm_locations = self.env['fsm.location'].search([
-                    ('partner_id.name', 'ilike', technician_name)
-                ])
+                fsm_location = self._match_technician_name(technician_name)
                 
-                if fsm_locations:
-                    fsm_location = fsm_locations[0]
-                    _logger.info(f"Partner encontrado por nombre en FSM Location: {fsm_location.partner_id.name}")
+                if fsm_location:
+                    self._log_detail(f"Partner encontrado por nombre en FSM Location: {fsm_location.partner_id.name}")
                     return fsm_location.partner_id
                 
-                _logger.warning(f"No se encontró FSM Location con partner que tenga nombre: {technician_name}")
+                self._log_detail(f"No se encontró FSM Location con partner que tenga nombre: {technician_name}", logging.WARNING)
         
         else:
             # Fallback: búsqueda sin mapeo configurado
-            _logger.warning("No hay mapeo de columnas configurado, buscando técnico por defecto")
+            self._log_detail("No hay mapeo de columnas configurado, buscando técnico por defecto", logging.WARNING)
             
             # Buscar RUT del técnico
-            rut_tecnico = None
-            for field in ['rut', 'rut.tecnico', 'rut_tecnico']:
-                if field in row_data and row_data[field]:
-                    rut_tecnico = str(row_data[field]).strip()
-                    break
+            rut_tecnico = self._get_row_rut(row_data)
             
             if rut_tecnico:
                 rut_clean = rut_tecnico.upper()
@@ -401,20 +1556,18 @@ class SaleOrderProcessor(models.Model):
                         ('partner_id.vat', '=', variation)
                     ])
                     if fsm_locations:
-                        _logger.info(f"Partner encontrado (fallback) en FSM: {fsm_locations[0].partner_id.name}")
+                        self._log_detail(f"Partner encontrado (fallback) en FSM: {fsm_locations[0].partner_id.name}")
                         return fsm_locations[0].partner_id
             
             # Buscar por nombre del técnico
             nombre_tecnico = row_data.get('tecnico', '') or row_data.get('nombre_tecnico', '')
             if nombre_tecnico:
-                fsm_locations = self.env['fsm.location'].search([
-                    ('partner_id.name', 'ilike', str(nombre_tecnico).strip())
-                ])
-                if fsm_locations:
-                    _logger.info(f"Partner encontrado por nombre (fallback) en FSM: {fsm_locations[0].partner_id.name}")
-                    return fsm_locations[0].partner_id
-        
-        _logger.warning("No se pudo identificar el partner/técnico desde FSM Location")
+                fsm_location = self._match_technician_name(nombre_tecnico)
+                if fsm_location:
+                    self._log_detail(f"Partner encontrado por nombre (fallback) en FSM: {fsm_location.partner_id.name}")
+                    return fsm_location.partner_id
+        
+        self._log_detail("No se pudo identificar el partner/técnico desde FSM Location", logging.WARNING)
         return None
     
     def _get_fsm_location(self, row_data):
@@ -427,18 +1580,19 @@ class SaleOrderProcessor(models.Model):
         :rtype: fsm.location or None
         """
         fsm_location = None
-        
+
+        # Usar el índice precalculado del archivo si está disponible
+        index = getattr(self, 'lookup_index', None)
+        if index is not None:
+            return self._get_fsm_location_from_index(row_data, index)
+
         # Intentar buscar usando mapeo configurado
         if hasattr(self, 'column_mappings'):
             # Buscar mapeo directo para fsm.location
             location_id = self._get_mapped_value(row_data, 'fsm.location', 'partner_id')
             
             # Buscar RUT del técnico con mapeo o en columnas comunes
-            technician_rut = None
-            for col_name in ['rut.tecnico', 'rut_tecnico', 'tecnico_rut', 'rut.del.tecnico']:
-                if col_name in row_data and row_data[col_name]:
-                    technician_rut = str(row_data[col_name]).strip()
-                    break
+            technician_rut = self._get_row_technician_rut(row_data)
             
             if technician_rut:
                 # Limpiar RUT
@@ -463,48 +1617,31 @@ class SaleOrderProcessor(models.Model):
                         ], limit=1)
                         
                         if fsm_location:
-                            _logger.info(f"FSM Location encontrada por RUT técnico: {partner.name} (RUT: {rut_var})")
+                            self._log_detail(f"FSM Location encontrada por RUT técnico: {partner.name} (RUT: {rut_var})")
                             return fsm_location
                 
-                _logger.warning(f"No se encontró FSM Location para técnico con RUT: {technician_rut}")
+                self._log_detail(f"No se encontró FSM Location para técnico con RUT: {technician_rut}", logging.WARNING)
             
             # Buscar por nombre del técnico
-            technician_name = None
-            for col_name in ['tecnico', 'nombre.tecnico', 'nombre_tecnico', 'tecnico.nombre']:
-                if col_name in row_data and row_data[col_name]:
-                    technician_name = str(row_data[col_name]).strip()
-                    break
+            technician_name = self._get_row_technician_name(row_data)
             
             if technician_name:
-                # Buscar partner por nombre
-                partner = self.env['res.partner'].search([
-                    ('name', '=', technician_name)
-                ], limit=1)
-                
-                if not partner:
-                    # Búsqueda parcial
-                    partner = self.env['res.partner'].search([
-                        ('name', 'ilike', technician_name)
-                    ], limit=1)
+                # Buscar por nombre en el índice de técnicos (exacto o aproximado)
+                fsm_location = self._match_technician_name(technician_name)
                 
-                if partner:
-                    fsm_location = self.env['fsm.location'].search([
-                        ('partner_id', '=', partner.id)
-                    ], limit=1)
-                    
-                    if fsm_location:
-                        _logger.info(f"FSM Location encontrada por nombre: {technician_name}")
-                        return fsm_location
+                if fsm_location:
+                    self._log_detail(f"FSM Location encontrada por nombre: {technician_name}")
+                    return fsm_location
                 
-                _logger.warning(f"No se encontró FSM Location para técnico: {technician_name}")
+                self._log_detail(f"No se encontró FSM Location para técnico: {technician_name}", logging.WARNING)
         
         else:
             # Fallback: búsqueda tradicional sin mapeo
-            _logger.warning("No hay mapeo de columnas configurado para FSM, usando búsqueda por defecto")
+            self._log_detail("No hay mapeo de columnas configurado para FSM, usando búsqueda por defecto", logging.WARNING)
             
             # Buscar técnico por nombre o RUT
-            technician_name = row_data.get('tecnico', '') or row_data.get('nombre_tecnico', '')
-            technician_rut = row_data.get('rut_tecnico', '') or row_data.get('rut.tecnico', '')
+            technician_name = self._get_row_technician_name(row_data) or ''
+            technician_rut = self._get_row_technician_rut(row_data) or ''
             
             if technician_rut:
                 partner = self.env['res.partner'].search([
@@ -520,17 +1657,9 @@ class SaleOrderProcessor(models.Model):
                         return fsm_location
             
             if technician_name:
-                partner = self.env['res.partner'].search([
-                    ('name', 'ilike', str(technician_name).strip())
-                ], limit=1)
-                
-                if partner:
-                    fsm_location = self.env['fsm.location'].search([
-                        ('partner_id', '=', partner.id)
-                    ], limit=1)
-                    
-                    if fsm_location:
-                        return fsm_location
+                fsm_location = self._match_technician_name(technician_name)
+                if fsm_location:
+                    return fsm_location
         
         return None
     
@@ -543,19 +1672,21 @@ class SaleOrderProcessor(models.Model):
         :return: Producto encontrado o None
         :rtype: product.product or None
         """
-        sku = row_data.get('sku', '') or row_data.get('codigo', '') or row_data.get('codigo_producto', '')
-        
-        if not sku or not str(sku).strip():
+        sku = self._get_row_sku(row_data)
+        if not sku:
             return None
+
+        index = getattr(self, 'lookup_index', None)
+        if index is not None and sku in index['product_by_sku']:
+            # Producto ya resuelto en bloque para todo el archivo
+            product = index['product_by_sku'][sku]
+        else:
+            # Buscar producto por default_code
+            product = self.env['product.product'].search([
+                ('default_code', '=', sku)
+            ], limit=1)
         
-        sku = str(sku).strip()
-        
-        # Buscar producto por default_code
-        product = self.env['product.product'].search([
-            ('default_code', '=', sku)
-        ], limit=1)
-        
-        if not product:
+        if not product and (index is None or sku not in index['product_by_sku']):
             # Intentar buscar en product.template
             product_tmpl = self.env['product.template'].search([
                 ('default_code', '=', sku)
@@ -569,34 +1700,33 @@ class SaleOrderProcessor(models.Model):
             results['skus_not_found'].append({
                 'sku': sku,
                 'description': row_data.get('descripcion', 'Sin descripción'),
-                'quantity': row_data.get('cantidad', 1)
+                'quantity': self._get_quantity_from_row(row_data)
             })
-            _logger.warning(f"Producto no encontrado con SKU: {sku}")
+            self._log_detail(f"Producto no encontrado con SKU: {sku}", logging.WARNING)
         
         return product
     
     def _get_quantity_from_row(self, row_data):
         """
-        Extrae la cantidad de la fila, con valor por defecto 1.
+        Extrae la cantidad de la fila desde la columna mapeada a
+        ``sale.order.line.product_uom_qty`` (o las columnas comunes de cantidad), con
+        valor por defecto 1.
         
         :param row_data: Datos de la fila
         :return: Cantidad a ordenar
         :rtype: float
         """
-        # Buscar cantidad en diferentes posibles campos
-        quantity_fields = ['cantidad', 'qty', 'quantity', 'cant', 'unidades']
+        # Cantidad ya convertida en la normalización del lote
+        if NORMALIZED_KEY in row_data:
+            return row_data[NORMALIZED_KEY]['quantity']
         
-        for field in quantity_fields:
-            if field in row_data and row_data[field]:
-                try:
-                    qty = float(row_data[field])
-                    if qty > 0:
-                        return qty
-                except (ValueError, TypeError):
-                    continue
+        try:
+            qty = float(self._get_line_value(row_data, 'quantity'))
+        except (ValueError, TypeError):
+            qty = 0.0
         
         # Si no se encuentra cantidad válida, retornar 1
-        return 1.0
+        return qty if qty > 0 else 1.0
     
     def _prepare_order_notes(self, row_data, sheet_name, row_idx):
         """
@@ -653,6 +1783,20 @@ class SaleOrderProcessor(models.Model):
         if not missing_skus:
             return
         
+        note = self._format_missing_skus(missing_skus)
+        
+        # Agregar a los mensajes de error del archivo
+        existing_error = ftp_file.error_message or ''
+        ftp_file.error_message = existing_error + '\n\n' + note if existing_error else note
+
+    def _format_missing_skus(self, missing_skus):
+        """
+        Arma el texto con los SKUs no encontrados en el catálogo.
+        
+        :param missing_skus: Lista de SKUs no encontrados
+        :return: Texto con un SKU por línea
+        :rtype: str
+        """
         note = "=== SKUs NO ENCONTRADOS EN EL CATÁLOGO ===\n"
         for sku_info in missing_skus:
             note += (
@@ -660,7 +1804,4 @@ class SaleOrderProcessor(models.Model):
                 f"Descripción: {sku_info.get('description', 'N/A')} | "
                 f"Cantidad: {sku_info.get('quantity', 1)}\n"
             )
-        
-        # Agregar a los mensajes de error del archivo
-        existing_error = ftp_file.error_message or ''
-        ftp_file.error_message = existing_error + '\n\n' + note if existing_error else note
\ No newline at end of file
+        return note
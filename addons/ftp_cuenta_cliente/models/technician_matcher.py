@@ -0,0 +1,231 @@
+from odoo import models, api, tools
+import logging
+import re
+import unicodedata
+from collections import Counter
+
+_logger = logging.getLogger(__name__)
+
+# Minimum score (0-1) for a technician name to be matched, overridable with ir.config_parameter
+NAME_MATCH_THRESHOLD = 0.75
+
+# Score the best match must have over the best one of another location
+NAME_MATCH_MARGIN = 0.1
+
+# Candidate words a match must cover (all of them for shorter names), so a bare
+# first name or surname never matches
+MIN_MATCHED_TOKENS = 2
+
+# Trigram similarity from which two words count as the same misspelled word ('peres'/'perez')
+TOKEN_FUZZY_SCORE = 0.5
+
+# Candidates sharing the most trigrams that are scored in full for each name
+MATCH_CANDIDATES = 20
+
+# Token score of an initial ("J") against a word starting with it, and of a prefix ("Ped")
+INITIAL_SCORE = 0.8
+PREFIX_SCORE = 0.9
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def fold_name(name):
+    """Accent, case and punctuation folded tokens of a name ('J.PÉREZ' -> ['j', 'perez'])"""
+    text = unicodedata.normalize('NFKD', str(name or '')).encode('ascii', 'ignore').decode('ascii')
+    return _NON_ALNUM.sub(' ', text.casefold()).split()
+
+
+def name_trigrams(tokens):
+    """Trigrams of the folded tokens, each word padded like pg_trgm ('  j', ' j ')"""
+    trigrams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def _token_score(query_token, candidate_token):
+    if query_token == candidate_token:
+        return 1.0
+    if len(query_token) == 1:
+        return INITIAL_SCORE if candidate_token.startswith(query_token) else 0.0
+    if len(candidate_token) == 1:
+        return INITIAL_SCORE if query_token.startswith(candidate_token) else 0.0
+    if len(query_token) >= 3 and candidate_token.startswith(query_token):
+        return PREFIX_SCORE
+    query_trigrams = name_trigrams([query_token])
+    candidate_trigrams = name_trigrams([candidate_token])
+    common = len(query_trigrams & candidate_trigrams)
+    fuzzy = common / (len(query_trigrams) + len(candidate_trigrams) - common)
+    return fuzzy if fuzzy >= TOKEN_FUZZY_SCORE else 0.0
+
+
+def token_similarity(query_tokens, candidate_tokens):
+    """
+    Dice score of the best one-to-one token pairing, where initials, prefixes and close
+    misspellings count as partial matches ('j perez' / 'juan perez' -> 0.9).
+
+    Names not covered enough score 0: every query word must pair with a candidate word,
+    and at least MIN_MATCHED_TOKENS candidate words must be paired (all of them when the
+    candidate is shorter), so 'juan pereira' does not match 'juan perez' and 'juan'
+    alone matches nobody with a surname.
+    """
+    if not query_tokens or not candidate_tokens:
+        return 0.0
+    remaining = list(candidate_tokens)
+    total = 0.0
+    for query_token in query_tokens:
+        scores = [_token_score(query_token, token) for token in remaining]
+        best = max(range(len(scores)), key=scores.__getitem__, default=None)
+        if best is None or not scores[best]:
+            return 0.0
+        total += scores[best]
+        remaining.pop(best)
+    if len(candidate_tokens) - len(remaining) < min(MIN_MATCHED_TOKENS, len(candidate_tokens)):
+        return 0.0
+    return 2 * total / (len(query_tokens) + len(candidate_tokens))
+
+
+class TechnicianNameIndex:
+    """
+    In-memory trigram index over technician names.
+
+    Candidates are retrieved through an inverted index of trigrams, so a lookup only
+    touches the names sharing trigrams with the query, and are scored by token
+    similarity (which handles initials and misspelled words). partner_ids holds the
+    partners whose names were indexed, so renames of other partners can be ignored.
+    """
+
+    def __init__(self, entries, partner_ids=()):
+        self.partner_ids = frozenset(partner_ids)
+        self.entries = []
+        self._postings = {}
+        self._by_key = {}
+        for location_id, name in entries:
+            tokens = fold_name(name)
+            if not tokens:
+                continue
+            trigrams = name_trigrams(tokens)
+            position = len(self.entries)
+            self.entries.append((location_id, name, tokens))
+            self._by_key.setdefault(' '.join(tokens), position)
+            for trigram in trigrams:
+                self._postings.setdefault(trigram, []).append(position)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def best_match(self, name, threshold=NAME_MATCH_THRESHOLD, margin=NAME_MATCH_MARGIN):
+        """
+        Return (location_id, matched name, score) of the best match for name, or None.
+
+        Exact folded matches win outright; otherwise a best score that is not ahead of
+        the best one of another location by margin is ambiguous and not matched.
+        """
+        tokens = fold_name(name)
+        if not tokens:
+            return None
+        exact = self._by_key.get(' '.join(tokens))
+        if exact is not None:
+            location_id, matched_name = self.entries[exact][:2]
+            return location_id, matched_name, 1.0
+
+        trigrams = name_trigrams(tokens)
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self._postings.get(trigram, ()))
+        scored = []
+        for position, _common in shared.most_common(MATCH_CANDIDATES):
+            score = token_similarity(tokens, self.entries[position][2])
+            if score:
+                scored.append((score, position))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        if not scored or scored[0][0] < threshold:
+            return None
+        score, position = scored[0]
+        location_id, matched_name = self.entries[position][:2]
+        runner_up = next((item for item in scored[1:] if self.entries[item[1]][0] != location_id), None)
+        if runner_up and score - runner_up[0] < margin:
+            _logger.info(f"Technician name {name!r} is ambiguous between {matched_name!r} and "
+                         f"{self.entries[runner_up[1]][1]!r}, not matched")
+            return None
+        return location_id, matched_name, score
+
+
+class FtpTechnicianMatcher(models.AbstractModel):
+    _name = 'ftp.technician.matcher'
+    _description = 'FTP Technician Name Matcher'
+
+    @api.model
+    @tools.ormcache()
+    def _get_index(self):
+        """
+        Index of the partner names of every fsm.location, cached per registry; the
+        cache is cleared when a location is created, deleted or changes partner, and
+        when the name of a location's partner changes.
+
+        The cache key holds no user, so the locations are read as superuser.
+        """
+        locations = self.env['fsm.location'].sudo().search([('partner_id', '!=', False)])
+        seen_partners = set()
+        entries = []
+        for location in locations:
+            # First location of each partner, like the RUT lookup
+            if location.partner_id.id not in seen_partners:
+                seen_partners.add(location.partner_id.id)
+                entries.append((location.id, location.partner_id.name))
+        index = TechnicianNameIndex(entries, seen_partners)
+        _logger.info(f"Technician name index built with {len(index)} names")
+        return index
+
+    @api.model
+    def match_names(self, names, threshold=None):
+        """
+        Match technician names against the fsm.location partners in bulk.
+
+        :return: {name: (fsm.location, score)} with an empty recordset and 0.0 when unmatched
+        """
+        if threshold is None:
+            params = self.env['ir.config_parameter'].sudo()
+            threshold = float(params.get_param('ftp_cuenta_cliente.name_match_threshold', NAME_MATCH_THRESHOLD))
+        index = self._get_index()
+        Location = self.env['fsm.location']
+        matches = {}
+        for name in names:
+            match = index.best_match(name, threshold)
+            matches[name] = (Location.browse(match[0]), match[2]) if match else (Location, 0.0)
+        return matches
+
+
+class FsmLocation(models.Model):
+    _inherit = 'fsm.location'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['ftp.technician.matcher'].clear_caches()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        if {'partner_id', 'name', 'active'} & set(vals):
+            self.env['ftp.technician.matcher'].clear_caches()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env['ftp.technician.matcher'].clear_caches()
+        return result
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    def write(self, vals):
+        result = super().write(vals)
+        if 'name' in vals:
+            # Only the renames of indexed partners clear the (registry-wide) cache
+            matcher = self.env['ftp.technician.matcher']
+            if not matcher._get_index().partner_ids.isdisjoint(self.ids):
+                matcher.clear_caches()
+        return result
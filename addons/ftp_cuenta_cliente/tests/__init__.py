@@ -0,0 +1,17 @@
+from . import test_import_benchmark
+from . import test_technician_matcher
+from . import test_column_transformer
+from . import test_poll_schedule
+from . import test_download_retry
+from . import test_checkpoint_resume
+from . import test_fetch_connections
+from . import test_duplicate_manifest
+from . import test_parallel_xlsx
+from . import test_order_batches
+from . import test_content_storage
+from . import test_connection_pool
+from . import test_row_normalization
+from . import test_processing_jobs
+from . import test_text_readers
+from . import test_order_grouping
+from . import test_download_buffer
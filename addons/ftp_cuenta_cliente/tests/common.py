@@ -0,0 +1,266 @@
+"""
+Helpers for the offline import benchmark: synthetic extracts, catalog seeding and
+FTP/SFTP servers bound to localhost and running in background threads.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+from datetime import datetime, timedelta
+
+import openpyxl
+import paramiko
+
+try:
+    from pyftpdlib.authorizers import DummyAuthorizer
+    from pyftpdlib.handlers import FTPHandler
+    from pyftpdlib.servers import FTPServer
+except ImportError:
+    FTPServer = None
+
+_logger = logging.getLogger(__name__)
+
+SERVER_USER = 'bench'
+SERVER_PASSWORD = 'bench'
+
+RF_HEADERS = [
+    'id.mochila', 'proveedor', 'fecha.agenda', 'tecnico', 'rut', 'region',
+    'bodega', 'codigo.iata', 'sku', 'descripcion', 'cantidad', 'comentario',
+]
+INSTALACIONES_HEADERS = [
+    'ticket', 'num.cue', 'ss', 'tipo.solicitud', 'cod.comercio', 'rut',
+    'razon.social', 'tecnico', 'fecha.agendada', 'region', 'comuna',
+]
+REGIONS = ['Metropolitana', 'Valparaíso', 'Biobío', 'Araucanía', 'Los Lagos', 'Antofagasta']
+
+
+def make_rut(number):
+    """Format number as a Chilean RUT with its check digit (12.345.678-5)"""
+    total, factor = 0, 2
+    for digit in reversed(str(number)):
+        total += int(digit) * factor
+        factor = 2 if factor == 7 else factor + 1
+    check = 11 - total % 11
+    check = {10: 'K', 11: '0'}.get(check, str(check))
+    return f"{number:,}".replace(',', '.') + f"-{check}"
+
+
+def make_catalog(technician_count, product_count, seed=0):
+    """Return (technicians, skus): [(name, rut)] and [sku] used by the seeds and the extracts"""
+    rng = random.Random(seed)
+    technicians = [
+        (f"Técnico Benchmark {index:05d}", make_rut(rng.randint(5000000, 25000000)))
+        for index in range(technician_count)
+    ]
+    skus = [f"BENCH-{index:06d}" for index in range(product_count)]
+    return technicians, skus
+
+
+def seed_catalog(env, technicians, skus):
+    """Create the fsm.location technicians (with partner RUT) and products of the catalog"""
+    owner = env['res.partner'].create({'name': 'Benchmark Owner'})
+    locations = env['fsm.location'].create([
+        {'name': name, 'vat': rut, 'owner_id': owner.id}
+        for name, rut in technicians
+    ])
+    products = env['product.product'].create([
+        {'name': f"Producto {sku}", 'default_code': sku, 'list_price': 1000.0}
+        for sku in skus
+    ])
+    return locations, products
+
+
+def _rf_row(rng, index, technicians, skus, start):
+    name, rut = rng.choice(technicians)
+    return [
+        f"MOCH-{index:07d}", 'Proveedor Benchmark',
+        (start + timedelta(minutes=index)).strftime('%d-%m-%Y %H:%M:%S'),
+        name, rut, rng.choice(REGIONS), f"BOD-{rng.randint(1, 40):02d}",
+        rng.choice(['SCL', 'CCP', 'PMC', 'ANF']), rng.choice(skus),
+        'Repuesto terminal', rng.randint(1, 5), '',
+    ]
+
+
+def _instalaciones_row(rng, index, technicians, skus, start):
+    name, rut = rng.choice(technicians)
+    return [
+        f"TCK-{index:08d}", str(rng.randint(100000, 999999)), f"SS{index:07d}",
+        rng.choice(['INSTALACION', 'RETIRO', 'CAMBIO']), str(rng.randint(1000, 9999)),
+        rut, f"Comercio {index}", name,
+        (start + timedelta(minutes=index)).strftime('%d-%m-%Y %H:%M:%S'),
+        rng.choice(REGIONS), 'Santiago',
+    ]
+
+
+def write_extract(path, kind, rows, technicians, skus, sheets=3, seed=0):
+    """
+    Write a synthetic RF ('rf') or instalaciones extract of rows rows split across sheets.
+
+    Values only use the given catalog, so every row resolves to a technician and a
+    product; the seed changes the content (and so the hash) between runs.
+    """
+    headers, make_row = {
+        'rf': (RF_HEADERS, _rf_row),
+        'instalaciones': (INSTALACIONES_HEADERS, _instalaciones_row),
+    }[kind]
+    rng = random.Random(seed)
+    start = datetime(2024, 5, 22, 8, 0)
+    workbook = openpyxl.Workbook(write_only=True)
+    per_sheet = -(-rows // sheets)
+    index = 0
+    for sheet_number in range(sheets):
+        sheet = workbook.create_sheet(f"Hoja{sheet_number + 1}")
+        sheet.append(headers)
+        for _row in range(min(per_sheet, rows - index)):
+            sheet.append(make_row(rng, index, technicians, skus, start))
+            index += 1
+    workbook.save(path)
+    return path
+
+
+class LocalFtpServer:
+    """pyftpdlib server on 127.0.0.1 serving root (requires the optional pyftpdlib package)"""
+
+    def __init__(self, root):
+        authorizer = DummyAuthorizer()
+        authorizer.add_user(SERVER_USER, SERVER_PASSWORD, root, perm='elradfmwMT')
+        handler = type('BenchmarkFTPHandler', (FTPHandler,), {'authorizer': authorizer, 'banner': 'benchmark'})
+        self.server = FTPServer(('127.0.0.1', 0), handler)
+        self.port = self.server.address[1]
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={'timeout': 0.2}, daemon=True, name='ftp_benchmark'
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.close_all()
+        self.thread.join(timeout=5)
+
+
+class _SftpHandler(paramiko.SFTPServerInterface):
+    """SFTP subsystem mapping remote paths into a local directory"""
+
+    def __init__(self, server, root, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.root = root
+
+    def _local(self, path):
+        return os.path.join(self.root, self.canonicalize(path).lstrip('/'))
+
+    def _attributes(self, local_path, filename=None):
+        return paramiko.SFTPAttributes.from_stat(os.stat(local_path), filename)
+
+    def list_folder(self, path):
+        try:
+            local = self._local(path)
+            return [self._attributes(os.path.join(local, name), name) for name in os.listdir(local)]
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return self._attributes(self._local(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        try:
+            fd = os.open(self._local(path), flags | getattr(os, 'O_BINARY', 0), 0o644)
+            if flags & os.O_APPEND:
+                mode = 'ab'
+            elif flags & os.O_RDWR:
+                mode = 'r+b'
+            elif flags & os.O_WRONLY:
+                mode = 'wb'
+            else:
+                mode = 'rb'
+            fileobj = os.fdopen(fd, mode)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        handle = paramiko.SFTPHandle(flags)
+        handle.filename = self._local(path)
+        handle.readfile = fileobj
+        handle.writefile = fileobj
+        return handle
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.rename(self._local(oldpath), self._local(newpath))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def remove(self, path):
+        try:
+            os.remove(self._local(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(self._local(path))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+
+class _SshServer(paramiko.ServerInterface):
+    """Password-only SSH server allowing the sftp subsystem"""
+
+    def check_auth_password(self, username, password):
+        if (username, password) == (SERVER_USER, SERVER_PASSWORD):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class LocalSftpServer:
+    """paramiko SFTP server on 127.0.0.1 serving root"""
+
+    def __init__(self, root):
+        self.root = root
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.listen(5)
+        self.port = self.socket.getsockname()[1]
+        self.transports = []
+        self.thread = threading.Thread(target=self._serve, daemon=True, name='sftp_benchmark')
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _address = self.socket.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(connection)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler('sftp', paramiko.SFTPServer, _SftpHandler, self.root)
+            transport.start_server(server=_SshServer())
+            self.transports.append(transport)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.socket.close()
+        for transport in self.transports:
+            transport.close()
+        self.thread.join(timeout=5)
@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.sale_order_processor import SaleOrderProcessor
+from .common import RF_HEADERS, make_catalog, seed_catalog
+
+
+class Interrupted(BaseException):
+    """Stands for the worker being killed: not caught by the import's error handling"""
+
+
+@tagged('post_install', '-at_install')
+class TestCheckpointResume(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.technicians, cls.skus = make_catalog(3, 3, seed=7)
+        seed_catalog(cls.env, cls.technicians, cls.skus)
+        cls.env['ir.config_parameter'].sudo().set_param('ftp_cuenta_cliente.commit_chunk_size', 2)
+        cls.config = cls.env['ftp.config'].create({
+            'name': 'Checkpoint Resume',
+            'host': 'localhost',
+            'username': 'user',
+            'password': 'secret',
+        })
+
+    def _batches(self):
+        rows = [
+            {
+                'id.mochila': f"MOCH-{index}",
+                'tecnico': self.technicians[index % 3][0],
+                'rut': self.technicians[index % 3][1],
+                'sku': self.skus[index % 3],
+                'descripcion': 'Repuesto',
+                'cantidad': '1',
+            }
+            for index in range(6)
+        ]
+        for start in range(0, len(rows), 2):
+            yield 'Hoja1', RF_HEADERS, rows[start:start + 2]
+
+    def test_interrupted_reprocess_resumes_from_checkpoint(self):
+        file_record = self.env['ftp.file'].create({'name': 'extracto-rf-resume.xlsx', 'ftp_config_id': self.config.id})
+        self.env['ftp.service']._stream_file_content(file_record, self._batches(), process=False)
+        self.assertEqual(file_record.row_count, 6)
+
+        # reprocess_file opens a cursor of its own: make it share the test transaction
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        commit_checkpoint = SaleOrderProcessor._commit_checkpoint
+
+        def commit_then_die(processor, *args, **kwargs):
+            commit_checkpoint(processor, *args, **kwargs)
+            raise Interrupted()
+
+        with patch.object(SaleOrderProcessor, '_commit_checkpoint', commit_then_die), \
+                self.assertRaises(Interrupted):
+            self.env['ftp.service'].reprocess_file(file_record.id)
+
+        self.assertEqual((file_record.checkpoint_sheet, file_record.checkpoint_row), ('Hoja1', 2))
+        self.assertEqual(sorted(file_record.row_ids.mapped('row_index')), [1, 2])
+
+        self.env['ftp.service'].reprocess_file(file_record.id)
+        self.assertFalse(file_record.checkpoint_sheet)
+        self.assertNotEqual(file_record.status, 'error', file_record.error_message)
+        self.assertEqual(len(file_record.row_ids), 6)
+        self.assertEqual(sorted(file_record.row_ids.mapped('row_index')), [1, 2, 3, 4, 5, 6])
+
+    def test_inline_processing_does_not_commit(self):
+        file_record = self.env['ftp.file'].create({'name': 'extracto-rf-inline.xlsx', 'ftp_config_id': self.config.id})
+        with patch.object(SaleOrderProcessor, '_commit_checkpoint') as commit_checkpoint:
+            self.env['ftp.service']._stream_file_content(file_record, self._batches())
+
+        commit_checkpoint.assert_not_called()
+        self.assertFalse(file_record.checkpoint_sheet)
+        self.assertEqual(len(file_record.row_ids), 6)
@@ -0,0 +1,119 @@
+from datetime import date
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.column_transformer import ColumnTransformer, compile_column
+from ..models.sale_order_processor import NORMALIZED_KEY
+
+
+def _column(name, target_field, **values):
+    column = {
+        'column_name': name,
+        'target_model': 'sale.order',
+        'target_field': target_field,
+        'data_type': 'char',
+        'mapping_type': 'direct',
+        'date_format': '%d-%m-%Y',
+        'default_value': False,
+        'transformation_code': False,
+        'search_domain': False,
+        'custom_mapping': False,
+    }
+    column.update(values)
+    return compile_column(column)
+
+
+@tagged('post_install', '-at_install')
+class TestColumnTransformer(TransactionCase):
+
+    def test_conversion_and_code(self):
+        transformer = ColumnTransformer(self.env, [
+            _column('Fecha', 'validity_date', data_type='date'),
+            _column('OT', 'client_order_ref', default_value='SIN-OT',
+                    transformation_code="result = 'OT-' + value\n"),
+            _column('Obs', 'note', mapping_type='concatenate'),
+        ])
+        mapped, errors = transformer.transform([
+            {'Fecha': '05-03-2024', 'OT': '123', 'Obs': 'urgente'},
+            {'Fecha': '', 'OT': '', 'Obs': ''},
+        ])
+        self.assertFalse(errors)
+        self.assertEqual(mapped[0]['sale.order.validity_date'], date(2024, 3, 5))
+        self.assertEqual(mapped[0]['sale.order.client_order_ref'], 'OT-123')
+        self.assertEqual(mapped[0]['sale.order.note'], ['Obs: urgente'])
+        self.assertIsNone(mapped[1]['sale.order.validity_date'])
+        self.assertEqual(mapped[1]['sale.order.client_order_ref'], 'OT-SIN-OT')
+        self.assertNotIn('sale.order.note', mapped[1])
+
+    def test_failing_row_is_isolated(self):
+        transformer = ColumnTransformer(self.env, [
+            _column('Monto', 'client_order_ref', data_type='float',
+                    transformation_code="result = str(100 / value)\n"),
+        ])
+        mapped, errors = transformer.transform([{'Monto': '2,5'}, {'Monto': '0'}, {'Monto': '4'}])
+        self.assertEqual(list(errors), [1])
+        self.assertEqual(mapped[0]['sale.order.client_order_ref'], '40.0')
+        self.assertEqual(mapped[2]['sale.order.client_order_ref'], '25.0')
+
+    def test_many2one_lookup_and_custom_mapping(self):
+        user = self.env['res.users'].search([], limit=1)
+        transformer = ColumnTransformer(self.env, [
+            _column('Vendedor', 'user_id', mapping_type='m2o_search',
+                    search_domain="[('login', '=', value)]",
+                    custom_mapping="mapped['sale.order.origin'] = row['Vendedor']\n"),
+        ])
+        mapped, errors = transformer.transform([{'Vendedor': user.login}, {'Vendedor': 'no-existe'}])
+        self.assertFalse(errors)
+        self.assertEqual(mapped[0]['sale.order.user_id'], user.id)
+        self.assertFalse(mapped[1]['sale.order.user_id'])
+        self.assertEqual(mapped[1]['sale.order.origin'], 'no-existe')
+
+    def test_retry_starts_from_unchanged_rows(self):
+        transformer = ColumnTransformer(self.env, [
+            _column('Monto', 'client_order_ref', data_type='float',
+                    custom_mapping="row['Nota'] = row['Nota'] + '!'\n"
+                                   "mapped['sale.order.origin'] = row['Nota'] + str(int(100 / value))\n"),
+        ])
+        rows = [{'Monto': '4', 'Nota': 'a'}, {'Monto': '0', 'Nota': 'b'}, {'Monto': '5', 'Nota': 'c'}]
+        mapped, errors = transformer.transform(rows)
+        self.assertEqual(list(errors), [1])
+        self.assertEqual(mapped[0]['sale.order.origin'], 'a!25')
+        self.assertNotIn('sale.order.origin', mapped[1])
+        self.assertEqual(mapped[2]['sale.order.origin'], 'c!20')
+        self.assertEqual([row['Nota'] for row in rows], ['a', 'b', 'c'])
+
+    def test_line_fields_come_from_mapped_columns(self):
+        processor = self.env['sale.order.processor']
+        processor.column_mappings = {}
+        processor.column_transformer = ColumnTransformer(self.env, [
+            _column('Codigo Articulo', 'default_code', target_model='product.template'),
+            _column('Unidades', 'product_uom_qty', target_model='sale.order.line', data_type='float',
+                    transformation_code="result = value * 2 if value else value\n"),
+            _column('Rut Tecnico', 'partner_id', target_model='fsm.location'),
+        ])
+        rows, failed = processor._transform_rows([
+            {'Codigo Articulo': ' SKU-1 ', 'Unidades': '1,5', 'Rut Tecnico': '12.345.678-5', 'sku': 'OTRO'},
+            {'Codigo Articulo': '', 'Unidades': '', 'Rut Tecnico': '', 'cantidad': '3'},
+        ])
+        rows, rejected = processor._normalize_rows(rows)
+        self.assertFalse(failed)
+        self.assertEqual(rejected, {1: 'datos incompletos'})
+        normalized = rows[0][NORMALIZED_KEY]
+        self.assertEqual(normalized['sku'], 'SKU-1')
+        self.assertEqual(normalized['quantity'], 3.0)
+        self.assertEqual(normalized['rut_key'], '123456785')
+
+    def test_line_fields_fall_back_to_common_columns(self):
+        processor = self.env['sale.order.processor']
+        processor.column_mappings = {}
+        processor.column_transformer = ColumnTransformer(self.env, [])
+        rows, failed = processor._transform_rows([
+            {'sku': 'SKU-2', 'cantidad': '4', 'rut': '12.345.678-5'},
+            {'codigo': 'SKU-3', 'cantidad': 'x', 'rut': ''},
+        ])
+        rows, rejected = processor._normalize_rows(rows)
+        self.assertFalse(failed or rejected)
+        self.assertEqual([row[NORMALIZED_KEY]['sku'] for row in rows], ['SKU-2', 'SKU-3'])
+        self.assertEqual([row[NORMALIZED_KEY]['quantity'] for row in rows], [4.0, 1.0])
+        self.assertEqual(rows[0][NORMALIZED_KEY]['rut_key'], '123456785')
+        self.assertEqual(processor._get_quantity_from_row({'cantidad': '2'}), 2.0)
@@ -0,0 +1,72 @@
+import ftplib
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models import ftp_service
+from ..models.ftp_service import ConnectionPool
+
+
+@tagged('post_install', '-at_install')
+class TestConnectionPool(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = self.env['ftp.service']
+        self.config = SimpleNamespace(
+            dbname='test', id=1, name='Pool', host='ftp.local', port=21, username='user',
+            password='secret', connection_type='ftp', use_tls=False,
+            connection_max_age=3600, connection_idle_timeout=900,
+        )
+        self.opened = []
+
+        def open_connection(service, config):
+            connection_info = {'type': 'ftp', 'connection': MagicMock(spec=ftplib.FTP), 'home': '/'}
+            self.opened.append(connection_info)
+            return connection_info
+
+        for patcher in (
+            patch.object(ftp_service, '_connection_pool', ConnectionPool()),
+            patch.object(type(self.service), '_open_connection', open_connection),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_released_session_is_reused(self):
+        first = self.service._get_ftp_connection(self.config)
+        self.service._close_connection(first)
+        second = self.service._get_ftp_connection(self.config)
+
+        self.assertIs(second, first)
+        self.assertEqual(len(self.opened), 1)
+        first['connection'].cwd.assert_called_with('/')
+        first['connection'].quit.assert_not_called()
+
+    def test_discarded_session_is_closed(self):
+        first = self.service._get_ftp_connection(self.config)
+        self.service._close_connection(first, discard=True)
+        first['connection'].quit.assert_called_once()
+        self.assertIsNot(self.service._get_ftp_connection(self.config), first)
+
+    def test_changed_settings_open_a_new_session(self):
+        first = self.service._get_ftp_connection(self.config)
+        self.service._close_connection(first)
+        self.config.password = 'rotated'
+
+        self.assertIsNot(self.service._get_ftp_connection(self.config), first)
+        first['connection'].quit.assert_called_once()
+
+    def test_idle_old_and_stale_sessions_are_evicted(self):
+        idle, old, stale = (self.service._get_ftp_connection(self.config) for _index in range(3))
+        for connection_info in (idle, old, stale):
+            self.service._close_connection(connection_info)
+        idle['released_at'] -= self.config.connection_idle_timeout + 1
+        old['created_at'] -= self.config.connection_max_age + 1
+        stale['connection'].cwd.side_effect = ftplib.error_temp('421 Timeout')
+
+        fresh = self.service._get_ftp_connection(self.config)
+        self.assertNotIn(fresh, (idle, old, stale))
+        self.assertEqual(len(self.opened), 4)
+        for connection_info in (idle, old, stale):
+            connection_info['connection'].quit.assert_called_once()
@@ -0,0 +1,44 @@
+import gzip
+import json
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.ftp_file import ContentWriter, iter_content_sheet_rows
+
+
+@tagged('post_install', '-at_install')
+class TestContentStorage(TransactionCase):
+
+    def _writer(self):
+        writer = ContentWriter()
+        writer.add_rows('Hoja1', [{'sku': 'A-1', 'cantidad': '2'}, {'sku': 'A-2', 'cantidad': '3'}])
+        # A column appearing in a later batch is appended to the sheet headers
+        writer.add_rows('Hoja1', [{'sku': 'A-3', 'cantidad': '1', 'comentario': 'ñandú'}])
+        writer.add_rows('Hoja2', [{'ticket': f"TCK-{index}"} for index in range(2500)])
+        return writer
+
+    def test_sheets_round_trip(self):
+        data, index = self._writer().finish()
+        hoja1, hoja2 = index['sheets']
+        self.assertEqual(hoja1['headers'], ['sku', 'cantidad', 'comentario'])
+        self.assertEqual((hoja1['rows'], hoja2['rows']), (3, 2500))
+        self.assertEqual(list(iter_content_sheet_rows(data, hoja1)), [
+            # Rows written before a column appeared are stored without it
+            {'sku': 'A-1', 'cantidad': '2'},
+            {'sku': 'A-2', 'cantidad': '3'},
+            {'sku': 'A-3', 'cantidad': '1', 'comentario': 'ñandú'},
+        ])
+        self.assertEqual(len(list(iter_content_sheet_rows(data, hoja2))), 2500)
+        # Each sheet is a gzip member of its own, holding one JSON array per row
+        member = gzip.decompress(data[hoja2['offset']:hoja2['offset'] + hoja2['length']])
+        self.assertEqual(json.loads(member.splitlines()[-1]), ['TCK-2499'])
+
+    def test_file_content_batches(self):
+        file_record = self.env['ftp.file'].create({'name': 'extracto-contenido.xlsx'})
+        file_record.set_content_from_writer(self._writer())
+        self.assertEqual((file_record.row_count, file_record.column_count), (2503, 3))
+        self.assertEqual(file_record.get_sheet_names(), ['Hoja1', 'Hoja2'])
+        batches = list(file_record.iter_content_batches(sheet_name='Hoja2', batch_size=1000))
+        self.assertEqual([len(rows) for _sheet, rows in batches], [1000, 1000, 500])
+        self.assertEqual(batches[-1][1][-1], {'ticket': 'TCK-2499'})
+        self.assertEqual(file_record.get_content_as_dict()['Hoja1'][2]['comentario'], 'ñandú')
@@ -0,0 +1,43 @@
+import hashlib
+import os
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.ftp_service import DownloadBuffer
+
+CONTENT = os.urandom(5000)
+
+
+@tagged('post_install', '-at_install')
+class TestDownloadBuffer(TransactionCase):
+
+    def _buffer(self, max_memory):
+        buffer = DownloadBuffer('.csv', max_memory=max_memory)
+        self.addCleanup(buffer.close)
+        for start in range(0, len(CONTENT), 1024):
+            buffer.write(CONTENT[start:start + 1024])
+        return buffer
+
+    def test_small_download_stays_in_memory(self):
+        buffer = self._buffer(max_memory=len(CONTENT))
+        self.assertIsNone(buffer.path)
+        self.assertEqual(buffer.size, len(CONTENT))
+        self.assertEqual(buffer.hexdigest(), hashlib.sha256(CONTENT).hexdigest())
+        self.assertEqual(buffer.open().read(), CONTENT)
+
+    def test_large_download_spills_to_disk(self):
+        buffer = self._buffer(max_memory=3000)
+        self.assertTrue(buffer.path.endswith('.csv'))
+        self.assertEqual(os.path.getsize(buffer.ensure_path()), len(CONTENT))
+        self.assertEqual(buffer.size, len(CONTENT))
+        self.assertEqual(buffer.hexdigest(), hashlib.sha256(CONTENT).hexdigest())
+        self.assertEqual(buffer.open().read(), CONTENT)
+
+        path = buffer.path
+        buffer.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_ensure_path_spills_memory_content(self):
+        buffer = self._buffer(max_memory=len(CONTENT))
+        with open(buffer.ensure_path(), 'rb') as spilled:
+            self.assertEqual(spilled.read(), CONTENT)
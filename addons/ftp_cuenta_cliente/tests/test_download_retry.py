@@ -0,0 +1,71 @@
+import hashlib
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models import ftp_service
+from ..models.ftp_service import DownloadBuffer
+
+CONTENT = os.urandom(300000)
+
+
+def _flaky_download(chunk, succeed_after):
+    """_download_file stand-in writing chunk bytes per call and failing until call succeed_after"""
+    calls = []
+
+    def download(self, connection_info, remote_filename, writer, config, offset=0):
+        calls.append(offset)
+        end = len(CONTENT) if len(calls) >= succeed_after else offset + chunk
+        writer.write(CONTENT[offset:end])
+        return len(calls) >= succeed_after
+    return download, calls
+
+
+@tagged('post_install', '-at_install')
+class TestDownloadRetry(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = self.env['ftp.service']
+        self.config = SimpleNamespace(dbname='test', id=1, download_attempts=3, download_retry_delay=0)
+        self.entry = {'name': 'extracto.xlsx', 'size': len(CONTENT), 'mtime': 1700000000.0}
+        partial_dir = tempfile.mkdtemp(prefix='ftp_partial_')
+        for patcher in (
+            patch.object(ftp_service, 'PARTIAL_DOWNLOAD_DIR', partial_dir),
+            patch.object(type(self.service), '_ensure_download_session', lambda *args: None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _download(self, flaky):
+        buffer = DownloadBuffer('.xlsx')
+        self.addCleanup(buffer.close)
+        with patch.object(type(self.service), '_download_file', flaky):
+            result = self.service._download_with_retry(None, self.entry, buffer, self.config)
+        return result, buffer
+
+    def test_retry_resumes_from_received_bytes(self):
+        flaky, calls = _flaky_download(100000, succeed_after=3)
+        result, buffer = self._download(flaky)
+        self.assertTrue(result['ok'])
+        self.assertTrue(result['verified'])
+        self.assertEqual(calls, [0, 100000, 200000])
+        self.assertEqual(result['resumed'], 200000)
+        self.assertEqual(buffer.hexdigest(), hashlib.sha256(CONTENT).hexdigest())
+
+    def test_partial_download_resumed_by_next_run(self):
+        self.config.download_attempts = 2
+        flaky, calls = _flaky_download(50000, succeed_after=10)
+        result, _buffer = self._download(flaky)
+        self.assertFalse(result['ok'])
+        self.assertEqual(calls, [0, 50000])
+
+        flaky, calls = _flaky_download(50000, succeed_after=1)
+        result, buffer = self._download(flaky)
+        self.assertTrue(result['ok'])
+        self.assertEqual(calls, [100000])
+        self.assertEqual(buffer.hexdigest(), hashlib.sha256(CONTENT).hexdigest())
+        self.assertFalse(os.listdir(ftp_service.PARTIAL_DOWNLOAD_DIR))
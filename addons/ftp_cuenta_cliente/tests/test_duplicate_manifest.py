@@ -0,0 +1,45 @@
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDuplicateManifest(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.config = cls.env['ftp.config'].create({
+            'name': 'Duplicate Manifest',
+            'host': 'localhost',
+            'username': 'user',
+            'password': 'secret',
+            'connection_type': 'scp',
+            'sync_mode': 'full',
+            'duplicate_policy': 'skip',
+        })
+        cls.original = cls.env['ftp.file'].create({
+            'name': 'extracto.xlsx',
+            'ftp_config_id': cls.config.id,
+            'content_hash': 'a' * 64,
+            'status': 'processed',
+        })
+
+    def _snapshot(self):
+        service = self.env['ftp.service']
+        return service._snapshot_config(
+            self.config, set(), {}, service._get_skipped_duplicates(self.config).get(self.config.id, {})
+        )
+
+    def test_skipped_duplicate_is_not_downloaded_again(self):
+        service = self.env['ftp.service']
+        downloaded = {'name': 'copia.xlsx', 'size': 10, 'remote_size': 10, 'mtime': 1700000000.0, 'hash': 'a' * 64}
+        # SCP files are not moved, so the duplicate stays in the download directory
+        with patch.object(type(service), '_move_processed_file', lambda *args: False):
+            service._handle_duplicate_file(self.config, None, downloaded, self.original)
+
+        snapshot = self._snapshot()
+        self.assertFalse(service._needs_download(snapshot, {'name': 'copia.xlsx', 'size': 10, 'mtime': 1700000000.0}))
+        self.assertFalse(service._needs_download(snapshot, {'name': 'copia.xlsx', 'size': None, 'mtime': None}))
+        self.assertTrue(service._needs_download(snapshot, {'name': 'copia.xlsx', 'size': 12, 'mtime': 1700000500.0}))
+        self.assertTrue(service._needs_download(snapshot, {'name': 'nuevo.xlsx', 'size': 10, 'mtime': 1700000000.0}))
@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestFetchConnections(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.configs = cls.env['ftp.config'].create([{
+            'name': f"Fetch Connections {index}",
+            'host': f"host{index}.local",
+            'username': 'user',
+            'password': 'secret',
+        } for index in range(3)])
+
+    def test_connections_closed_when_processing_raises(self):
+        service = self.env['ftp.service']
+        closed = []
+
+        def fetch_files(self, config, host_slot, fetch, events):
+            fetch['connection_info'] = {'config_id': config.id}
+            events.put(('file', fetch, {'name': 'extracto.xlsx'}))
+            events.put(('done', fetch, None))
+
+        def process_file(self, config, fetch, downloaded):
+            raise RuntimeError("processing failed")
+
+        def close_connection(self, connection_info, discard=False):
+            closed.append((connection_info['config_id'], discard))
+
+        with patch.object(type(service), '_fetch_config_files', fetch_files), \
+                patch.object(type(service), '_process_pipelined_file', process_file), \
+                patch.object(type(service), '_close_connection', close_connection), \
+                self.assertRaises(RuntimeError):
+            service.process_ftp_files(config_id=self.configs.ids)
+
+        self.assertEqual(sorted(closed), sorted((config_id, True) for config_id in self.configs.ids))
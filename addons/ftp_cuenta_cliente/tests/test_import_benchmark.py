@@ -0,0 +1,139 @@
+"""
+Offline benchmark of the FTP import pipeline.
+
+Excluded from the standard test run; launch it with ``--test-tags ftp_benchmark``.
+Sizes come from environment variables:
+
+* FTP_BENCHMARK_ROWS: comma separated row counts per extract (default ``1000,10000``,
+  up to ``100000``)
+* FTP_BENCHMARK_TECHNICIANS / FTP_BENCHMARK_PRODUCTS: catalog size (default 500 / 2000)
+* FTP_BENCHMARK_FILES: extracts per config in the multi-file case (default 3)
+
+Each case serves a synthetic multi-sheet RF (or instalaciones) extract from a
+localhost FTP or SFTP server, runs ``ftp.service.process_ftp_files`` on it and logs the ``ftp.run`` stage
+table (seconds, rows/s, MB/s and SQL queries per stage).
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from odoo.tests.common import TransactionCase, tagged
+
+from .common import (
+    FTPServer,
+    LocalFtpServer,
+    LocalSftpServer,
+    SERVER_PASSWORD,
+    SERVER_USER,
+    make_catalog,
+    seed_catalog,
+    write_extract,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def _env_int_list(name, default):
+    return [int(value) for value in os.environ.get(name, default).split(',') if value.strip()]
+
+
+@tagged('-standard', '-at_install', 'post_install', 'ftp_benchmark')
+class TestImportBenchmark(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.row_counts = _env_int_list('FTP_BENCHMARK_ROWS', '1000,10000')
+        technician_count = int(os.environ.get('FTP_BENCHMARK_TECHNICIANS', 500))
+        product_count = int(os.environ.get('FTP_BENCHMARK_PRODUCTS', 2000))
+        cls.technicians, cls.skus = make_catalog(technician_count, product_count)
+        started = time.monotonic()
+        seed_catalog(cls.env, cls.technicians, cls.skus)
+        _logger.info(
+            f"Benchmark catalog seeded: {technician_count} technicians, {product_count} products "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+
+    def _make_root(self, rows, seed, files=1, kind='rf'):
+        """Served directory with incoming/processed folders and files extracts of rows rows"""
+        root = tempfile.mkdtemp(prefix='ftp_benchmark_')
+        os.makedirs(os.path.join(root, 'incoming'))
+        os.makedirs(os.path.join(root, 'processed'))
+        for index in range(files):
+            write_extract(
+                os.path.join(root, 'incoming', f"extracto-{kind}-bench-{rows}-{seed}-{index}.xlsx"),
+                kind, rows, self.technicians, self.skus, seed=seed * 100 + index,
+            )
+        return root
+
+    def _run_pipeline(self, connection_type, port, rows, files=1):
+        config = self.env['ftp.config'].create({
+            'name': f"Benchmark {connection_type.upper()} {rows}",
+            'host': '127.0.0.1',
+            'port': port,
+            'username': SERVER_USER,
+            'password': SERVER_PASSWORD,
+            'connection_type': connection_type,
+            'download_path': '/incoming',
+            'processed_path': '/processed',
+        })
+        self.env['ftp.service'].process_ftp_files(config.id)
+
+        run = self.env['ftp.run'].search([('ftp_config_id', '=', config.id)], limit=1)
+        ftp_files = self.env['ftp.file'].search([('ftp_config_id', '=', config.id)])
+        self.assertEqual(run.state, 'done', run.error_message)
+        self.assertEqual(len(ftp_files), files)
+        for ftp_file in ftp_files:
+            self.assertEqual(ftp_file.row_count, rows)
+            self.assertEqual(ftp_file.rows_created_count, ftp_file.sale_orders_created)
+        self._report(connection_type, rows, run, ftp_files[0])
+        return run, ftp_files
+
+    def _report(self, connection_type, rows, run, ftp_file):
+        lines = [
+            f"{connection_type.upper()} {rows} rows: {run.duration:.2f}s total, {run.rows_per_second:.0f} rows/s, "
+            f"{run.query_count} queries, {ftp_file.sale_orders_created} orders",
+            f"  {'stage':<14}{'seconds':>10}{'rows/s':>12}{'MB/s':>10}{'queries':>10}",
+        ]
+        for stage in run.stage_ids:
+            mb_per_second = stage.bytes_count / 1048576 / stage.duration if stage.duration else 0.0
+            lines.append(
+                f"  {stage.name:<14}{stage.duration:>10.3f}{stage.rows_per_second:>12.0f}"
+                f"{mb_per_second:>10.2f}{stage.query_count:>10}"
+            )
+        _logger.info('\n'.join(lines))
+
+    def test_ftp_pipeline(self):
+        if FTPServer is None:
+            self.skipTest("pyftpdlib is not installed")
+        for seed, rows in enumerate(self.row_counts):
+            with self.subTest(rows=rows), LocalFtpServer(self._make_root(rows, seed)) as server:
+                self._run_pipeline('ftp', server.port, rows)
+
+    def test_sftp_pipeline(self):
+        for seed, rows in enumerate(self.row_counts, start=len(self.row_counts)):
+            with self.subTest(rows=rows), LocalSftpServer(self._make_root(rows, seed)) as server:
+                self._run_pipeline('sftp', server.port, rows)
+
+    def test_sftp_multi_file_pipeline(self):
+        """Several extracts in one config, downloaded all first (depth 0) and pipelined"""
+        files = int(os.environ.get('FTP_BENCHMARK_FILES', 3))
+        rows = self.row_counts[0]
+        params = self.env['ir.config_parameter'].sudo()
+        durations = {}
+        for seed, depth in enumerate((0, 2), start=100):
+            params.set_param('ftp_cuenta_cliente.pipeline_depth', depth)
+            with self.subTest(pipeline_depth=depth), LocalSftpServer(self._make_root(rows, seed, files)) as server:
+                durations[depth] = self._run_pipeline('sftp', server.port, rows, files)[0].duration
+        _logger.info(f"{files} files of {rows} rows: {durations[0]:.2f}s sequential, "
+                     f"{durations[2]:.2f}s pipelined")
+
+    def test_sftp_instalaciones_pipeline(self):
+        """Instalaciones extracts carry no SKU: every row is parsed, looked up and skipped"""
+        rows = self.row_counts[0]
+        with LocalSftpServer(self._make_root(rows, 200, kind='instalaciones')) as server:
+            _run, ftp_files = self._run_pipeline('sftp', server.port, rows)
+        self.assertEqual(ftp_files.rows_skipped_count, rows)
+        self.assertEqual(ftp_files.sale_orders_created, 0)
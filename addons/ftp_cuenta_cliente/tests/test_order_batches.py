@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.sale_order_processor import SaleOrderProcessor
+from .common import make_catalog, seed_catalog
+
+
+@tagged('post_install', '-at_install')
+class TestOrderBatches(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.technicians, cls.skus = make_catalog(3, 3, seed=11)
+        seed_catalog(cls.env, cls.technicians, cls.skus)
+        cls.env.ref('ftp_cuenta_cliente.ftp_file_type_rf').write({
+            'batch_order_creation': True,
+            'order_chunk_size': 2,
+            'consolidate_orders': False,
+        })
+        cls.config = cls.env['ftp.config'].create({
+            'name': 'Order Batches',
+            'host': 'localhost',
+            'username': 'user',
+            'password': 'secret',
+        })
+
+    def _process(self, name, rows=5):
+        file_record = self.env['ftp.file'].create({'name': name, 'ftp_config_id': self.config.id})
+        file_record.set_content_from_dict({'Hoja1': [
+            {
+                'id.mochila': f"MOCH-{index}",
+                'tecnico': self.technicians[index % 3][0],
+                'rut': self.technicians[index % 3][1],
+                'sku': self.skus[index % 3],
+                'descripcion': 'Repuesto',
+                'cantidad': '1',
+            }
+            for index in range(rows)
+        ]})
+        self.env['sale.order.processor'].process_ftp_file_to_sale_order(file_record.id)
+        return file_record
+
+    def test_orders_created_in_chunks(self):
+        flush = SaleOrderProcessor._flush_pending_orders
+        chunks = []
+
+        def record_chunk(processor, pending_orders, results):
+            chunks.append(len(pending_orders))
+            return flush(processor, pending_orders, results)
+
+        with patch.object(SaleOrderProcessor, '_flush_pending_orders', record_chunk):
+            file_record = self._process('extracto-rf-batches.xlsx')
+
+        self.assertEqual([size for size in chunks if size], [2, 2, 1])
+        self.assertEqual(file_record.row_ids.mapped('status'), ['created'] * 5)
+        self.assertEqual(len(file_record.row_ids.sale_order_id), 5)
+
+    def test_failed_chunk_is_retried_row_by_row(self):
+        sale_order_class = type(self.env['sale.order'])
+        create = sale_order_class.create
+
+        def reject_lists(model, vals_list):
+            if isinstance(vals_list, list) and len(vals_list) > 1:
+                raise ValueError("chunk rejected")
+            return create(model, vals_list)
+
+        with patch.object(sale_order_class, 'create', reject_lists):
+            file_record = self._process('extracto-rf-batch-retry.xlsx', rows=3)
+
+        self.assertEqual(file_record.row_ids.mapped('status'), ['created'] * 3)
+        self.assertEqual(file_record.sale_orders_created, 3)
@@ -0,0 +1,41 @@
+from odoo.tests.common import TransactionCase, tagged
+
+from .common import make_catalog, seed_catalog
+
+
+@tagged('post_install', '-at_install')
+class TestOrderGrouping(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.technicians, cls.skus = make_catalog(2, 2, seed=17)
+        seed_catalog(cls.env, cls.technicians, cls.skus)
+        cls.env.ref('ftp_cuenta_cliente.ftp_file_type_rf').write({
+            'consolidate_orders': True,
+            'group_by_field': 'id.mochila',
+        })
+
+    def _row(self, group, technician, sku, quantity):
+        name, rut = self.technicians[technician]
+        return {'id.mochila': group, 'tecnico': name, 'rut': rut, 'sku': self.skus[sku], 'cantidad': str(quantity)}
+
+    def test_rows_consolidated_per_group(self):
+        file_record = self.env['ftp.file'].create({'name': 'extracto-rf-grupos.xlsx'})
+        # A group may span sheets; a repeated SKU adds to its line
+        file_record.set_content_from_dict({
+            'Hoja1': [self._row('MOCH-A', 0, 0, 1), self._row('MOCH-B', 1, 1, 1), self._row('MOCH-A', 0, 1, 2)],
+            'Hoja2': [self._row('MOCH-A', 0, 0, 3)],
+        })
+        results = self.env['sale.order.processor'].process_ftp_file_to_sale_order(file_record.id)
+
+        self.assertEqual(results['orders_created'], 2)
+        self.assertEqual(file_record.row_ids.mapped('status'), ['created'] * 4)
+        orders = file_record.row_ids.sale_order_id
+        self.assertEqual(sorted(orders.mapped('client_order_ref')), ['FTP-MOCH-A', 'FTP-MOCH-B'])
+        order_a = orders.filtered(lambda order: order.client_order_ref == 'FTP-MOCH-A')
+        self.assertEqual(
+            sorted((line.product_id.default_code, line.product_uom_qty) for line in order_a.order_line),
+            [(self.skus[0], 4.0), (self.skus[1], 2.0)]
+        )
+        self.assertEqual(len(file_record.row_ids.filtered(lambda row: row.sale_order_id == order_a)), 3)
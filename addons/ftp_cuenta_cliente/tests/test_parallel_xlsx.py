@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+from odoo.tests.common import TransactionCase, tagged
+
+from .common import RF_HEADERS, make_catalog, write_extract
+
+
+def _rows_by_sheet(batches):
+    rows = {}
+    for sheet_name, headers, batch in batches:
+        rows.setdefault(sheet_name, []).extend(batch)
+    return rows
+
+
+@tagged('post_install', '-at_install')
+class TestParallelXlsx(TransactionCase):
+
+    def test_pool_parses_like_serial_reader(self):
+        technicians, skus = make_catalog(3, 3)
+        path = write_extract(
+            os.path.join(tempfile.mkdtemp(prefix='ftp_parallel_'), 'extracto-rf.xlsx'),
+            'rf', 25, technicians, skus, sheets=3,
+        )
+        self.env['ir.config_parameter'].sudo().set_param('ftp_cuenta_cliente.parse_processes', 2)
+        service = self.env['ftp.service']
+
+        parallel = list(service._iter_xlsx_parallel_batches(path, 4))
+        serial = list(service._iter_xlsx_batches(path, 4))
+
+        self.assertEqual([sheet_name for sheet_name, _headers, _batch in parallel][:1], ['Hoja1'])
+        self.assertTrue(all(len(batch) <= 4 for _sheet, _headers, batch in parallel))
+        self.assertEqual({tuple(headers) for _sheet, headers, _batch in parallel}, {tuple(RF_HEADERS)})
+        self.assertEqual(_rows_by_sheet(parallel), _rows_by_sheet(serial))
+        self.assertEqual(sum(len(rows) for rows in _rows_by_sheet(parallel).values()), 25)
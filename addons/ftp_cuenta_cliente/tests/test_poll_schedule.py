@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestPollSchedule(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.config = cls.env['ftp.config'].create({
+            'name': 'Poll Schedule',
+            'host': 'localhost',
+            'username': 'user',
+            'password': 'secret',
+            'cron_interval': 30,
+        })
+
+    def _poll(self, outcome):
+        self.config.write(self.config._get_poll_schedule(outcome))
+        return self.config.poll_interval
+
+    def test_idle_backs_off_exponentially(self):
+        self.assertEqual([self._poll('idle') for _i in range(5)], [30, 60, 120, 240, 240])
+        self.assertEqual(self.config.idle_polls, 5)
+        self.assertEqual(self.config.connection_status, 'success')
+
+    def test_failure_backs_off_and_activity_tightens(self):
+        self.assertEqual([self._poll('failed') for _i in range(2)], [30, 60])
+        self.assertEqual(self.config.connection_status, 'failed')
+        self.assertEqual(self._poll('active'), 7)
+        self.assertEqual(self.config.idle_polls, 0)
+        self.assertEqual(self._poll('idle'), 30)
+
+    def test_due_configs(self):
+        self.assertIn(self.config, self.env['ftp.config']._get_due_configs())
+        self.config.next_poll = fields.Datetime.now() + timedelta(minutes=10)
+        self.assertNotIn(self.config, self.env['ftp.config']._get_due_configs())
+        self.config.cron_interval = 15
+        self.assertFalse(self.config.next_poll)
+        self.assertIn(self.config, self.env['ftp.config']._get_due_configs())
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import SUPERUSER_ID, api, fields
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.sale_order_processor import SaleOrderProcessor
+from .common import make_catalog, seed_catalog
+
+
+@tagged('post_install', '-at_install')
+class TestProcessingJobs(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.technicians, cls.skus = make_catalog(2, 2, seed=13)
+        seed_catalog(cls.env, cls.technicians, cls.skus)
+        cls.env['ir.config_parameter'].sudo().set_param('ftp_cuenta_cliente.job_chunk_rows', 2)
+
+    def _queue_file(self, env, name, rows=4):
+        file_record = env['ftp.file'].create({'name': name, 'status': 'downloaded'})
+        file_record.set_content_from_dict({'Hoja1': [
+            {
+                'id.mochila': f"MOCH-{index}",
+                'tecnico': self.technicians[index % 2][0],
+                'rut': self.technicians[index % 2][1],
+                'sku': self.skus[index % 2],
+                'cantidad': '1',
+            }
+            for index in range(rows)
+        ]})
+        jobs = env['ftp.processing.job']._enqueue_file(file_record)
+        # The query compares with now(), the start of the test transaction
+        jobs.write({'next_attempt': fields.Datetime.now() - timedelta(days=1)})
+        return file_record, jobs
+
+    def test_jobs_run_and_finalize_file(self):
+        file_record, jobs = self._queue_file(self.env, 'extracto-rf-queue.xlsx')
+        self.assertEqual(jobs.mapped(lambda job: (job.sheet_name, job.row_start, job.row_stop)),
+                         [('Hoja1', 0, 2), ('Hoja1', 2, 4)])
+        self.assertEqual(file_record.job_state, 'queued')
+
+        self.assertEqual(self.env['ftp.processing.job'].cron_run_jobs(), 2)
+        self.assertEqual(jobs.mapped('state'), ['done', 'done'])
+        self.assertEqual(jobs.mapped('orders_created'), [2, 2])
+        self.assertEqual(file_record.job_state, 'done')
+        self.assertEqual(file_record.status, 'processed')
+        self.assertEqual(file_record.sale_orders_created, 4)
+
+    def test_failed_job_is_retried_later(self):
+        file_record, jobs = self._queue_file(self.env, 'extracto-rf-queue-retry.xlsx', rows=1)
+
+        def fail(processor, *args, **kwargs):
+            raise RuntimeError("processor down")
+
+        with patch.object(SaleOrderProcessor, 'process_ftp_file_to_sale_order', fail):
+            self.assertEqual(self.env['ftp.processing.job'].cron_run_jobs(), 1)
+        self.assertEqual((jobs.state, jobs.attempts), ('pending', 1))
+        self.assertGreater(jobs.next_attempt, fields.Datetime.now())
+        self.assertFalse(self.env['ftp.processing.job']._claim_next())
+        self.assertEqual(file_record.job_state, 'queued')
+
+    def test_claim_skips_jobs_locked_by_other_workers(self):
+        # Each worker needs its own transaction, so the jobs are committed and removed afterwards
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            file_record, jobs = self._queue_file(env, 'extracto-rf-queue-locks.xlsx')
+            file_id = file_record.id
+        self.addCleanup(self._remove_file, file_id)
+
+        with self.registry.cursor() as first_cr, self.registry.cursor() as second_cr:
+            first = api.Environment(first_cr, SUPERUSER_ID, {})['ftp.processing.job']._claim_next()
+            second = api.Environment(second_cr, SUPERUSER_ID, {})['ftp.processing.job']._claim_next()
+            self.assertEqual(sorted([first.id, second.id]), jobs.ids)
+            first_cr.rollback()
+            second_cr.rollback()
+
+    def _remove_file(self, file_id):
+        with self.registry.cursor() as cr:
+            api.Environment(cr, SUPERUSER_ID, {})['ftp.file'].browse(file_id).unlink()
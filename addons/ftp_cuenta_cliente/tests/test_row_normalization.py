@@ -0,0 +1,30 @@
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.sale_order_processor import NORMALIZED_KEY
+
+
+@tagged('post_install', '-at_install')
+class TestRowNormalization(TransactionCase):
+
+    def test_batch_is_normalized_and_validated(self):
+        processor = self.env['sale.order.processor']
+        processor.column_mappings = {}
+        rows = [
+            {'rut': ' 12.345.678-5 ', 'sku': ' SKU-1 ', 'cantidad': '3', 'tecnico': 'Juan Pérez'},
+            {'rut.tecnico': '9.876.543-3', 'codigo': 'SKU-2', 'cantidad': '', 'qty': '2'},
+            {'rut': '1-9', 'cantidad': '5'},
+            {'descripcion': 'Repuesto sin código', 'cantidad': '-1'},
+        ]
+        normalized_rows, rejected = processor._normalize_rows(rows)
+
+        self.assertEqual(rejected, {2: 'datos incompletos'})
+        self.assertIs(normalized_rows[2], rows[2])
+        self.assertNotIn(NORMALIZED_KEY, rows[0])
+        first, second, _rejected, fourth = (row.get(NORMALIZED_KEY) for row in normalized_rows)
+        self.assertEqual((first['rut_key'], first['sku'], first['quantity']), ('123456785', 'SKU-1', 3.0))
+        self.assertEqual(first['technician_name'], 'Juan Pérez')
+        # The technician RUT column stands in for a missing customer RUT
+        self.assertEqual((second['rut_key'], second['technician_rut_key']), ('98765433', '98765433'))
+        self.assertEqual((second['sku'], second['quantity']), ('SKU-2', 2.0))
+        # Non-positive quantities default to 1
+        self.assertEqual((fourth['sku'], fourth['description'], fourth['quantity']), ('', 'Repuesto sin código', 1.0))
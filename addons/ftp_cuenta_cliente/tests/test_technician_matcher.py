@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.technician_matcher import TechnicianNameIndex, fold_name
+
+
+@tagged('post_install', '-at_install')
+class TestTechnicianMatcher(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        owner = cls.env['res.partner'].create({'name': 'Matcher Owner'})
+        cls.juan, cls.juan_soto, cls.maria = cls.env['fsm.location'].create([
+            {'name': 'Juan Pérez', 'owner_id': owner.id},
+            {'name': 'Juan Pérez Soto', 'owner_id': owner.id},
+            {'name': 'María José Díaz', 'owner_id': owner.id},
+        ])
+
+    def test_fold_name(self):
+        self.assertEqual(fold_name('J.PÉREZ'), ['j', 'perez'])
+        self.assertEqual(fold_name('  María-José  Díaz '), ['maria', 'jose', 'diaz'])
+        self.assertEqual(fold_name(None), [])
+
+    def test_index_scores(self):
+        index = TechnicianNameIndex([(1, 'Juan Pérez'), (2, 'Juan Pérez Soto'), (3, 'Pedro Pérez')])
+        self.assertEqual(index.best_match('JUAN PEREZ'), (1, 'Juan Pérez', 1.0))
+        self.assertEqual(index.best_match('J.PEREZ')[0], 1)
+        self.assertEqual(index.best_match('P. Perez')[0], 3)
+        self.assertIsNone(index.best_match('Rodrigo Fuentes'))
+
+    def test_ambiguous_name_is_not_matched(self):
+        index = TechnicianNameIndex([(1, 'Juan Pérez'), (2, 'Juana Pérez')])
+        self.assertIsNone(index.best_match('J. Perez'))
+
+    def test_near_misses_are_not_matched(self):
+        index = TechnicianNameIndex([(1, 'Juan Pérez'), (2, 'José Pereira'), (3, 'Pedro Pérez')])
+        self.assertIsNone(index.best_match('JUAN PEREIRA'))
+        for bare_name in ('Juan', 'Perez', 'JOSE'):
+            self.assertIsNone(index.best_match(bare_name), bare_name)
+        self.assertEqual(index.best_match('J Pereira')[0], 2)
+        self.assertEqual(index.best_match('Juan Peres')[0], 1)
+
+    def test_small_margin_is_not_matched(self):
+        index = TechnicianNameIndex([(1, 'Pedro Pérez'), (2, 'Pedro Peres Soto')])
+        self.assertIsNone(index.best_match('Pedro Peres'))
+
+    def test_index_cache_follows_renames(self):
+        matcher = self.env['ftp.technician.matcher']
+        self.assertEqual(matcher.match_names(['Maria Diaz Rojas'])['Maria Diaz Rojas'][0], self.env['fsm.location'])
+        self.maria.partner_id.name = 'María Díaz Rojas'
+        self.assertEqual(matcher.match_names(['Maria Diaz Rojas'])['Maria Diaz Rojas'][0], self.maria)
+
+    def test_match_names(self):
+        matches = self.env['ftp.technician.matcher'].match_names(['J.PEREZ', 'M.J. DIAZ', 'Nadie Conocido'])
+        self.assertEqual(matches['J.PEREZ'][0], self.juan)
+        self.assertEqual(matches['M.J. DIAZ'][0], self.maria)
+        self.assertFalse(matches['Nadie Conocido'][0])
+
+    def test_index_follows_partner_renames(self):
+        matcher = self.env['ftp.technician.matcher']
+        self.assertFalse(matcher.match_names(['Carlos Rojas'])['Carlos Rojas'][0])
+        self.maria.partner_id.name = 'Carlos Rojas'
+        self.assertEqual(matcher.match_names(['Carlos Rojas'])['Carlos Rojas'][0], self.maria)
+
+    def test_other_partner_renames_keep_the_index(self):
+        matcher = self.env['ftp.technician.matcher']
+        index = matcher._get_index()
+        self.assertIn(self.maria.partner_id.id, index.partner_ids)
+        other = self.env['res.partner'].create({'name': 'Cliente Sin Ubicación'})
+        with patch.object(type(matcher), 'clear_caches') as clear_caches:
+            other.name = 'Cliente Renombrado'
+        clear_caches.assert_not_called()
+        self.assertIs(matcher._get_index(), index)
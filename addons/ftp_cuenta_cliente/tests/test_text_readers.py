@@ -0,0 +1,53 @@
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.ftp_service import DownloadBuffer
+
+XML_CONTENT = b"""<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE extracto [<!ENTITY secreto SYSTEM "file:///etc/passwd">]>
+<extracto xmlns="urn:extracto">
+    <fila id="1"><sku>SKU-1</sku><cantidad> 2 </cantidad></fila>
+    <!-- comentario -->
+    <fila id="2"><sku>SKU-2</sku><rut>12.345.678-5</rut></fila>
+    <fila id="3"><sku>&secreto;</sku></fila>
+</extracto>
+"""
+
+
+@tagged('post_install', '-at_install')
+class TestTextReaders(TransactionCase):
+
+    def _read(self, content, filename, **read_options):
+        buffer = DownloadBuffer()
+        self.addCleanup(buffer.close)
+        buffer.write(content)
+        return list(self.env['ftp.service']._iter_file_batches(
+            buffer, read_options, batch_size=2, filename=filename
+        ))
+
+    def test_csv_batches(self):
+        content = '\ufeffsku; cantidad ;descripcion\r\nSKU-1;2;Café\r\n;;\r\nSKU-2;1;Té\r\nSKU-3;4;"Pan; harina"\r\n'
+        batches = self._read(content.encode('utf-8'), 'extracto-rf.csv', extension='csv', delimiter=';')
+        self.assertEqual([(sheet, headers) for sheet, headers, _rows in batches],
+                         [('extracto-rf', ['sku', 'cantidad', 'descripcion'])] * 2)
+        self.assertEqual([rows for _sheet, _headers, rows in batches], [
+            [{'sku': 'SKU-1', 'cantidad': '2', 'descripcion': 'Café'},
+             {'sku': 'SKU-2', 'cantidad': '1', 'descripcion': 'Té'}],
+            [{'sku': 'SKU-3', 'cantidad': '4', 'descripcion': 'Pan; harina'}],
+        ])
+
+    def test_txt_with_tab_delimiter_and_latin1(self):
+        content = 'sku\tdescripcion\nSKU-1\tAñil\n'.encode('latin-1')
+        batches = self._read(content, 'extracto.txt', extension='txt', delimiter='\\t', encoding='latin-1')
+        self.assertEqual(batches, [('extracto', ['sku', 'descripcion'], [{'sku': 'SKU-1', 'descripcion': 'Añil'}])])
+
+    def test_xml_batches(self):
+        batches = self._read(XML_CONTENT, 'extracto.xml', extension='xml')
+        rows = [row for _sheet, _headers, batch in batches for row in batch]
+        self.assertEqual([len(batch) for _sheet, _headers, batch in batches], [2, 1])
+        self.assertEqual(batches[-1][1], ['id', 'sku', 'cantidad', 'rut'])
+        self.assertEqual(rows[:2], [
+            {'id': '1', 'sku': 'SKU-1', 'cantidad': '2'},
+            {'id': '2', 'sku': 'SKU-2', 'rut': '12.345.678-5'},
+        ])
+        # External entities are never resolved
+        self.assertNotIn('root:', rows[2].get('sku', ''))
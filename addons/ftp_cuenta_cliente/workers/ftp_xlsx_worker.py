@@ -0,0 +1,39 @@
+"""
+Sheet parser run in the worker processes of ftp.service's parallel .xlsx reader.
+
+Kept outside the addon package and free of Odoo imports: the workers are spawned
+as fresh interpreters (forking an Odoo process with live threads is unsafe) and
+import this module by its plain name, with its directory added to sys.path.
+"""
+
+from datetime import datetime
+
+import openpyxl
+
+
+def cell_to_str(cell):
+    """Convert a parsed cell value to the string stored in row dicts"""
+    if cell is None:
+        return ""
+    if isinstance(cell, datetime):
+        return cell.isoformat()
+    return str(cell)
+
+
+def parse_sheet(file_path, sheet_name):
+    """
+    Parse one .xlsx sheet, outside the ORM.
+
+    Returns (headers, rows) with rows as tuples of strings, a compact form that is
+    cheap to send back to the parent; headers is None for an empty sheet.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        row_iter = workbook[sheet_name].iter_rows(values_only=True)
+        first_row = next(row_iter, None)
+        if first_row is None:
+            return None, []
+        headers = [cell_to_str(cell) for cell in first_row]
+        return headers, [tuple(cell_to_str(cell) for cell in row) for row in row_iter]
+    finally:
+        workbook.close()